@@ -0,0 +1,24 @@
+"""
+Jobs run in the password pool's worker processes (see passwords.py).
+
+Workers import this module without setting Django up, so it may only depend
+on settings and the hashers, never on models or the app registry.
+"""
+
+from django.contrib.auth.hashers import check_password, make_password
+import os
+import time
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+def hash_job(password):
+    started = time.monotonic()
+    return make_password(password), started
+
+def verify_job(password, encoded):
+    started = time.monotonic()
+    # Like User.check_password: re-hash when the hasher or work factor changed
+    upgraded = []
+    is_correct = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return (is_correct, upgraded[0] if upgraded else None), started
@@ -0,0 +1,219 @@
+"""
+Per-user identity cache.
+
+An `Identity` merges the Django `User` fields with the MongoDB
+`user_profiles` document. `CachedJWTAuthentication` resolves the token's
+user id through the cache, so authenticated requests, `profile` included,
+need no SQLite or MongoDB round trip for identity once the user is cached.
+
+Entries live for IDENTITY_CACHE['TTL'] seconds, and the least recently used
+are evicted beyond MAX_SIZE. `update_profile` and saves of the `User` model
+invalidate the entry in the current process; other worker processes pick
+the change up when their copy expires.
+
+With IDENTITY_CACHE['TRUST_TOKEN_CLAIMS'] the user is built from claims that
+`issue_tokens` embeds in the access token, with no lookup at all. A claims
+identity reflects the user as of login until the token expires, so
+admin-mutating endpoints confirm the staff flag in the database
+(accounts.permissions.IsVerifiedAdminUser).
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from mongo_client import get_collection
+from collections import OrderedDict
+import threading
+import time
+
+# User fields copied into access tokens by issue_tokens
+TOKEN_CLAIMS = ('username', 'email', 'first_name', 'last_name', 'is_staff')
+
+DEFAULT_SETTINGS = {
+    'TTL': 300,
+    'MAX_SIZE': 10000,
+    'TRUST_TOKEN_CLAIMS': False,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'IDENTITY_CACHE', {}))
+    return config
+
+class Identity:
+    """Read-only user for request.user; load the `User` model to change anything"""
+
+    __slots__ = ('id', 'username', 'email', 'first_name', 'last_name',
+                 'is_active', 'is_staff', 'is_superuser', 'phone', 'address')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user, profile):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.first_name = user.first_name
+        self.last_name = user.last_name
+        self.is_active = user.is_active
+        self.is_staff = user.is_staff
+        self.is_superuser = user.is_superuser
+        self.phone = profile.get('phone', '') if profile else ''
+        self.address = profile.get('address', '') if profile else ''
+
+    @classmethod
+    def from_claims(cls, user_id, token):
+        """Identity from an access token issued by issue_tokens; profile fields are blank"""
+        identity = cls.__new__(cls)
+        identity.id = user_id
+        for claim in TOKEN_CLAIMS:
+            setattr(identity, claim, token[claim])
+        identity.is_active = True
+        identity.is_superuser = False
+        identity.phone = identity.address = ''
+        return identity
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.username
+
+    def as_dict(self):
+        """The `user` object returned by login and profile"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'phone': self.phone,
+            'address': self.address,
+            'is_staff': self.is_staff
+        }
+
+class IdentityCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            identity, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def put(self, identity):
+        config = get_settings()
+        with self._lock:
+            self._entries[identity.id] = (identity, time.monotonic() + config['TTL'])
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > config['MAX_SIZE']:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+_cache = IdentityCache()
+
+def peek(user_id):
+    """Cached identity, or None without touching a database"""
+    return _cache.get(user_id)
+
+def get_identity(user_id, user=None):
+    """Identity for `user_id`, loading and caching it on a miss; None if the user does not exist"""
+    identity = _cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            return None
+
+    identity = Identity(user, get_collection('user_profiles').find_one({'user_id': user.id}))
+    _cache.put(identity)
+    return identity
+
+def invalidate(user_id):
+    _cache.invalidate(user_id)
+
+def issue_tokens(user):
+    """Refresh token for `user` whose access tokens carry TOKEN_CLAIMS"""
+    refresh = RefreshToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+def _user_changed(sender, instance, **kwargs):
+    # Covers staff or active flags changed from the Django admin
+    invalidate(instance.pk)
+
+post_save.connect(_user_changed, sender=User, dispatch_uid='identity_user_saved')
+post_delete.connect(_user_changed, sender=User, dispatch_uid='identity_user_deleted')
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication returning an Identity (cached, or from token claims) instead of loading the User"""
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        if self._trust_claims(validated_token):
+            return Identity.from_claims(user_id, validated_token)
+        return self._check(get_identity(user_id))
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def _trust_claims(self, validated_token):
+        # Tokens issued before the claims were added still go through the cache
+        return get_settings()['TRUST_TOKEN_CLAIMS'] and all(claim in validated_token for claim in TOKEN_CLAIMS)
+
+    def _check(self, identity):
+        if identity is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not identity.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return identity
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views; only a cache miss leaves the event loop"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return await self.aauthenticate_token(raw_token)
+
+    async def aauthenticate_token(self, raw_token):
+        """(identity, validated token) for a raw access token, for async views"""
+        validated_token = self.get_validated_token(raw_token)
+        user_id = self._user_id(validated_token)
+        if self._trust_claims(validated_token):
+            return Identity.from_claims(user_id, validated_token), validated_token
+
+        identity = peek(user_id) or await sync_to_async(get_identity)(user_id)
+        return self._check(identity), validated_token
@@ -0,0 +1,139 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 at Django's default work factor takes a core for a large fraction of
+a second, so hashing (register) and verification (login) run in a small
+pool of worker processes instead of the worker thread that is also serving
+menu and order requests. At most PASSWORD_POOL['MAX_CONCURRENT'] operations
+per process are in flight; further ones wait up to QUEUE_TIMEOUT seconds
+and then fail with PasswordPoolBusy, which the views turn into a 503.
+
+Queue and hashing times are exported through query_metrics (`/metrics/`).
+With WORKERS = 0 hashing runs inline, as Django does by default.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from query_metrics import metrics
+from . import hashing
+import multiprocessing
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'WORKERS': 2,
+    'MAX_CONCURRENT': 8,
+    'QUEUE_TIMEOUT': 5,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'PASSWORD_POOL', {}))
+    return config
+
+metrics.register_histogram('srinu_password_queue_seconds', 'Time a password operation waited before hashing started')
+metrics.register_histogram('srinu_password_work_seconds', 'Time spent hashing or verifying a password')
+metrics.register_counter('srinu_password_rejected_total', 'Password operations refused because the pool was saturated')
+
+class PasswordPoolBusy(Exception):
+    pass
+
+class PasswordPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+
+    def _get(self, config):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # spawn, not fork: the server process has MongoDB and ingestion threads
+                self._executor = ProcessPoolExecutor(
+                    config['WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=hashing.init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings'),)
+                )
+                self._slots = threading.BoundedSemaphore(config['MAX_CONCURRENT'])
+                self._pid = os.getpid()
+                logger.info(f"Started password pool with {config['WORKERS']} workers in process {self._pid}")
+            return self._executor, self._slots
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def run(self, operation, function, *args):
+        config = get_settings()
+        queued_at = time.monotonic()
+
+        if config['WORKERS'] <= 0:
+            result, started = function(*args)
+        else:
+            executor, slots = self._get(config)
+            if not slots.acquire(timeout=config['QUEUE_TIMEOUT']):
+                metrics.increment('srinu_password_rejected_total', operation=operation)
+                raise PasswordPoolBusy(f'{operation}: {config["MAX_CONCURRENT"]} password operations in flight')
+            try:
+                result, started = executor.submit(function, *args).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM killed); start a fresh pool next time
+                self._reset(executor)
+                raise
+            finally:
+                slots.release()
+
+        finished = time.monotonic()
+        metrics.observe('srinu_password_queue_seconds', started - queued_at, operation=operation)
+        metrics.observe('srinu_password_work_seconds', finished - started, operation=operation)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._pid = None
+
+_pool = PasswordPool()
+
+def hash_password(password):
+    """make_password() in the pool"""
+    return _pool.run('hash', hashing.hash_job, password)
+
+def verify_password(password, encoded):
+    """check_password() in the pool; returns (is correct, new encoded password or None)"""
+    return _pool.run('verify', hashing.verify_job, password, encoded)
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend verifying passwords in the pool; used by authenticate() and the Django admin"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            hash_password(password)
+            return None
+
+        is_correct, upgraded = verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=['password'])
+        return user
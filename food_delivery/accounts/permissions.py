@@ -0,0 +1,17 @@
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
+from django.contrib.auth.models import User
+
+class IsVerifiedAdminUser(IsAdminUser):
+    """
+    IsAdminUser that confirms the staff flag in the database for writes.
+
+    request.user may come from the identity cache or from token claims and
+    can be minutes to hours behind a demotion; reads trust it, changes do not.
+    """
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        if request.method in SAFE_METHODS:
+            return True
+        return User.objects.filter(pk=request.user.id, is_staff=True, is_active=True).exists()
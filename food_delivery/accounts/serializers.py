@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from .passwords import hash_password
 from datetime import datetime
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -23,12 +24,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         address = validated_data.pop('address', '')
         validated_data.pop('confirm_password')
 
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
+        # What create_user does, with the password hashed in the pool
+        user = User.objects.create(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
-            password=validated_data['password']
+            password=hash_password(validated_data['password'])
         )
 
         # Store additional info in MongoDB
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from mongo_testing import MongoTestCase
+from accounts import identity
+
+@override_settings(IDENTITY_CACHE={'TRUST_TOKEN_CLAIMS': True})
+class ProfileWithStaleTokenTests(MongoTestCase):
+    """With TRUST_TOKEN_CLAIMS a token outlives the user it was issued to"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('leaving', password='secret123')
+        token = identity.issue_tokens(self.user).access_token
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    def test_profile_of_a_deleted_user(self):
+        self.user.delete()
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.json()['success'])
+
+    def test_profile_of_a_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_update_profile_of_a_deleted_user(self):
+        self.user.delete()
+        response = self.client.put('/api/auth/update-profile/', {'first_name': 'Gone'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile_of_an_active_user(self):
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'leaving')
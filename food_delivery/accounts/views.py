@@ -5,17 +5,27 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from . import identity, passwords
 from mongo_client import get_collection
 from datetime import datetime
 
+def _busy():
+    return Response({
+        'success': False,
+        'message': 'Too many sign-ins right now, please try again shortly'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '2'})
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
     """Register a new user"""
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        try:
+            user = serializer.save()
+        except passwords.PasswordPoolBusy:
+            return _busy()
+        refresh = identity.issue_tokens(user)
 
         return Response({
             'success': True,
@@ -43,27 +53,23 @@ def register(request):
 def login(request):
     """Login user"""
     serializer = UserLoginSerializer(data=request.data)
-    if serializer.is_valid():
+    try:
+        is_valid = serializer.is_valid()
+    except passwords.PasswordPoolBusy:
+        return _busy()
+
+    if is_valid:
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = identity.issue_tokens(user)
 
-        # Get user profile from MongoDB
-        user_profiles = get_collection('user_profiles')
-        profile = user_profiles.find_one({'user_id': user.id})
+        # Merges the MongoDB profile and warms the cache for the requests that follow
+        identity.invalidate(user.id)
+        user_identity = identity.get_identity(user.id, user=user)
 
         return Response({
             'success': True,
             'message': 'Login successful',
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'phone': profile.get('phone', '') if profile else '',
-                'address': profile.get('address', '') if profile else '',
-                'is_staff': user.is_staff
-            },
+            'user': user_identity.as_dict(),
             'tokens': {
                 'access': str(refresh.access_token),
                 'refresh': str(refresh)
@@ -75,33 +81,35 @@ def login(request):
         'errors': serializer.errors
     }, status=status.HTTP_400_BAD_REQUEST)
 
+def _account_gone():
+    return Response({
+        'success': False,
+        'message': 'User not found or inactive'
+    }, status=status.HTTP_401_UNAUTHORIZED)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile(request):
     """Get user profile"""
-    user = request.user
-    user_profiles = get_collection('user_profiles')
-    profile = user_profiles.find_one({'user_id': user.id})
+    # A cache hit; request.user may be built from token claims, which carry no profile
+    user_identity = identity.get_identity(request.user.id)
+    if user_identity is None or not user_identity.is_active:
+        # Deleted or deactivated since the (claims-trusted) token was issued
+        return _account_gone()
 
     return Response({
         'success': True,
-        'user': {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'phone': profile.get('phone', '') if profile else '',
-            'address': profile.get('address', '') if profile else '',
-            'is_staff': user.is_staff
-        }
+        'user': user_identity.as_dict()
     })
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_profile(request):
     """Update user profile"""
-    user = request.user
+    # request.user is a read-only Identity; load the model to save it
+    user = User.objects.filter(pk=request.user.id, is_active=True).first()
+    if user is None:
+        return _account_gone()
     data = request.data
 
     # Update Django user fields
@@ -123,6 +131,7 @@ def update_profile(request):
         },
         upsert=True
     )
+    identity.invalidate(user.id)
 
     return Response({
         'success': True,
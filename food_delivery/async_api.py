@@ -0,0 +1,78 @@
+"""
+Plumbing for async API views served under ASGI.
+
+DRF 3.14 views are synchronous, so the async variants of the hot endpoints
+(menu/async_views.py, orders/async_views.py) are plain Django async views
+wrapped with `async_api_view`. It does what `@api_view` and
+`@permission_classes` do for the sync views: method check, JWT
+authentication, permission check and JSON body parsing. Responses are
+rendered with mongo_json, like MongoJSONRenderer does.
+"""
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from accounts.identity import CachedJWTAuthentication
+from mongo_json import dumps
+import functools
+import json
+
+ALLOW_ANY = 'allow_any'
+IS_AUTHENTICATED = 'is_authenticated'
+IS_ADMIN_USER = 'is_admin_user'
+
+_authentication = CachedJWTAuthentication()
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(dumps(data), status=status, headers=headers, content_type='application/json')
+
+def _error(detail, status):
+    headers = {'WWW-Authenticate': _authentication.authenticate_header(None)} if status == 401 else None
+    return json_response(detail if isinstance(detail, dict) else {'detail': detail}, status, headers)
+
+async def _authenticate(request, authenticators):
+    for authenticator in authenticators:
+        result = await authenticator.aauthenticate(request)
+        if result:
+            return result[0]
+    return AnonymousUser()
+
+def _parse_body(request):
+    if not request.body:
+        return {}
+    return json.loads(request.body)
+
+def async_api_view(methods, permission=ALLOW_ANY, authentication=None):
+    """
+    Decorate an async view taking `request` with `.user` and `.data` set;
+    `authentication` lists authenticators with `aauthenticate(request)`, tried in order
+    """
+    authenticators = authentication or [_authentication]
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _error(f'Method "{request.method}" not allowed.', 405)
+
+            try:
+                request.user = await _authenticate(request, authenticators)
+            except APIException as e:
+                return _error(e.detail, e.status_code)
+
+            if permission != ALLOW_ANY and not request.user.is_authenticated:
+                return _error('Authentication credentials were not provided.', 401)
+            if permission == IS_ADMIN_USER and not request.user.is_staff:
+                return _error('You do not have permission to perform this action.', 403)
+
+            try:
+                request.data = _parse_body(request) if request.method in ('POST', 'PUT', 'PATCH') else {}
+            except ValueError as e:
+                return _error(f'JSON parse error - {e}', 400)
+
+            return await view(request, *args, **kwargs)
+
+        # Token authentication, like the DRF views
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
@@ -0,0 +1,2 @@
+# Benchmarks and stress checks that run against a local MongoDB.
+# Run them from the project root, e.g. `python -m benchmarks.cart_concurrency`.
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - WSGI vs ASGI Load Comparison
+Drives the same request mix against a WSGI and an ASGI deployment of the app
+with many concurrent keep-alive connections and reports throughput and
+latency percentiles for each.
+
+Start both servers first, e.g.:
+    gunicorn srinu_foods.wsgi:application -w 4 --threads 8 -b :8000
+    uvicorn srinu_foods.asgi:application --workers 4 --port 8001
+then run:
+    python benchmarks/asgi_load.py --target wsgi=http://localhost:8000 \\
+        --target asgi=http://localhost:8001 --connections 1000
+"""
+
+import os
+import sys
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# (weight, method, path) - mostly menu browsing, some cart traffic
+WORKLOAD = [
+    (40, 'GET', '/api/menu/items/'),
+    (15, 'GET', '/api/menu/categories/'),
+    (10, 'GET', '/api/menu/items/?category=Biryanis'),
+    (20, 'GET', '/api/menu/cart/'),
+    (10, 'GET', '/api/orders/my-orders/'),
+    (5, 'GET', '/api/orders/admin/dashboard/stats/'),
+]
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client; enough for JSON API responses"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed')
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding' and 'chunked' in value.lower():
+                chunked = True
+            elif name == 'connection' and value.lower() == 'close':
+                close = True
+
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+async def run_target(base_url, args, headers):
+    url = urlsplit(base_url)
+    paths = [(method, path) for weight, method, path in WORKLOAD for _ in range(weight)]
+    latencies, errors = [], 0
+    deadline = time.monotonic() + args.duration
+
+    async def client(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        connection = Connection(url.hostname, url.port or 80)
+        while time.monotonic() < deadline:
+            method, path = rng.choice(paths)
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(connection.request(method, path, headers), args.timeout)
+                if status >= 500:
+                    errors += 1
+                else:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except (OSError, asyncio.TimeoutError, ConnectionError, ValueError):
+                errors += 1
+                connection.close()
+        connection.close()
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(n) for n in range(args.connections)))
+    elapsed = time.monotonic() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                        help='deployment to test; repeat for each (e.g. wsgi=http://localhost:8000)')
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30, help='seconds per target')
+    parser.add_argument('--timeout', type=float, default=30, help='seconds before a request counts as failed')
+    parser.add_argument('--token', default=os.environ.get('BENCH_TOKEN', ''),
+                        help='staff JWT access token for the cart, order and stats endpoints')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    headers = {'Accept': 'application/json'}
+    if args.token:
+        headers['Authorization'] = f'Bearer {args.token}'
+
+    results = {}
+    for target in args.target:
+        name, _, base_url = target.partition('=')
+        print(f"🍽️ {name}: {args.connections} connections for {args.duration:.0f}s against {base_url}",
+              file=sys.stderr)
+        results[name] = asyncio.run(run_target(base_url, args, headers))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'target':<10}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>9}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['rps']:>10,.0f}{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms"
+              f"{result['p99_ms']:>8.1f}ms{result['errors']:>9}")
+
+if __name__ == '__main__':
+    main()
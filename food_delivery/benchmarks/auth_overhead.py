@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Authentication Overhead Benchmark
+Measures what resolving request.user costs per request with three
+strategies, optionally while other threads keep writing to auth_user the
+way update_profile and registrations do:
+
+  lookup   simplejwt's JWTAuthentication, one SQLite query per request
+  cache    CachedJWTAuthentication with the identity cache
+  claims   CachedJWTAuthentication with IDENTITY_CACHE['TRUST_TOKEN_CLAIMS']
+
+    python -m benchmarks.auth_overhead --threads 8 --writers 2
+
+Uses the bench_user_* accounts from benchmarks/datagen.py.
+"""
+
+import os
+import sys
+import argparse
+import json
+import random
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts import identity
+from accounts.identity import CachedJWTAuthentication
+from benchmarks.datagen import USERNAME_PREFIX
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def writer(user_ids, stop):
+    """Keeps SQLite busy with user writes, like update_profile"""
+    rng = random.Random()
+    while not stop.is_set():
+        User.objects.filter(pk=rng.choice(user_ids)).update(first_name=f'Bench{rng.randrange(1000)}')
+    close_old_connections()
+
+def run_mode(authentication, requests, args):
+    samples = []
+    lock = threading.Lock()
+    per_thread = args.requests // args.threads
+
+    def reader(seed):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(per_thread):
+            request = rng.choice(requests)
+            start = time.perf_counter()
+            user, _ = authentication.authenticate(request)
+            local.append((time.perf_counter() - start) * 1e6)
+        with lock:
+            samples.extend(local)
+        close_old_connections()
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        'requests': len(samples),
+        'per_second': round(len(samples) / elapsed),
+        'mean_us': round(sum(samples) / len(samples), 1),
+        'p50_us': round(percentile(samples, 0.50), 1),
+        'p95_us': round(percentile(samples, 0.95), 1),
+        'p99_us': round(percentile(samples, 0.99), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000, help='authentications per mode')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=0, help='threads writing to auth_user meanwhile')
+    parser.add_argument('--accounts', type=int, default=1000)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id')[:args.accounts])
+    if not users:
+        sys.exit("❌ No benchmark users found; run `python -m benchmarks.datagen` first")
+
+    factory = RequestFactory()
+    requests = [
+        factory.get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Bearer {identity.issue_tokens(user).access_token}')
+        for user in users
+    ]
+
+    modes = {
+        'lookup': (JWTAuthentication(), False),
+        'cache': (CachedJWTAuthentication(), False),
+        'claims': (CachedJWTAuthentication(), True),
+    }
+
+    results = {}
+    for name, (authentication, trust_claims) in modes.items():
+        identity._cache.clear()
+        stop = threading.Event()
+        writers = [threading.Thread(target=writer, args=([user.id for user in users], stop))
+                   for _ in range(args.writers)]
+        for thread in writers:
+            thread.start()
+
+        print(f"🔐 {name}: {args.requests} authentications on {args.threads} threads"
+              f"{f', {args.writers} writers' if args.writers else ''}...", file=sys.stderr)
+        try:
+            with override_settings(IDENTITY_CACHE={**getattr(settings, 'IDENTITY_CACHE', {}),
+                                                   'TRUST_TOKEN_CLAIMS': trust_claims}):
+                results[name] = run_mode(authentication, requests, args)
+        finally:
+            stop.set()
+            for thread in writers:
+                thread.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'mode':<10}{'auth/s':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['per_second']:>10,}{result['mean_us']:>8.1f}us{result['p50_us']:>8.1f}us"
+              f"{result['p95_us']:>8.1f}us{result['p99_us']:>8.1f}us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Cart Concurrency Check
+Fires parallel adds at a single cart and verifies no update was lost
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from menu import cart_store
+
+def make_line(item_id, quantity):
+    return {
+        'item_id': item_id,
+        'name': f'Item {item_id}',
+        'price': 100.0,
+        'quantity': quantity,
+        'special_instructions': '',
+        'image_url': '',
+        'is_veg': True,
+        'added_at': datetime.now()
+    }
+
+def run(user_id, workers, adds, items):
+    cart_store.clear(user_id)
+
+    # Each add targets one of `items` lines; a fresh cart means the first
+    # adds race on creating the cart and on pushing each new line.
+    jobs = [(f'bench-item-{n % items}', 1) for n in range(adds)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda job: cart_store.add_item(user_id, make_line(*job)), jobs))
+
+    cart = cart_store.get_cart(user_id)
+    cart_store.clear(user_id)
+
+    expected = {}
+    for item_id, quantity in jobs:
+        expected[item_id] = expected.get(item_id, 0) + quantity
+    actual = {line['item_id']: line['quantity'] for line in cart.get('items', [])}
+    return expected, actual
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--adds', type=int, default=2000)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--user-id', type=int, default=-1, help='cart owner used for the run')
+    args = parser.parse_args()
+
+    expected, actual = run(args.user_id, args.workers, args.adds, args.items)
+
+    if expected != actual:
+        print(f"❌ Lost updates: expected {expected}, got {actual}")
+        sys.exit(1)
+
+    print(f"✅ {args.adds} parallel adds across {args.items} lines, no lost updates")
+
+if __name__ == '__main__':
+    main()
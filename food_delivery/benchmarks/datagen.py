@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Synthetic Data Generator
+Bulk-loads benchmark users, a menu and an order history shaped like real
+traffic: a few regulars place most orders, a few dishes dominate sales,
+orders cluster around lunch and dinner and weekends are busier. Each order
+walks through the status pipeline with a `status_history`, spending longer
+in the kitchen for slow dishes and at peak hours; orders placed in the last
+hour or so are still in progress. Orders are generated by a pool of worker
+processes, each inserting in batches.
+
+    python -m benchmarks.datagen --users 20000 --items 400 --orders 1000000
+
+Users are named bench_user_<n> with password bench123 so the workload runner
+(benchmarks/workload.py) can log in as them. --reset first removes previous
+benchmark users and clears the menu, carts and orders.
+"""
+
+import os
+import sys
+import argparse
+import bisect
+import itertools
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from pymongo import ReturnDocument
+from mongo_client import get_collection, mongo_connection
+from mongo_indexes import ensure_indexes
+from menu import catalog
+from orders import checkout, sla, stats as order_stats
+from orders.order_numbers import COUNTER_ID, FIRST_SEQUENCE, PREFIX
+
+USERNAME_PREFIX = 'bench_user_'
+PASSWORD = 'bench123'
+
+FIRST_NAMES = ['Arjun', 'Priya', 'Rahul', 'Sneha', 'Vikram', 'Ananya', 'Karthik', 'Divya', 'Rohan', 'Meera']
+LAST_NAMES = ['Reddy', 'Sharma', 'Iyer', 'Naidu', 'Gupta', 'Rao', 'Menon', 'Patel', 'Kumar', 'Das']
+AREAS = ['MG Road', 'Brigade Road', 'Koramangala', 'Indiranagar', 'Whitefield', 'HSR Layout', 'Jayanagar']
+
+# category -> (median price, share of the menu)
+CATEGORIES = {
+    'Appetizers': (180, 0.18),
+    'Main Course': (280, 0.24),
+    'Biryanis': (320, 0.14),
+    'South Indian': (120, 0.14),
+    'Chinese': (220, 0.12),
+    'Beverages': (80, 0.10),
+    'Desserts': (110, 0.08),
+}
+STYLES = ['Tandoori', 'Butter', 'Chilli', 'Hyderabadi', 'Kadai', 'Malai', 'Crispy', 'Masala', 'Garlic', 'Schezwan']
+BASES = ['Chicken', 'Paneer', 'Mutton', 'Prawn', 'Mushroom', 'Gobi', 'Aloo', 'Egg', 'Fish', 'Dal']
+VEG_BASES = {'Paneer', 'Mushroom', 'Gobi', 'Aloo', 'Dal'}
+INSTRUCTIONS = ['', '', '', '', 'Less spicy', 'Extra spicy', 'No onions', 'Extra sauce']
+
+PIPELINE = ['pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered']
+# status -> (median minutes, lognormal spread) spent in it; preparing depends on the dishes
+STAGE_MINUTES = {
+    'pending': (2.0, 0.6),
+    'confirmed': (3.0, 0.5),
+    'ready': (6.0, 0.5),
+    'out_for_delivery': (22.0, 0.35),
+}
+CANCEL_RATE = 0.07
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights where rank r is drawn with probability ~ 1/r^exponent"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+def pick(rng, population, cum_weights):
+    return population[bisect.bisect(cum_weights, rng.random() * cum_weights[-1])]
+
+def order_time(rng, now, days):
+    """A time in the last `days` days around lunch or dinner, busier on weekends"""
+    while True:
+        day = now - timedelta(days=rng.randrange(days))
+        # Roughly 1.4x the orders on Saturdays and Sundays
+        if day.weekday() >= 5 or rng.random() < 0.7:
+            break
+    if rng.random() < 0.4:
+        hour = rng.gauss(13.0, 1.0)
+    else:
+        hour = rng.gauss(20.5, 1.5)
+    hour = min(max(hour, 10.0), 23.9)
+    moment = day.replace(hour=int(hour), minute=int(hour % 1 * 60), second=rng.randrange(60), microsecond=0)
+    # Later today has not happened yet; use the same time yesterday
+    return moment if moment <= now else moment - timedelta(days=1)
+
+# Set in each worker by _init_worker
+_shared = {}
+
+def _init_worker(users, items, prep_minutes, now, days, batch_size):
+    _shared.update(
+        users=users,
+        prep_minutes=prep_minutes,
+        user_weights=zipf_cum_weights(len(users), 1.1),
+        items=items,
+        item_weights=zipf_cum_weights(len(items), 0.9),
+        now=now,
+        days=days,
+        batch_size=batch_size,
+    )
+
+def rush_factor(moment):
+    """1 off-peak, up to 1.6 at the height of lunch and dinner"""
+    hour = moment.hour + moment.minute / 60
+    return 1 + 0.6 * max(math.exp(-((hour - 13.0) / 1.0) ** 2), math.exp(-((hour - 20.5) / 1.5) ** 2))
+
+def stage_minutes(rng, status, lines, rush):
+    if status == 'preparing':
+        # The slowest dish sets the pace; every extra portion adds a little
+        slowest = max(_shared['prep_minutes'][line['item_id']] for line in lines)
+        portions = sum(line['quantity'] for line in lines)
+        return (slowest + 0.5 * (portions - 1)) * rng.lognormvariate(0, 0.2) * rush
+    median, spread = STAGE_MINUTES[status]
+    return median * rng.lognormvariate(0, spread) * (rush if status in ('pending', 'confirmed') else 1)
+
+def status_history(rng, created_at, lines, now):
+    """Walk an order through PIPELINE from created_at, stopping at `now`"""
+    rush = rush_factor(created_at)
+    cancel_from = rng.randrange(len(PIPELINE) - 2) if rng.random() < CANCEL_RATE else None
+    history = [{'status': 'pending', 'at': created_at}]
+    at = created_at
+    for index, status in enumerate(PIPELINE[:-1]):
+        at += timedelta(minutes=stage_minutes(rng, status, lines, rush))
+        if at > now:
+            break
+        next_status = 'cancelled' if index == cancel_from else PIPELINE[index + 1]
+        history.append({'status': next_status, 'at': at})
+        if next_status == 'cancelled':
+            break
+    return history
+
+def make_order(rng, sequence):
+    user = pick(rng, _shared['users'], _shared['user_weights'])
+
+    lines = {}
+    line_count = min(8, 1 + int(math.log(1 - rng.random()) / math.log(0.45)))
+    for _ in range(line_count):
+        item = pick(rng, _shared['items'], _shared['item_weights'])
+        line = lines.setdefault(item['item_id'], {
+            **item,
+            'quantity': 0,
+            'special_instructions': rng.choice(INSTRUCTIONS),
+        })
+        line['quantity'] += rng.choices((1, 2, 3), (70, 22, 8))[0]
+
+    order = checkout.build_order(user, {
+        'phone': user.phone,
+        'delivery_address': user.address,
+        'payment_method': 'online' if rng.random() < 0.45 else 'cod',
+    }, list(lines.values()), f'{PREFIX}{sequence}')
+
+    created_at = order_time(rng, _shared['now'], _shared['days'])
+    history = status_history(rng, created_at, order['items'], _shared['now'])
+    status = history[-1]['status']
+
+    order.update({
+        'status': status,
+        'status_history': history,
+        'payment_status': 'completed' if order['payment_method'] == 'online' or status == 'delivered' else 'pending',
+        'created_at': created_at,
+        'updated_at': history[-1]['at'],
+        'estimated_delivery_time': created_at + checkout.DELIVERY_ESTIMATE,
+    })
+    return order
+
+def generate_orders(chunk):
+    """Worker: build and insert orders for one contiguous range of order numbers"""
+    first_sequence, count, seed = chunk
+    rng = random.Random(seed)
+    orders = get_collection('orders')
+    batch_size = _shared['batch_size']
+
+    inserted = 0
+    for start in range(0, count, batch_size):
+        batch = [make_order(rng, first_sequence + start + n) for n in range(min(batch_size, count - start))]
+        inserted += len(orders.insert_many(batch, ordered=False).inserted_ids)
+    return inserted
+
+def reset():
+    deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    for name in ('categories', 'menu_items', 'orders', 'carts', 'user_profiles', 'idempotency_keys'):
+        get_collection(name).delete_many({})
+    print(f"🧹 Removed {deleted} benchmark users and cleared the menu, carts and orders")
+
+def create_users(count, rng, batch_size):
+    existing = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    password = make_password(PASSWORD)
+    profiles = get_collection('user_profiles')
+    now = datetime.now()
+
+    for start in range(existing, count, batch_size):
+        users = []
+        for n in range(start, min(start + batch_size, count)):
+            users.append(User(
+                username=f'{USERNAME_PREFIX}{n}',
+                email=f'{USERNAME_PREFIX}{n}@example.com',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            ))
+        User.objects.bulk_create(users, batch_size=batch_size)
+
+    users = []
+    for user in User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id')[:count]:
+        users.append(SimpleNamespace(
+            id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            email=user.email,
+            phone=f'+91-{rng.randint(7000000000, 9999999999)}',
+            address=f'{rng.randint(1, 999)} {rng.choice(AREAS)}, Bangalore - {rng.randint(560001, 560100)}',
+        ))
+
+    profiles.delete_many({'user_id': {'$in': [user.id for user in users]}})
+    for start in range(0, len(users), batch_size):
+        profiles.insert_many([{
+            'user_id': user.id,
+            'phone': user.phone,
+            'address': user.address,
+            'created_at': now,
+            'updated_at': now
+        } for user in users[start:start + batch_size]], ordered=False)
+
+    # Shuffled so the heaviest users are not simply the oldest accounts
+    rng.shuffle(users)
+    return users
+
+def create_menu(count, rng):
+    categories = get_collection('categories')
+    menu_items = get_collection('menu_items')
+    now = datetime.now()
+
+    categories.insert_many([{
+        'name': name,
+        'description': f'{name} from the Srinu Foods kitchen',
+        'image_url': '',
+        'is_active': True,
+        'sort_order': order,
+        'created_at': now
+    } for order, name in enumerate(CATEGORIES, 1)])
+
+    names, shares = zip(*((name, share) for name, (_, share) in CATEGORIES.items()))
+    documents = []
+    for n in range(count):
+        category = rng.choices(names, shares)[0]
+        base = rng.choice(BASES)
+        documents.append({
+            'name': f'{rng.choice(STYLES)} {base} {category.split()[0]} #{n}',
+            'description': f'{base} prepared {category.lower()} style',
+            # Prices are skewed: most near the category median, a few premium dishes
+            'price': float(round(rng.lognormvariate(math.log(CATEGORIES[category][0]), 0.35))),
+            'category': category,
+            'image_url': '',
+            'is_available': rng.random() < 0.97,
+            'is_veg': base in VEG_BASES,
+            'preparation_time': max(5, int(rng.gauss(25, 10))),
+            'rating': round(min(5.0, max(3.0, rng.gauss(4.3, 0.3))), 1),
+            'ingredients': f'{base}, Spices',
+            'created_at': now,
+            'updated_at': now
+        })
+    menu_items.insert_many(documents, ordered=False)
+
+    items = [{
+        'item_id': str(document['_id']),
+        'name': document['name'],
+        'price': document['price'],
+        'image_url': '',
+        'is_veg': document['is_veg']
+    } for document in documents if document['is_available']]
+    # Popularity follows menu position after shuffling
+    rng.shuffle(items)
+    prep_minutes = {str(document['_id']): document['preparation_time'] for document in documents}
+    return items, prep_minutes
+
+def lease_order_numbers(count):
+    """Reserve `count` order numbers so live orders never collide with generated ones"""
+    counter = get_collection('counters').find_one_and_update(
+        {'_id': COUNTER_ID},
+        {'$inc': {'seq': count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return FIRST_SEQUENCE + counter['seq'] - count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=300)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=90, help='spread orders over this many days')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=1000, help='documents per insert_many')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='orders per worker task')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='clear the menu, carts, orders and benchmark users first')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    if args.reset:
+        reset()
+    ensure_indexes()
+
+    print(f"👥 Creating {args.users} users...")
+    users = create_users(args.users, rng, args.batch_size)
+
+    print(f"🍽️ Creating {args.items} menu items...")
+    items, prep_minutes = create_menu(args.items, rng)
+    catalog.invalidate()
+
+    print(f"📦 Generating {args.orders} orders with {args.workers} workers...")
+    first_sequence = lease_order_numbers(args.orders)
+    chunks = [
+        (first_sequence + start, min(args.chunk_size, args.orders - start), args.seed * 1000003 + start)
+        for start in range(0, args.orders, args.chunk_size)
+    ]
+
+    # Workers open their own MongoDB clients; don't hand them ours
+    mongo_connection.close()
+    order_start = time.perf_counter()
+    inserted = 0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(users, items, prep_minutes, datetime.now(), args.days, args.batch_size)) as pool:
+        for count in pool.map(generate_orders, chunks):
+            inserted += count
+            rate = inserted / (time.perf_counter() - order_start)
+            print(f"   {inserted:>10,} / {args.orders:,} orders ({rate:,.0f}/s)", end='\r')
+    print()
+
+    print("📊 Rebuilding dashboard stats...")
+    order_stats.rebuild()
+
+    print("⏱️ Rebuilding stage stats...")
+    sla.rebuild()
+
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+    for name in ('menu_items', 'orders', 'user_profiles'):
+        print(f"   📄 {name}: {get_collection(name).estimated_document_count():,} documents")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Delivery ETA Replay
+Replays the status history of past orders through the ETA engine in time
+order, as if they were happening live, and compares each estimate with the
+actual delivery time:
+
+  fixed      created_at + 45 minutes, the old estimate
+  placed     the engine's estimate when the order is placed
+  confirmed  its estimate once the order is confirmed
+  ready      its estimate once the food is ready
+
+The first --warmup share of orders only trains the engine and is left out
+of the error figures. Cancelled orders are skipped.
+
+    python -m benchmarks.eta_replay --days 30
+
+Run benchmarks/datagen.py first for a history to replay.
+"""
+
+import os
+import sys
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from mongo_client import get_collection
+from menu import catalog
+from orders import checkout, eta
+from benchmarks.workload import percentile
+
+CHECKPOINTS = ('confirmed', 'ready')
+
+def summarize(errors):
+    """errors are actual minus estimated delivery time, in minutes"""
+    absolute = sorted(abs(error) for error in errors)
+    return {
+        'orders': len(errors),
+        'mae_min': round(sum(absolute) / len(absolute), 2),
+        'p50_abs_min': round(percentile(absolute, 0.50), 2),
+        'p90_abs_min': round(percentile(absolute, 0.90), 2),
+        'bias_min': round(sum(errors) / len(errors), 2),
+        'within_10_min': round(sum(error <= 10 for error in absolute) / len(absolute), 3),
+    }
+
+def replay(orders, snapshot, warmup):
+    engine = eta.EtaEngine()
+    estimates = {}
+    errors = {name: [] for name in ('fixed', 'placed', *CHECKPOINTS)}
+    scored = {str(order['_id']) for order in orders[int(len(orders) * warmup):]}
+    timings = []
+
+    for at, order, status in eta.history_events(orders):
+        order_id = str(order['_id'])
+        if status == 'pending':
+            prep = eta.prep_seconds(order.get('items', []), snapshot)
+            start = time.perf_counter()
+            placed = engine.estimate_new(prep, at)
+            timings.append(time.perf_counter() - start)
+            estimates[order_id] = {'fixed': at + checkout.DELIVERY_ESTIMATE, 'placed': placed}
+            engine.add(order_id, at, prep, order.get('user_id'), order.get('order_number'))
+            continue
+
+        engine.transition(order_id, status, at)
+        if status in CHECKPOINTS and order_id in estimates:
+            start = time.perf_counter()
+            estimates[order_id][status] = engine.estimate(order_id, at)
+            timings.append(time.perf_counter() - start)
+        elif status == 'delivered' and order_id in scored:
+            for name, estimate in estimates.pop(order_id, {}).items():
+                errors[name].append((at - estimate).total_seconds() / 60)
+        elif status in eta.FINAL:
+            estimates.pop(order_id, None)
+
+    timings.sort()
+    return {name: summarize(values) for name, values in errors.items() if values}, timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30, help='replay orders placed in the last N days')
+    parser.add_argument('--limit', type=int, default=200000, help='at most this many orders (the newest)')
+    parser.add_argument('--warmup', type=float, default=0.1, help='share of orders used only for training')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    since = datetime.now() - timedelta(days=args.days)
+    orders = list(
+        get_collection('orders')
+        .find({'created_at': {'$gte': since}, 'status_history.1': {'$exists': True}}, eta.ORDER_PROJECTION)
+        .sort([('created_at', -1), ('_id', -1)])
+        .limit(args.limit)
+    )
+    if not orders:
+        sys.exit("❌ No orders with a status history found; run `python -m benchmarks.datagen` first")
+    orders.reverse()
+
+    print(f"⏱️ Replaying {len(orders):,} orders from the last {args.days} days...", file=sys.stderr)
+    started = time.perf_counter()
+    results, timings = replay(orders, catalog.get_snapshot(), args.warmup)
+    elapsed = time.perf_counter() - started
+
+    cost = {
+        'estimates': len(timings),
+        'p50_us': round(percentile(timings, 0.50) * 1e6, 2),
+        'p99_us': round(percentile(timings, 0.99) * 1e6, 2),
+    }
+
+    if args.json:
+        print(json.dumps({'errors': results, 'estimate_cost': cost, 'replay_seconds': round(elapsed, 2)}, indent=2))
+        return
+
+    print(f"\n{'estimate':<12}{'orders':>9}{'MAE':>10}{'p50 |err|':>12}{'p90 |err|':>12}{'bias':>10}{'±10 min':>10}")
+    for name, summary in results.items():
+        print(f"{name:<12}{summary['orders']:>9,}{summary['mae_min']:>7.1f}min{summary['p50_abs_min']:>9.1f}min"
+              f"{summary['p90_abs_min']:>9.1f}min{summary['bias_min']:>+7.1f}min{summary['within_10_min']:>10.1%}")
+    print(f"\n⚡ {cost['estimates']:,} estimates: p50 {cost['p50_us']}µs, p99 {cost['p99_us']}µs "
+          f"(replay took {elapsed:.1f}s)")
+
+if __name__ == '__main__':
+    main()
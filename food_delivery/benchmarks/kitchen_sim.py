@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Kitchen Scheduling Simulation
+Replays the arrivals of past orders (their created_at and items) into a
+simulated kitchen with N stations and cooks them two ways:
+
+  fifo     one order line at a time, oldest first
+  batched  orders/kitchen.py: lines of the same dish cooked together, best
+           portions per minute first, anything waiting MAX_WAIT goes first
+
+Cooking a batch takes the dish's preparation_time plus PORTION_OVERHEAD of
+it for each extra portion, for both policies. An order's kitchen time runs
+from when it is placed until its last dish is cooked. Throughput is orders
+cooked per station-hour of cooking.
+
+    python -m benchmarks.kitchen_sim --days 7 --stations 8 12 16
+
+Run benchmarks/datagen.py first for a history to replay.
+"""
+
+import os
+import sys
+import argparse
+import heapq
+import json
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from mongo_client import get_collection
+from menu import catalog
+from orders import kitchen
+from benchmarks.workload import percentile
+
+POLICIES = ('fifo', 'batched')
+
+def simulate(orders, prep_seconds, config, stations, batching):
+    queue = kitchen.KitchenQueue(prep_seconds, config)
+    free = [(orders[0]['created_at'], station) for station in range(stations)]
+    lines_left, finished, start_waits = {}, {}, []
+    cooking, batches = 0.0, 0
+    arrived = 0
+    at = orders[0]['created_at']
+
+    while arrived < len(orders) or queue.dishes:
+        free_at, station = heapq.heappop(free)
+        # Stations left idle by an empty queue start no earlier than the last batch
+        at = max(at, free_at)
+        if not queue.dishes:
+            at = max(at, orders[arrived]['created_at'])
+        while arrived < len(orders) and orders[arrived]['created_at'] <= at:
+            order = orders[arrived]
+            queue.add(order['_id'], order['created_at'], order['items'])
+            lines_left[order['_id']] = len(order['items'])
+            arrived += 1
+
+        batch = queue.next_batch(at, batching)
+        done = at + timedelta(seconds=batch.seconds)
+        cooking += batch.seconds
+        batches += 1
+        start_waits.append((at - batch.oldest).total_seconds())
+        for line in batch.lines:
+            lines_left[line.order_id] -= 1
+            if not lines_left[line.order_id]:
+                finished[line.order_id] = (done - line.created_at).total_seconds() / 60
+        heapq.heappush(free, (done, station))
+
+    last_done = max(done for done, _ in free)
+    kitchen_minutes = sorted(finished.values())
+    start_waits.sort()
+    return {
+        'orders': len(finished),
+        'batches': batches,
+        'station_hours': round(cooking / 3600, 1),
+        'orders_per_station_hour': round(len(finished) / (cooking / 3600), 2),
+        'utilisation': round(cooking / (stations * (last_done - orders[0]['created_at']).total_seconds()), 3),
+        'mean_kitchen_min': round(sum(kitchen_minutes) / len(kitchen_minutes), 1),
+        'p50_kitchen_min': round(percentile(kitchen_minutes, 0.50), 1),
+        'p95_kitchen_min': round(percentile(kitchen_minutes, 0.95), 1),
+        'max_kitchen_min': round(kitchen_minutes[-1], 1),
+        'max_start_wait_min': round(start_waits[-1] / 60, 1),
+    }
+
+def main():
+    config = kitchen.get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7, help='replay orders placed in the last N days')
+    parser.add_argument('--stations', type=int, nargs='+', default=[config['STATIONS']],
+                        help='station counts to simulate')
+    parser.add_argument('--batch-limit', type=int, default=config['BATCH_LIMIT'])
+    parser.add_argument('--max-wait', type=int, default=config['MAX_WAIT'], help='seconds')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    config.update({'BATCH_LIMIT': args.batch_limit, 'MAX_WAIT': args.max_wait})
+
+    since = datetime.now() - timedelta(days=args.days)
+    orders = [
+        {'_id': str(order['_id']), 'created_at': order['created_at'], 'items': order['items']}
+        for order in get_collection('orders')
+        .find({'created_at': {'$gte': since}, 'items.0': {'$exists': True}},
+              {'created_at': 1, 'items.item_id': 1, 'items.quantity': 1})
+        .sort([('created_at', 1), ('_id', 1)])
+    ]
+    if not orders:
+        sys.exit("❌ No orders found; run `python -m benchmarks.datagen` first")
+
+    prep_seconds = kitchen.catalog_prep_seconds(catalog.get_snapshot())
+    print(f"🍳 Simulating {len(orders):,} orders from the last {args.days} days...", file=sys.stderr)
+
+    results = []
+    for stations in args.stations:
+        for policy in POLICIES:
+            started = time.perf_counter()
+            result = simulate(orders, prep_seconds, config, stations, batching=policy == 'batched')
+            result.update({'stations': stations, 'policy': policy,
+                           'simulation_seconds': round(time.perf_counter() - started, 2)})
+            results.append(result)
+
+    if args.json:
+        print(json.dumps({'config': config, 'results': results}, indent=2, default=str))
+        return
+
+    print(f"\n{'stations':<10}{'policy':<9}{'batches':>9}{'orders/stn-h':>14}{'busy':>8}"
+          f"{'mean':>12}{'p95':>12}{'max':>12}{'max start wait':>16}")
+    for result in results:
+        print(f"{result['stations']:<10}{result['policy']:<9}{result['batches']:>9,}"
+              f"{result['orders_per_station_hour']:>14.2f}{result['utilisation']:>8.0%}"
+              f"{result['mean_kitchen_min']:>9.1f}min{result['p95_kitchen_min']:>9.1f}min"
+              f"{result['max_kitchen_min']:>9.1f}min{result['max_start_wait_min']:>13.1f}min")
+
+    for fifo, batched in zip(results[::2], results[1::2]):
+        gain = batched['orders_per_station_hour'] / fifo['orders_per_station_hour'] - 1
+        print(f"⚡ {fifo['stations']} stations: {gain:+.0%} throughput over FIFO, "
+              f"p95 kitchen time {fifo['p95_kitchen_min']:.0f} → {batched['p95_kitchen_min']:.0f} min")
+
+if __name__ == '__main__':
+    main()
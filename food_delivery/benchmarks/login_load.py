@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Login Burst Load Test
+Runs a burst of logins alongside ordinary menu browsing and reports latency
+for both, to show how much password hashing slows everyone else down.
+
+In-process (default) it runs twice, with hashing inline (PASSWORD_POOL
+WORKERS = 0) and in the process pool. Against servers, start one per
+configuration and name them, e.g.:
+
+    python -m benchmarks.login_load --target inline=http://localhost:8000 \\
+        --target pool=http://localhost:8001 --login-threads 8 --browse-threads 16
+
+Logs in as the bench_user_* accounts from benchmarks/datagen.py.
+"""
+
+import os
+import sys
+import argparse
+import json
+import random
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from benchmarks.datagen import PASSWORD, USERNAME_PREFIX
+from benchmarks.workload import HTTPTransport, InProcessTransport, percentile
+
+BROWSE_PATHS = ['/api/menu/items/', '/api/menu/categories/', '/api/menu/items/?is_veg=true']
+
+def summarize(samples, errors):
+    samples = sorted(samples)
+    if not samples:
+        return {'requests': 0, 'errors': errors}
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'p50_ms': round(percentile(samples, 0.50), 2),
+        'p95_ms': round(percentile(samples, 0.95), 2),
+        'p99_ms': round(percentile(samples, 0.99), 2),
+    }
+
+def run(transport, usernames, args):
+    samples = {'login': [], 'browse': []}
+    errors = {'login': 0, 'browse': 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+
+    def loop(kind, seed):
+        rng = random.Random(seed)
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            if kind == 'login':
+                request = ('POST', '/api/auth/login/', {'username': rng.choice(usernames), 'password': PASSWORD})
+            else:
+                request = ('GET', rng.choice(BROWSE_PATHS), None)
+            start = time.perf_counter()
+            try:
+                status, _ = transport.request(*request)
+            except Exception:
+                status = 599
+            local.append((time.perf_counter() - start) * 1000)
+            failed += status >= 400
+        with lock:
+            samples[kind].extend(local)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=loop, args=('login', n)) for n in range(args.login_threads)]
+    threads += [threading.Thread(target=loop, args=('browse', 1000 + n)) for n in range(args.browse_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {kind: summarize(samples[kind], errors[kind]) for kind in samples}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', metavar='NAME=URL', help='server to test; repeat for each')
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--browse-threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='seconds per run')
+    parser.add_argument('--workers', type=int, default=2, help='pool size for the in-process pool run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    usernames = list(User.objects.filter(username__startswith=USERNAME_PREFIX)
+                     .order_by('id').values_list('username', flat=True)[:1000])
+    if not usernames:
+        sys.exit("❌ No benchmark users found; run `python -m benchmarks.datagen` first")
+
+    results = {}
+    if args.target:
+        for target in args.target:
+            name, _, url = target.partition('=')
+            print(f"🔐 {name}: logins and browsing against {url} for {args.duration:.0f}s...", file=sys.stderr)
+            results[name] = run(HTTPTransport(url), usernames, args)
+    else:
+        pool_settings = getattr(settings, 'PASSWORD_POOL', {})
+        for name, workers in (('inline', 0), ('pool', args.workers)):
+            print(f"🔐 {name}: logins and browsing in-process for {args.duration:.0f}s...", file=sys.stderr)
+            with override_settings(PASSWORD_POOL={**pool_settings, 'WORKERS': workers}):
+                results[name] = run(InProcessTransport(), usernames, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n{'run':<10}{'traffic':<9}{'requests':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    for name, result in results.items():
+        for kind, summary in result.items():
+            if not summary['requests']:
+                continue
+            print(f"{name:<10}{kind:<9}{summary['requests']:>10}{summary['p50_ms']:>8.1f}ms"
+                  f"{summary['p95_ms']:>8.1f}ms{summary['p99_ms']:>8.1f}ms{summary['errors']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Order Ingestion Burst Benchmark
+Fires a lunch-rush burst of orders from many threads at once and compares the
+latency each request spends writing its order: a synchronous insert_one into
+MongoDB versus appending to the write-behind queue (orders/ingestion.py),
+which a background worker drains with insert_many
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from bson import ObjectId
+from mongo_client import get_collection
+from orders.ingestion import OrderQueue, OrderIngestor
+
+BENCH_COLLECTION = 'bench_orders'
+
+def make_order(n):
+    now = datetime.now()
+    return {
+        'order_number': f'BENCH{n}',
+        'user_id': n % 500,
+        'customer_name': f'Customer {n}',
+        'customer_email': f'customer{n}@example.com',
+        'customer_phone': '9876543210',
+        'delivery_address': 'Hitech City, Hyderabad',
+        'items': [
+            {'item_id': str(ObjectId()), 'name': 'Chicken Biryani', 'price': 350.0, 'quantity': 2},
+            {'item_id': str(ObjectId()), 'name': 'Masala Chai', 'price': 30.0, 'quantity': 1},
+        ],
+        'subtotal': 730.0,
+        'delivery_fee': 0,
+        'total_amount': 730.0,
+        'payment_method': 'cod',
+        'payment_status': 'pending',
+        'status': 'pending',
+        'special_instructions': '',
+        'created_at': now,
+        'updated_at': now,
+        'estimated_delivery_time': now + timedelta(minutes=45)
+    }
+
+def burst(write, orders, threads):
+    """Run `write` for every order with all threads released at once; returns latencies in ms"""
+    gate = threading.Barrier(threads)
+    chunks = [orders[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        gate.wait()
+        samples = []
+        for order in chunk:
+            start = time.perf_counter()
+            write(order)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return [sample for samples in pool.map(worker, chunks) for sample in samples]
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def report(label, samples, elapsed):
+    print(f"{label:<14}{statistics.median(samples):>9.2f}ms{percentile(samples, 0.95):>9.2f}ms"
+          f"{percentile(samples, 0.99):>9.2f}ms{max(samples):>9.2f}ms{len(samples) / elapsed:>10,.0f}/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--synchronous', default='FULL', help='SQLite synchronous pragma for the queue')
+    args = parser.parse_args()
+
+    collection = get_collection(BENCH_COLLECTION)
+    collection.drop()
+    print(f"🍽️ Burst of {args.orders} orders from {args.threads} threads into '{BENCH_COLLECTION}'")
+    print(f"\n{'mode':<14}{'p50':>11}{'p95':>11}{'p99':>11}{'max':>11}{'rate':>12}")
+
+    try:
+        # Synchronous insert, as create_order does by default
+        orders = [make_order(n) for n in range(args.orders)]
+        start = time.perf_counter()
+        sync_samples = burst(collection.insert_one, orders, args.threads)
+        report('insert_one', sync_samples, time.perf_counter() - start)
+        collection.drop()
+
+        # Write-behind: requests only append to the local queue
+        with tempfile.TemporaryDirectory() as queue_dir:
+            queue = OrderQueue(os.path.join(queue_dir, 'queue.sqlite3'), args.orders, args.synchronous)
+            ingestor = OrderIngestor(queue, collection_name=BENCH_COLLECTION,
+                                     batch_size=args.batch_size, flush_interval=0.01)
+            orders = [{**make_order(n), '_id': ObjectId()} for n in range(args.orders)]
+
+            start = time.perf_counter()
+            queued_samples = burst(ingestor.submit, orders, args.threads)
+            report('write-behind', queued_samples, time.perf_counter() - start)
+
+            while len(queue):
+                time.sleep(0.01)
+            drained = time.perf_counter() - start
+            ingestor.stop()
+            queue.close()
+
+        stored = collection.count_documents({})
+        print(f"\n   Queue drained into MongoDB {drained:.2f}s after the burst started ({stored} orders)")
+        print(f"   p99 improvement: {percentile(sync_samples, 0.99) / percentile(queued_samples, 0.99):.1f}x")
+
+        if stored != args.orders:
+            print(f"❌ Expected {args.orders} orders, found {stored}")
+            sys.exit(1)
+        print("✅ Every queued order was written exactly once")
+    finally:
+        collection.drop()
+
+if __name__ == '__main__':
+    main()
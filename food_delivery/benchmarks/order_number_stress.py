@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Order Number Stress Check
+Allocates order numbers from several processes at once and verifies that
+no number is handed out twice. The run leases from a scratch counter
+(`stress_<random>`), deleted afterwards, so the real order numbers in the
+configured database are not advanced.
+"""
+
+import os
+import sys
+import argparse
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from mongo_client import get_collection
+from orders.order_numbers import OrderNumberAllocator
+
+def allocate(args):
+    count, threads, block_size, counter_id = args
+    allocator = OrderNumberAllocator(block_size=block_size, counter_id=counter_id)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda _: allocator.next_order_number(), range(count)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=4, help='threads per process')
+    parser.add_argument('--per-process', type=int, default=20000)
+    parser.add_argument('--block-size', type=int, default=50)
+    args = parser.parse_args()
+
+    counter_id = f'stress_{uuid.uuid4().hex}'
+    jobs = [(args.per_process, args.threads, args.block_size, counter_id)] * args.processes
+    start = time.perf_counter()
+    try:
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            results = pool.map(allocate, jobs)
+        elapsed = time.perf_counter() - start
+    finally:
+        get_collection('counters').delete_one({'_id': counter_id})
+
+    numbers = [number for batch in results for number in batch]
+    duplicates = len(numbers) - len(set(numbers))
+
+    print(f"📦 {len(numbers)} order numbers from {args.processes} processes in {elapsed:.2f}s "
+          f"({len(numbers) / elapsed:,.0f}/s)")
+    print(f"   Range: {min(numbers)} .. {max(numbers)}")
+
+    if duplicates:
+        print(f"❌ {duplicates} duplicate order numbers")
+        sys.exit(1)
+    print("✅ No collisions")
+
+if __name__ == '__main__':
+    main()
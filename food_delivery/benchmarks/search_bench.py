@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Menu Search Benchmark
+Compares the old unanchored $regex query against the in-process search index
+on a catalog inflated to --items documents (50k by default), and reports
+typeahead latency of the suggest index on the same catalog
+"""
+
+import os
+import sys
+import argparse
+import random
+import re
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from mongo_client import get_collection
+from menu.search import SearchIndex, SuggestIndex
+
+BENCH_COLLECTION = 'bench_menu_items'
+
+STYLES = ['Tandoori', 'Butter', 'Chilli', 'Hyderabadi', 'Kadai', 'Malai', 'Crispy', 'Masala', 'Garlic', 'Schezwan']
+BASES = ['Chicken', 'Paneer', 'Mutton', 'Prawn', 'Mushroom', 'Gobi', 'Aloo', 'Egg', 'Fish', 'Dal']
+DISHES = ['Biryani', 'Tikka', 'Curry', 'Fried Rice', 'Noodles', 'Dosa', 'Roll', 'Kebab', 'Pulao', 'Soup']
+CATEGORIES = ['Appetizers', 'Main Course', 'Biryanis', 'South Indian', 'Chinese', 'Beverages', 'Desserts']
+WORDS = ['aromatic', 'spiced', 'tender', 'creamy', 'smoky', 'tangy', 'fresh', 'rich', 'slow cooked', 'grilled']
+
+SUGGEST_QUERIES = ['c', 'ch', 'chi', 'chicken b', 'masala d', 'pa', 'tandoori paneer t']
+QUERIES = ['biryani', 'chick', 'paneer tikka', 'garlic noodles', 'smoky', 'masala dosa', 'prawn', 'xyz']
+
+def make_items(count, seed):
+    rng = random.Random(seed)
+    items = []
+    for n in range(count):
+        style, base, dish = rng.choice(STYLES), rng.choice(BASES), rng.choice(DISHES)
+        items.append({
+            'name': f'{style} {base} {dish} #{n}',
+            'description': f'{rng.choice(WORDS).capitalize()} {base.lower()} {dish.lower()} with {rng.choice(WORDS)} spices',
+            'price': float(rng.randint(30, 500)),
+            'category': rng.choice(CATEGORIES),
+            'is_available': True,
+            'is_veg': base in ('Paneer', 'Mushroom', 'Gobi', 'Aloo', 'Dal'),
+            'preparation_time': rng.randint(5, 60),
+            'rating': round(rng.uniform(3.5, 5.0), 1),
+            'ingredients': f'{base}, Spices'
+        })
+    return items
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0],
+        'mean': statistics.mean(samples)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🍽️ Inflating catalog to {args.items} items in '{BENCH_COLLECTION}'...")
+    collection = get_collection(BENCH_COLLECTION)
+    collection.delete_many({})
+    collection.insert_many(make_items(args.items, args.seed))
+
+    documents = list(collection.find({'is_available': True}).sort('name', 1))
+    start = time.perf_counter()
+    index = SearchIndex(documents)
+    print(f"   Index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"\n{'query':<16}{'regex p50':>12}{'regex p95':>12}{'index p50':>12}{'index p95':>12}{'speedup':>10}")
+    try:
+        for query in QUERIES:
+            # The query get_menu_items used to run
+            regex_query = {
+                'is_available': True,
+                '$or': [
+                    {'name': {'$regex': re.escape(query), '$options': 'i'}},
+                    {'description': {'$regex': re.escape(query), '$options': 'i'}}
+                ]
+            }
+            regex = summarize(timed(lambda: list(collection.find(regex_query).sort('name', 1)), args.repeat))
+            indexed = summarize(timed(lambda: index.search(query), args.repeat))
+
+            print(f"{query:<16}{regex['p50']:>10.2f}ms{regex['p95']:>10.2f}ms"
+                  f"{indexed['p50']:>10.3f}ms{indexed['p95']:>10.3f}ms"
+                  f"{regex['p50'] / max(indexed['p50'], 1e-6):>9.0f}x")
+
+        start = time.perf_counter()
+        suggestions = SuggestIndex(documents)
+        print(f"\n   Suggest index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        print(f"\n{'prefix':<20}{'suggest p50':>14}{'suggest p95':>14}")
+        for query in SUGGEST_QUERIES:
+            result = summarize(timed(lambda: suggestions.suggest(query), args.repeat * 10))
+            print(f"{query:<20}{result['p50'] * 1000:>12.1f}us{result['p95'] * 1000:>12.1f}us")
+    finally:
+        collection.drop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - Response Serialization Benchmark
+Measures the cost of turning 1,000 documents into response bytes for
+get_menu_items and get_all_orders: the old per-view conversion loop plus
+DRF's JSONRenderer, against api_documents() plus MongoJSONRenderer
+"""
+
+import os
+import sys
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from bson import ObjectId
+from rest_framework.renderers import JSONRenderer
+import mongo_json
+from mongo_json import MongoJSONRenderer, api_documents
+
+def make_menu_items(count, rng):
+    # Catalog snapshots already carry string ids
+    now = datetime.now()
+    return [{
+        'id': str(ObjectId()),
+        'name': f'Hyderabadi Chicken Biryani #{n}',
+        'description': 'Aromatic basmati rice layered with tender chicken and spices',
+        'price': float(rng.randint(30, 500)),
+        'category': 'Biryanis',
+        'image_url': f'/static/images/item{n}.jpg',
+        'is_available': True,
+        'is_veg': n % 3 == 0,
+        'preparation_time': rng.randint(5, 60),
+        'rating': round(rng.uniform(3.5, 5.0), 1),
+        'ingredients': 'Basmati Rice, Chicken, Spices, Yogurt',
+        'created_at': now,
+        'updated_at': now
+    } for n in range(count)]
+
+def make_orders(count, rng):
+    # Shaped like pagination.SUMMARY_PROJECTION results
+    now = datetime.now()
+    return [{
+        '_id': ObjectId(),
+        'order_number': f'SF{1000000 + n}',
+        'customer_name': f'Customer {n}',
+        'customer_phone': '9876543210',
+        'delivery_address': 'Hitech City, Hyderabad',
+        'total_amount': float(rng.randint(100, 2000)),
+        'payment_method': 'cod',
+        'status': rng.choice(['pending', 'confirmed', 'preparing', 'delivered']),
+        'created_at': now - timedelta(minutes=n),
+        'estimated_delivery_time': now + timedelta(minutes=45 - n),
+        'item_count': rng.randint(1, 6)
+    } for n in range(count)]
+
+def old_order_loop(orders):
+    for order in orders:
+        order['id'] = str(order['_id'])
+        del order['_id']
+        if 'created_at' in order:
+            order['created_at'] = order['created_at'].isoformat()
+        if 'estimated_delivery_time' in order:
+            order['estimated_delivery_time'] = order['estimated_delivery_time'].isoformat()
+    return orders
+
+def timed(fn, documents, repeat):
+    """Milliseconds per call; every call gets a fresh copy since conversion is in place"""
+    samples = []
+    for _ in range(repeat):
+        batch = copy.deepcopy(documents)
+        start = time.perf_counter()
+        fn(batch)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    items = make_menu_items(args.documents, rng)
+    orders = make_orders(args.documents, rng)
+    drf, fast = JSONRenderer(), MongoJSONRenderer()
+
+    cases = [
+        ('get_menu_items', items,
+         lambda batch: drf.render({'success': True, 'items': list(batch), 'count': len(batch)}),
+         lambda batch: fast.render({'success': True, 'items': batch, 'count': len(batch)})),
+        ('get_all_orders', orders,
+         lambda batch: drf.render({'success': True, 'orders': old_order_loop(batch), 'count': len(batch)}),
+         lambda batch: fast.render({'success': True, 'orders': api_documents(batch), 'count': len(batch)})),
+    ]
+
+    encoder = 'orjson' if mongo_json.orjson else 'json (orjson not installed)'
+    print(f"🍽️ Serializing {args.documents} documents, median of {args.repeat} runs, encoder: {encoder}")
+    print(f"\n{'view':<18}{'before':>12}{'after':>12}{'speedup':>10}")
+
+    for view, documents, before, after in cases:
+        # Both paths must produce the same payload
+        if json.loads(before(copy.deepcopy(documents))) != json.loads(after(copy.deepcopy(documents))):
+            print(f"❌ {view}: responses differ")
+            sys.exit(1)
+        before_ms = timed(before, documents, args.repeat)
+        after_ms = timed(after, documents, args.repeat)
+        print(f"{view:<18}{before_ms:>10.2f}ms{after_ms:>10.2f}ms{before_ms / after_ms:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+"""
+Srinu Foods - API Workload Benchmark
+Runs a scripted mix of customer and admin sessions (browse the menu, search,
+cart operations, checkout, admin polling) from concurrent threads and
+reports throughput and p50/p95/p99 latency per endpoint.
+
+By default requests go through Django in-process against the configured
+MongoDB; pass --url to drive a running server instead. Load data first:
+
+    python -m benchmarks.datagen --reset --orders 1000000
+    python -m benchmarks.workload --threads 16 --duration 60 --output before.json
+    ...change something...
+    python -m benchmarks.workload --threads 16 --duration 60 --compare before.json
+
+Checkout places real orders for the bench_user_* accounts.
+"""
+
+import os
+import sys
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlsplit, quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+from benchmarks.datagen import USERNAME_PREFIX
+
+ADMIN_USERNAME = 'bench_admin'
+
+# scenario -> weight
+DEFAULT_MIX = {
+    'browse': 40,
+    'search': 20,
+    'cart': 20,
+    'checkout': 10,
+    'admin': 10,
+}
+
+SEARCH_TERMS = ['chicken', 'paneer', 'biryani', 'masala', 'crispy', 'dal', 'garlic', 'prawn']
+
+class InProcessTransport:
+    """Requests through Django's test client; no server or network involved"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        response = client.generic(
+            method,
+            path,
+            data=json.dumps(body) if body is not None else '',
+            content_type='application/json',
+            headers=headers or {}
+        )
+        return response.status_code, response.content
+
+class HTTPTransport:
+    """Requests over one keep-alive connection per thread"""
+
+    def __init__(self, url):
+        self.url = urlsplit(url)
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+                connection = self._local.connection = connection_class(self.url.hostname, self.url.port, timeout=30)
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, endpoint, milliseconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(milliseconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def summarize(samples, errors, elapsed):
+    samples = sorted(samples)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / elapsed, 1),
+        'mean_ms': round(sum(samples) / len(samples), 2),
+        'p50_ms': round(percentile(samples, 0.50), 2),
+        'p95_ms': round(percentile(samples, 0.95), 2),
+        'p99_ms': round(percentile(samples, 0.99), 2),
+    }
+
+class Session:
+    """One virtual user; each scenario is a short, realistic sequence of calls"""
+
+    def __init__(self, transport, recorder, token, items, categories, rng):
+        self.transport = transport
+        self.recorder = recorder
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.items = items
+        self.categories = categories
+        self.rng = rng
+
+    def call(self, endpoint, method, path, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            status, content = self.transport.request(method, path, body, {**self.headers, **(headers or {})})
+        except Exception:
+            status, content = 599, b''
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, status < 400)
+        try:
+            return status, json.loads(content) if content else {}
+        except ValueError:
+            return status, {}
+
+    def browse(self):
+        self.call('GET /api/menu/categories/', 'GET', '/api/menu/categories/')
+        category = quote(self.rng.choice(self.categories))
+        self.call('GET /api/menu/items/?category', 'GET', f'/api/menu/items/?category={category}')
+        for _ in range(self.rng.randint(1, 3)):
+            self.call('GET /api/menu/items/<id>/', 'GET', f'/api/menu/items/{self.rng.choice(self.items)}/')
+
+    def search(self):
+        term = self.rng.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1, 2):
+            self.call('GET /api/menu/suggest/', 'GET', f'/api/menu/suggest/?q={term[:length]}')
+        self.call('GET /api/menu/items/?search', 'GET', f'/api/menu/items/?search={term}')
+
+    def cart(self):
+        added = self.rng.sample(self.items, 2)
+        for item_id in added:
+            self.call('POST /api/menu/cart/add/', 'POST', '/api/menu/cart/add/',
+                      {'item_id': item_id, 'quantity': self.rng.randint(1, 2)})
+        self.call('GET /api/menu/cart/', 'GET', '/api/menu/cart/')
+        self.call('PUT /api/menu/cart/update/<id>/', 'PUT', f'/api/menu/cart/update/{added[0]}/', {'quantity': 3})
+        self.call('DELETE /api/menu/cart/remove/<id>/', 'DELETE', f'/api/menu/cart/remove/{added[1]}/')
+        self.call('DELETE /api/menu/cart/clear/', 'DELETE', '/api/menu/cart/clear/')
+
+    def checkout(self):
+        for item_id in self.rng.sample(self.items, self.rng.randint(1, 3)):
+            self.call('POST /api/menu/cart/add/', 'POST', '/api/menu/cart/add/',
+                      {'item_id': item_id, 'quantity': self.rng.randint(1, 2)})
+        self.call('GET /api/menu/cart/', 'GET', '/api/menu/cart/')
+        status, body = self.call('POST /api/orders/create/', 'POST', '/api/orders/create/', {
+            'delivery_address': '42 MG Road, Bangalore - 560001',
+            'phone': '+91-9876543210',
+            'payment_method': 'cod'
+        }, headers={'Idempotency-Key': str(uuid.uuid4())})
+        self.call('GET /api/orders/my-orders/', 'GET', '/api/orders/my-orders/')
+        if status == 201:
+            self.call('GET /api/orders/<id>/', 'GET', f"/api/orders/{body['order']['id']}/")
+
+    def admin(self):
+        self.call('GET /api/orders/admin/dashboard/stats/', 'GET', '/api/orders/admin/dashboard/stats/')
+        status, body = self.call('GET /api/orders/admin/all/', 'GET', '/api/orders/admin/all/?status=pending')
+        orders = body.get('orders') or []
+        if orders:
+            order = self.rng.choice(orders)
+            self.call('GET /api/orders/<id>/', 'GET', f"/api/orders/{order['id']}/")
+            self.call('PUT /api/orders/admin/<id>/update-status/', 'PUT',
+                      f"/api/orders/admin/{order['id']}/update-status/", {'status': 'confirmed'})
+
+def load_accounts(count):
+    customers = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id')[:count])
+    if not customers:
+        sys.exit("❌ No benchmark users found; run `python -m benchmarks.datagen` first")
+
+    admin, _ = User.objects.get_or_create(
+        username=ADMIN_USERNAME,
+        defaults={'email': 'bench_admin@example.com', 'is_staff': True}
+    )
+    return [str(RefreshToken.for_user(user).access_token) for user in customers], \
+        str(RefreshToken.for_user(admin).access_token)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args, transport):
+    customer_tokens, admin_token = load_accounts(args.accounts)
+
+    status, content = transport.request('GET', '/api/menu/items/')
+    items = [item['id'] for item in json.loads(content)['items'] if item.get('is_available')]
+    status, content = transport.request('GET', '/api/menu/categories/')
+    categories = [category['name'] for category in json.loads(content)['categories']]
+    if not items or not categories:
+        sys.exit("❌ The menu is empty; run `python -m benchmarks.datagen` first")
+
+    mix = dict(DEFAULT_MIX)
+    for entry in args.mix or []:
+        name, _, weight = entry.partition('=')
+        mix[name] = int(weight)
+    scenarios, weights = zip(*((name, weight) for name, weight in mix.items() if weight > 0))
+
+    recorder = Recorder()
+    warmup = Recorder()
+    stop_at = time.monotonic() + args.warmup + args.duration
+    measure_at = time.monotonic() + args.warmup
+
+    def worker(index):
+        rng = random.Random(args.seed + index)
+        sessions = {}
+        while time.monotonic() < stop_at:
+            scenario = rng.choices(scenarios, weights)[0]
+            token = admin_token if scenario == 'admin' else rng.choice(customer_tokens)
+            session = sessions.get(token)
+            if session is None:
+                session = sessions[token] = Session(transport, None, token, items, categories, rng)
+            session.recorder = recorder if time.monotonic() >= measure_at else warmup
+            getattr(session, scenario)()
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = max(time.monotonic() - measure_at, 1e-9)
+    everything = [sample for samples in recorder.samples.values() for sample in samples]
+    if not everything:
+        sys.exit("❌ No requests completed during the measured window")
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'target': args.url or 'in-process',
+            'threads': args.threads,
+            'duration': args.duration,
+            'mix': mix,
+            'seed': args.seed,
+        },
+        'overall': summarize(everything, sum(recorder.errors.values()), elapsed),
+        'endpoints': {
+            endpoint: summarize(samples, recorder.errors.get(endpoint, 0), elapsed)
+            for endpoint, samples in sorted(recorder.samples.items())
+        },
+    }
+
+def print_report(results, baseline=None):
+    print(f"\n{'endpoint':<44}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    rows = list(results['endpoints'].items()) + [('overall', results['overall'])]
+    for endpoint, result in rows:
+        line = (f"{endpoint:<44}{result['rps']:>9,.1f}{result['p50_ms']:>8.1f}ms"
+                f"{result['p95_ms']:>8.1f}ms{result['p99_ms']:>8.1f}ms{result['errors']:>8}")
+        previous = (baseline or {}).get('endpoints', {}).get(endpoint) if endpoint != 'overall' \
+            else (baseline or {}).get('overall')
+        if previous:
+            line += f"   p95 {(result['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%"
+        print(line)
+
+def regressions(results, baseline, threshold):
+    """Endpoints whose p95 grew by more than `threshold` percent"""
+    slower = []
+    for endpoint, result in results['endpoints'].items():
+        previous = baseline['endpoints'].get(endpoint)
+        if previous and result['p95_ms'] > previous['p95_ms'] * (1 + threshold / 100):
+            slower.append(endpoint)
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='base URL of a running server (default: in-process)')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds before measuring')
+    parser.add_argument('--accounts', type=int, default=1000, help='benchmark users to spread sessions over')
+    parser.add_argument('--mix', action='append', metavar='SCENARIO=WEIGHT',
+                        help=f'override a scenario weight; defaults {DEFAULT_MIX}')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file from an earlier run')
+    parser.add_argument('--max-regression', type=float,
+                        help='with --compare, exit 1 if any endpoint p95 grew by more than this percent')
+    args = parser.parse_args()
+
+    transport = HTTPTransport(args.url) if args.url else InProcessTransport()
+    print(f"🍽️ Running the workload for {args.duration:.0f}s with {args.threads} threads "
+          f"against {args.url or 'Django in-process'}...")
+    results = run(args, transport)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if baseline and args.max_regression is not None:
+        slower = regressions(results, baseline, args.max_regression)
+        if slower:
+            print(f"\n❌ p95 regressed by more than {args.max_regression:.0f}%: {', '.join(slower)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
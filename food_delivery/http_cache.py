@@ -0,0 +1,52 @@
+"""
+Conditional GET helpers.
+
+Views derive a strong ETag from something cheap that changes with the content
+(the catalog fingerprint, a document's `updated_at`) and call
+`not_modified()` before building the response, so a client revalidating with
+If-None-Match gets a bodiless 304 without the full query or serialization.
+`cached()` stamps the ETag and the endpoint's Cache-Control on the response.
+"""
+
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+import hashlib
+
+# Catalog data is public and changes rarely; carts and orders are per user
+# and must be revalidated on every use
+CATALOG_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+def make_etag(*parts):
+    """Strong ETag from the given values"""
+    digest = hashlib.blake2b(':'.join(str(part) for part in parts).encode(), digest_size=16)
+    return quote_etag(digest.hexdigest())
+
+def _opaque(etag):
+    # If-None-Match uses weak comparison; proxies that compress may add W/
+    return etag[2:] if etag.startswith('W/') else etag
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or _opaque(etag) in {_opaque(candidate) for candidate in etags}
+
+def _headers(etag, cache_control):
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if cache_control.startswith('private'):
+        headers['Vary'] = 'Authorization'
+    return headers
+
+def not_modified(request, etag, cache_control):
+    """A 304 response if the client already has `etag`, otherwise None"""
+    if etag_matches(request, etag):
+        return HttpResponseNotModified(headers=_headers(etag, cache_control))
+    return None
+
+def cached(response, etag, cache_control):
+    """Attach validators and caching policy to a successful response"""
+    for header, value in _headers(etag, cache_control).items():
+        response[header] = value
+    return response
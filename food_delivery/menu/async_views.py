@@ -0,0 +1,229 @@
+"""
+Async variants of the menu and cart views, routed by srinu_foods/asgi_urls.py.
+
+Responses match menu/views.py; MongoDB is reached through Motor, so a request
+waiting on the database does not hold a thread.
+"""
+
+from async_api import async_api_view, json_response, ALLOW_ANY, IS_AUTHENTICATED
+from http_cache import CATALOG_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, cached, make_etag, not_modified
+from . import cart_store, catalog
+from bson import ObjectId
+import logging
+
+logger = logging.getLogger(__name__)
+
+@async_api_view(['GET'], ALLOW_ANY)
+async def get_categories(request):
+    """Get all active categories"""
+    try:
+        snapshot = await catalog.aget_snapshot()
+        etag = make_etag('categories', snapshot.fingerprint)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        return cached(json_response({
+            'success': True,
+            'categories': snapshot.categories
+        }), etag, CATALOG_CACHE_CONTROL)
+    except Exception as e:
+        logger.error(f"Error getting categories: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error fetching categories'
+        }, status=500)
+
+@async_api_view(['GET'], ALLOW_ANY)
+async def get_menu_items(request):
+    """Get menu items with optional filtering"""
+    try:
+        snapshot = await catalog.aget_snapshot()
+        etag = make_etag('menu_items', snapshot.fingerprint)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        items = snapshot.filter_items(
+            search=request.GET.get('search'),
+            category=request.GET.get('category'),
+            is_veg=request.GET.get('is_veg')
+        )
+
+        return cached(json_response({
+            'success': True,
+            'items': items,
+            'count': len(items)
+        }), etag, CATALOG_CACHE_CONTROL)
+    except Exception as e:
+        logger.error(f"Error getting menu items: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error fetching menu items'
+        }, status=500)
+
+@async_api_view(['GET'], ALLOW_ANY)
+async def get_menu_item(request, item_id):
+    """Get single menu item by ID"""
+    try:
+        snapshot = await catalog.aget_snapshot()
+        etag = make_etag('menu_item', snapshot.fingerprint, item_id)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        item = snapshot.get_item(item_id)
+
+        if item:
+            return cached(json_response({
+                'success': True,
+                'item': item
+            }), etag, CATALOG_CACHE_CONTROL)
+        else:
+            return json_response({
+                'success': False,
+                'message': 'Item not found'
+            }, status=404)
+    except Exception as e:
+        logger.error(f"Error getting menu item: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Invalid item ID or server error'
+        }, status=400)
+
+@async_api_view(['POST'], IS_AUTHENTICATED)
+async def add_to_cart(request):
+    """Add item to user's cart"""
+    try:
+        data = request.data
+
+        # Validate required fields
+        if not data.get('item_id') or not data.get('quantity'):
+            return json_response({
+                'success': False,
+                'message': 'Item ID and quantity are required'
+            }, status=400)
+
+        if not ObjectId.is_valid(data['item_id']):
+            return json_response({
+                'success': False,
+                'message': 'Invalid item ID'
+            }, status=400)
+
+        item = (await catalog.aget_snapshot()).get_item(data['item_id'])
+        if not item or not item.get('is_available'):
+            return json_response({
+                'success': False,
+                'message': 'Item not found or not available'
+            }, status=404)
+
+        cart = await cart_store.aadd_item(request.user.id, cart_store.new_line(item, data))
+
+        return json_response({
+            'success': True,
+            'message': 'Item added to cart successfully',
+            'cart': cart_store.summarize(cart)
+        })
+    except Exception as e:
+        logger.error(f"Error adding to cart: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error adding item to cart'
+        }, status=500)
+
+@async_api_view(['GET'], IS_AUTHENTICATED)
+async def get_cart(request):
+    """Get user's cart"""
+    try:
+        user_id = request.user.id
+        etag = make_etag('cart', user_id, await cart_store.aget_version(user_id))
+        unchanged = not_modified(request, etag, PRIVATE_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        cart = await cart_store.aget_cart(user_id)
+
+        return cached(json_response({
+            'success': True,
+            'cart': cart_store.summarize(cart)
+        }), make_etag('cart', user_id, cart and cart.get('updated_at')), PRIVATE_CACHE_CONTROL)
+    except Exception as e:
+        logger.error(f"Error getting cart: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error fetching cart'
+        }, status=500)
+
+@async_api_view(['DELETE'], IS_AUTHENTICATED)
+async def remove_from_cart(request, item_id):
+    """Remove item from cart"""
+    try:
+        cart = await cart_store.aremove_item(request.user.id, item_id)
+
+        if cart:
+            return json_response({
+                'success': True,
+                'message': 'Item removed from cart',
+                'cart': cart_store.summarize(cart)
+            })
+
+        return json_response({
+            'success': False,
+            'message': 'Cart not found'
+        }, status=404)
+    except Exception as e:
+        logger.error(f"Error removing from cart: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error removing item from cart'
+        }, status=500)
+
+@async_api_view(['PUT'], IS_AUTHENTICATED)
+async def update_cart_item(request, item_id):
+    """Update cart item quantity and instructions"""
+    try:
+        data = request.data
+        quantity = data.get('quantity')
+
+        cart = await cart_store.aupdate_item(
+            request.user.id,
+            item_id,
+            quantity=int(quantity) if quantity is not None else None,
+            special_instructions=data.get('special_instructions')
+        )
+
+        if cart:
+            return json_response({
+                'success': True,
+                'message': 'Cart item updated',
+                'cart': cart_store.summarize(cart)
+            })
+
+        return json_response({
+            'success': False,
+            'message': 'Item not found in cart'
+        }, status=404)
+    except Exception as e:
+        logger.error(f"Error updating cart item: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error updating cart item'
+        }, status=500)
+
+@async_api_view(['DELETE'], IS_AUTHENTICATED)
+async def clear_cart(request):
+    """Clear user's cart"""
+    try:
+        await cart_store.aclear(request.user.id)
+
+        return json_response({
+            'success': True,
+            'message': 'Cart cleared successfully',
+            'cart': cart_store.summarize(None)
+        })
+    except Exception as e:
+        logger.error(f"Error clearing cart: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error clearing cart'
+        }, status=500)
@@ -0,0 +1,280 @@
+"""
+Cart storage for MongoDB.
+
+Every mutation is applied as a single server-side update on the user's cart
+document and returns the cart as it looks afterwards, so concurrent requests
+from the same user never overwrite each other.
+
+The `a`-prefixed functions are the same operations for async views; both
+variants build their filters and updates with the same helpers.
+"""
+
+from asgiref.sync import sync_to_async
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from mongo_client import get_collection, get_async_collection
+from mongo_indexes import ensure_indexes
+from datetime import datetime
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+FREE_DELIVERY_THRESHOLD = 500
+DELIVERY_FEE = 50
+
+# An add can race with another request creating the same cart or line;
+# each retry re-runs the increment/push pair against the winner's document.
+MAX_ADD_ATTEMPTS = 3
+
+# After a failed index build (duplicate carts), how long to wait before trying again
+INDEX_RETRY_SECONDS = 300
+
+_indexes_ready = False
+_index_retry_at = 0.0
+
+def _index_due():
+    return not _indexes_ready and time.monotonic() >= _index_retry_at
+
+def _carts():
+    global _indexes_ready, _index_retry_at
+    if _index_due():
+        # The unique index on user_id makes concurrent upserts collide
+        # instead of silently creating a second cart document.
+        try:
+            ensure_indexes(['carts'])
+            _indexes_ready = True
+        except OperationFailure as e:
+            # Older databases may hold duplicate carts; `manage.py ensure_indexes` merges them
+            logger.error(f"Could not create cart indexes, retrying in {INDEX_RETRY_SECONDS}s: {e}")
+            _index_retry_at = time.monotonic() + INDEX_RETRY_SECONDS
+    return get_collection('carts')
+
+async def _acarts():
+    if _index_due():
+        await sync_to_async(_carts, thread_sensitive=False)()
+    return get_async_collection('carts')
+
+def _increment_line(user_id, cart_item, now):
+    # Existing line: increment in place
+    return (
+        {'user_id': user_id, 'items.item_id': cart_item['item_id']},
+        {
+            '$inc': {'items.$.quantity': cart_item['quantity']},
+            '$set': {
+                'items.$.special_instructions': cart_item.get('special_instructions', ''),
+                'updated_at': now
+            }
+        }
+    )
+
+def _push_line(user_id, cart_item, now):
+    # New line, creating the cart if needed
+    return (
+        {'user_id': user_id, 'items.item_id': {'$ne': cart_item['item_id']}},
+        {
+            '$push': {'items': cart_item},
+            '$set': {'updated_at': now},
+            '$setOnInsert': {'created_at': now}
+        }
+    )
+
+def _set_line(user_id, item_id, quantity, special_instructions):
+    updates = {'updated_at': datetime.now()}
+    if quantity is not None:
+        updates['items.$.quantity'] = quantity
+    if special_instructions is not None:
+        updates['items.$.special_instructions'] = special_instructions
+    return {'user_id': user_id, 'items.item_id': item_id}, {'$set': updates}
+
+def _pull_line(user_id, item_id):
+    return (
+        {'user_id': user_id},
+        {
+            '$pull': {'items': {'item_id': item_id}},
+            '$set': {'updated_at': datetime.now()}
+        }
+    )
+
+def new_line(item, data):
+    """Cart line for a catalog item and the add-to-cart request body"""
+    return {
+        'item_id': data['item_id'],
+        'name': item['name'],
+        'price': float(item['price']),
+        'quantity': int(data['quantity']),
+        'special_instructions': data.get('special_instructions', ''),
+        'image_url': item.get('image_url', ''),
+        'is_veg': item.get('is_veg', True),
+        'added_at': datetime.now()
+    }
+
+def merge_duplicate_carts():
+    """
+    Fold every user's extra cart documents into one, summing the quantities
+    of lines for the same item, so the unique index on user_id can be built;
+    returns the number of carts removed
+    """
+    carts = get_collection('carts')
+    duplicates = carts.aggregate([
+        {'$group': {'_id': '$user_id', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ])
+
+    removed = 0
+    for duplicate in duplicates:
+        documents = list(carts.find({'_id': {'$in': duplicate['ids']}}))
+        # Oldest first, so the most recently touched cart's instructions win
+        documents.sort(key=lambda cart: cart.get('updated_at') or cart.get('created_at') or datetime.min)
+        keep = documents[-1]
+
+        lines = {}
+        for cart in documents:
+            for line in cart.get('items', []):
+                merged = lines.get(line['item_id'])
+                if merged is None:
+                    lines[line['item_id']] = dict(line)
+                else:
+                    merged.update({**line, 'quantity': merged['quantity'] + line['quantity']})
+
+        created = [cart['created_at'] for cart in documents if cart.get('created_at')]
+        carts.update_one({'_id': keep['_id']}, {'$set': {
+            'items': list(lines.values()),
+            'created_at': min(created) if created else keep.get('created_at'),
+            'updated_at': datetime.now()
+        }})
+        removed += carts.delete_many({'_id': {'$in': [cart['_id'] for cart in documents[:-1]]}}).deleted_count
+        logger.info(f"Merged {len(documents)} carts of user {duplicate['_id']}")
+    return removed
+
+def get_cart(user_id):
+    """Return the user's cart document or None"""
+    return _carts().find_one({'user_id': user_id})
+
+def get_version(user_id):
+    """The cart's `updated_at` (None without a cart), for cheap change checks"""
+    cart = _carts().find_one({'user_id': user_id}, {'_id': 0, 'updated_at': 1})
+    return cart and cart.get('updated_at')
+
+def add_item(user_id, cart_item):
+    """Add a line to the cart, or bump its quantity if it is already there"""
+    carts = _carts()
+
+    for _ in range(MAX_ADD_ATTEMPTS):
+        now = datetime.now()
+
+        cart = carts.find_one_and_update(
+            *_increment_line(user_id, cart_item, now), return_document=ReturnDocument.AFTER
+        )
+        if cart:
+            return cart
+
+        try:
+            return carts.find_one_and_update(
+                *_push_line(user_id, cart_item, now), upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another request added the same line first; increment it instead
+            continue
+
+    raise RuntimeError(f"Could not add item {cart_item['item_id']} to cart of user {user_id}")
+
+def update_item(user_id, item_id, quantity=None, special_instructions=None):
+    """Set quantity and/or instructions on a cart line; None if the line is missing"""
+    return _carts().find_one_and_update(
+        *_set_line(user_id, item_id, quantity, special_instructions),
+        return_document=ReturnDocument.AFTER
+    )
+
+def remove_item(user_id, item_id):
+    """Pull a line out of the cart; None if the user has no cart"""
+    return _carts().find_one_and_update(
+        *_pull_line(user_id, item_id), return_document=ReturnDocument.AFTER
+    )
+
+def clear(user_id):
+    """Delete the user's cart"""
+    _carts().delete_one({'user_id': user_id})
+
+def take(user_id):
+    """Atomically remove and return the user's cart (None if there is none) for checkout"""
+    return _carts().find_one_and_delete({'user_id': user_id})
+
+def restore(cart):
+    """Put back a cart taken for a checkout that failed, merging lines added meanwhile"""
+    for line in cart.get('items', []):
+        add_item(cart['user_id'], line)
+
+async def aget_cart(user_id):
+    return await (await _acarts()).find_one({'user_id': user_id})
+
+async def aget_version(user_id):
+    cart = await (await _acarts()).find_one({'user_id': user_id}, {'_id': 0, 'updated_at': 1})
+    return cart and cart.get('updated_at')
+
+async def aadd_item(user_id, cart_item):
+    carts = await _acarts()
+
+    for _ in range(MAX_ADD_ATTEMPTS):
+        now = datetime.now()
+
+        cart = await carts.find_one_and_update(
+            *_increment_line(user_id, cart_item, now), return_document=ReturnDocument.AFTER
+        )
+        if cart:
+            return cart
+
+        try:
+            return await carts.find_one_and_update(
+                *_push_line(user_id, cart_item, now), upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            continue
+
+    raise RuntimeError(f"Could not add item {cart_item['item_id']} to cart of user {user_id}")
+
+async def aupdate_item(user_id, item_id, quantity=None, special_instructions=None):
+    return await (await _acarts()).find_one_and_update(
+        *_set_line(user_id, item_id, quantity, special_instructions),
+        return_document=ReturnDocument.AFTER
+    )
+
+async def aremove_item(user_id, item_id):
+    return await (await _acarts()).find_one_and_update(
+        *_pull_line(user_id, item_id), return_document=ReturnDocument.AFTER
+    )
+
+async def aclear(user_id):
+    await (await _acarts()).delete_one({'user_id': user_id})
+
+async def atake(user_id):
+    return await (await _acarts()).find_one_and_delete({'user_id': user_id})
+
+async def arestore(cart):
+    for line in cart.get('items', []):
+        await aadd_item(cart['user_id'], line)
+
+def summarize(cart):
+    """Build the cart payload returned by the API, with totals"""
+    items = cart.get('items', []) if cart else []
+
+    total_amount = 0
+    total_items = 0
+    for item in items:
+        total_amount += item['price'] * item['quantity']
+        total_items += item['quantity']
+
+    if not items:
+        delivery_fee = 0
+    else:
+        # Calculate delivery fee (free above threshold)
+        delivery_fee = 0 if total_amount >= FREE_DELIVERY_THRESHOLD else DELIVERY_FEE
+
+    return {
+        'items': items,
+        'total_items': total_items,
+        'subtotal': round(total_amount, 2),
+        'delivery_fee': delivery_fee,
+        'total_amount': round(total_amount + delivery_fee, 2),
+        'free_delivery_threshold': FREE_DELIVERY_THRESHOLD
+    }
@@ -0,0 +1,197 @@
+"""
+In-process menu catalog.
+
+Each worker keeps an immutable snapshot of the active categories and all menu
+items, plus search and typeahead indexes over the available ones. Menu reads,
+search, suggestions and cart pricing are served from it instead of MongoDB.
+
+Freshness is tracked through a version document in `catalog_meta`:
+- anything that edits the catalog calls `invalidate()`, which bumps it
+- workers re-check it at most every POLL_INTERVAL seconds and rebuild on change
+- with USE_CHANGE_STREAM enabled (replica sets only) a watcher thread marks the
+  snapshot stale as soon as `menu_items` or `categories` change
+- MAX_AGE rebuilds the snapshot regardless, for edits made outside the app
+
+Each snapshot carries a content fingerprint, identical in every worker that
+loaded the same data, which the menu views use as their ETag.
+"""
+
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from mongo_client import get_collection, get_mongo_db
+from mongo_json import dumps
+from .search import SearchIndex, SuggestIndex
+from pymongo.errors import OperationFailure
+from types import MappingProxyType
+import hashlib
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CATALOG_COLLECTIONS = ('categories', 'menu_items')
+VERSION_DOC_ID = 'catalog'
+
+DEFAULT_SETTINGS = {
+    'POLL_INTERVAL': 5,
+    'MAX_AGE': 300,
+    'USE_CHANGE_STREAM': False,
+}
+
+class CatalogSnapshot:
+    """Read-only view of the catalog at one version. Never mutate its documents."""
+
+    __slots__ = ('version', 'built_at', 'fingerprint', 'categories', 'items', 'available_items',
+                 'items_by_id', 'search_index', 'item_suggestions', 'category_suggestions')
+
+    def __init__(self, version, categories, items):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.categories = tuple(categories)
+        self.items = tuple(items)
+        # Covers edits made without invalidate(), which keep the version
+        self.fingerprint = hashlib.blake2b(
+            dumps([self.categories, self.items]), digest_size=16
+        ).hexdigest()
+        self.available_items = tuple(item for item in self.items if item.get('is_available'))
+        self.items_by_id = MappingProxyType({item['id']: item for item in self.items})
+        self.search_index = SearchIndex(self.available_items)
+        self.item_suggestions = SuggestIndex(self.available_items)
+        self.category_suggestions = SuggestIndex(self.categories)
+
+    def get_item(self, item_id):
+        return self.items_by_id.get(item_id)
+
+    def filter_items(self, search=None, category=None, is_veg=None):
+        """Available items for the menu list; `is_veg` is the raw 'true'/'false' query value"""
+        # Search results come back ranked by relevance, otherwise sorted by name
+        if search:
+            items = self.search_index.search(search)
+        else:
+            items = self.available_items
+
+        if category:
+            items = [item for item in items if item.get('category') == category]
+
+        if is_veg is not None:
+            wants_veg = is_veg.lower() == 'true'
+            items = [item for item in items if item.get('is_veg') == wants_veg]
+
+        return items
+
+def _config():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'CATALOG_SETTINGS', {}))
+    return config
+
+def _with_string_id(document):
+    document['id'] = str(document.pop('_id'))
+    return document
+
+def _read_version():
+    doc = get_collection('catalog_meta').find_one({'_id': VERSION_DOC_ID})
+    return doc['version'] if doc else 0
+
+def _load(version):
+    categories = get_collection('categories').find({'is_active': True}).sort('sort_order', 1)
+    items = get_collection('menu_items').find({}).sort('name', 1)
+
+    return CatalogSnapshot(
+        version,
+        [_with_string_id(category) for category in categories],
+        [_with_string_id(item) for item in items]
+    )
+
+class _CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._watcher = None
+        self._watch_unsupported = False
+
+    def _is_fresh(self, snapshot, config, now):
+        return (snapshot is not None and not self._stale
+                and now - self._checked_at < config['POLL_INTERVAL']
+                and now - snapshot.built_at < config['MAX_AGE'])
+
+    def peek(self):
+        """The current snapshot if it needs no refresh, otherwise None"""
+        snapshot = self._snapshot
+        return snapshot if self._is_fresh(snapshot, _config(), time.monotonic()) else None
+
+    def get(self):
+        snapshot = self._snapshot
+        config = _config()
+        if self._is_fresh(snapshot, config, time.monotonic()):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            snapshot = self._snapshot
+            now = time.monotonic()
+            if self._is_fresh(snapshot, config, now):
+                return snapshot
+
+            if config['USE_CHANGE_STREAM']:
+                self._start_watcher()
+
+            version = _read_version()
+            if (snapshot is None or self._stale or version != snapshot.version
+                    or now - snapshot.built_at >= config['MAX_AGE']):
+                self._stale = False
+                snapshot = _load(version)
+                self._snapshot = snapshot
+                logger.info(f"Loaded menu catalog version {version} ({len(snapshot.items)} items)")
+
+            self._checked_at = now
+            return snapshot
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _start_watcher(self):
+        if self._watch_unsupported or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        pipeline = [{'$match': {'ns.coll': {'$in': list(CATALOG_COLLECTIONS)}}}]
+        try:
+            with get_mongo_db().watch(pipeline) as stream:
+                for _ in stream:
+                    self.mark_stale()
+        except OperationFailure as e:
+            # Standalone servers have no change streams; polling still applies
+            self._watch_unsupported = True
+            logger.warning(f"Catalog change stream unavailable, using polling: {e}")
+        except Exception as e:
+            # Restarted on the next refresh
+            logger.error(f"Catalog change stream stopped: {e}")
+        self.mark_stale()
+
+_cache = _CatalogCache()
+
+def get_snapshot():
+    """Return the current catalog snapshot, refreshing it if it is out of date"""
+    return _cache.get()
+
+async def aget_snapshot():
+    """get_snapshot() for async views; only a refresh leaves the event loop"""
+    return _cache.peek() or await sync_to_async(_cache.get, thread_sensitive=False)()
+
+def get_item(item_id):
+    """Look up a menu item (available or not) by its string id"""
+    return get_snapshot().get_item(item_id)
+
+def invalidate():
+    """Bump the catalog version so every worker reloads; call after editing the catalog"""
+    get_collection('catalog_meta').update_one(
+        {'_id': VERSION_DOC_ID},
+        {'$inc': {'version': 1}},
+        upsert=True
+    )
+    _cache.mark_stale()
@@ -0,0 +1,151 @@
+"""
+Full-text search and typeahead over the menu catalog.
+
+Both indexes are built once per catalog snapshot from already-loaded
+documents. Text is tokenized and case/accent folded.
+
+SearchIndex: every query term must match a token, exactly or as a prefix, and
+results are ranked by how well they match.
+
+SuggestIndex: the query is matched as a prefix of a name or of any word
+suffix of it, and the top-k results by rating are returned.
+"""
+
+from bisect import bisect_left, bisect_right
+import heapq
+import re
+import unicodedata
+
+# Weight of a match in each field; a hit in the name beats one in the description
+FIELD_WEIGHTS = (
+    ('name', 3.0),
+    ('category', 2.0),
+    ('description', 1.0),
+    ('ingredients', 1.0),
+)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+def fold(text):
+    """Lowercase and strip accents so 'Crème' matches 'creme'"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+def tokenize(text):
+    return _TOKEN_RE.findall(fold(text)) if text else []
+
+class SearchIndex:
+    """Inverted index from folded tokens to (document position, field weight)"""
+
+    def __init__(self, documents):
+        self.documents = tuple(documents)
+        postings = {}
+
+        for position, document in enumerate(self.documents):
+            for field, weight in FIELD_WEIGHTS:
+                value = document.get(field)
+                if not isinstance(value, str):
+                    continue
+                for token in tokenize(value):
+                    entry = postings.setdefault(token, {})
+                    if entry.get(position, 0) < weight:
+                        entry[position] = weight
+
+        self._postings = postings
+        self._terms = sorted(postings)
+
+    def _match_term(self, query_term):
+        """Score documents for one query term: exact hits score fully, prefix hits by coverage"""
+        scores = {}
+        start = bisect_left(self._terms, query_term)
+
+        for term in self._terms[start:]:
+            if not term.startswith(query_term):
+                break
+            factor = 1.0 if term == query_term else len(query_term) / len(term)
+            for position, weight in self._postings[term].items():
+                score = weight * factor
+                if score > scores.get(position, 0):
+                    scores[position] = score
+
+        return scores
+
+    def search(self, query, limit=None):
+        """Return documents matching every query term, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        totals = None
+        for term in dict.fromkeys(terms):
+            scores = self._match_term(term)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {
+                    position: total + scores[position]
+                    for position, total in totals.items()
+                    if position in scores
+                }
+            if not totals:
+                return []
+
+        ranked = sorted(
+            totals.items(),
+            key=lambda hit: (-hit[1], -float(self.documents[hit[0]].get('rating') or 0), hit[0])
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        return [self.documents[position] for position, _ in ranked]
+
+# Prefixes up to this length get their top results precomputed; longer ones
+# match few enough keys that scanning the sorted range is cheaper
+PRECOMPUTED_PREFIX_LENGTH = 3
+MAX_SUGGESTIONS = 20
+
+class SuggestIndex:
+    """Sorted array of name keys for prefix lookups, best rated first"""
+
+    def __init__(self, documents):
+        self.documents = tuple(documents)
+        self._ratings = [float(document.get('rating') or 0) for document in self.documents]
+
+        # "Chicken Biryani" is reachable as "chicken biryani" and "biryani"
+        keys = []
+        for position, document in enumerate(self.documents):
+            tokens = tokenize(document.get('name', ''))
+            for start in range(len(tokens)):
+                keys.append((' '.join(tokens[start:]), position))
+        keys.sort()
+
+        self._keys = [key for key, _ in keys]
+        self._positions = [position for _, position in keys]
+
+        self._top = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            prefixes = {key[:length] for key in self._keys if len(key) >= length}
+            for prefix in prefixes:
+                self._top[prefix] = self._rank(self._scan(prefix), MAX_SUGGESTIONS)
+
+    def _scan(self, prefix):
+        low = bisect_left(self._keys, prefix)
+        high = bisect_right(self._keys, prefix + '\uffff', low)
+        return set(self._positions[low:high])
+
+    def _rank(self, positions, limit):
+        return heapq.nsmallest(limit, positions, key=lambda position: (-self._ratings[position], position))
+
+    def suggest(self, query, limit=8):
+        """Return up to `limit` documents whose name matches the query prefix"""
+        prefix = ' '.join(tokenize(query))
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            ranked = self._top.get(prefix, [])[:limit]
+        else:
+            ranked = self._rank(self._scan(prefix), limit)
+
+        return [self.documents[position] for position in ranked]
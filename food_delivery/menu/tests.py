@@ -0,0 +1,104 @@
+from django.core.management import call_command
+from mongo_client import get_collection
+from mongo_testing import LiveMongoTestCase, MongoTestCase, atomic_operations
+from menu import cart_store
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import StringIO
+import sys
+import threading
+
+def _line(item_id, quantity, instructions=''):
+    return {'item_id': item_id, 'name': item_id, 'price': 100.0, 'quantity': quantity,
+            'special_instructions': instructions}
+
+def _reset_cart_indexes(test):
+    cart_store._indexes_ready, cart_store._index_retry_at = False, 0.0
+    test.addCleanup(setattr, cart_store, '_indexes_ready', False)
+    test.addCleanup(setattr, cart_store, '_index_retry_at', 0.0)
+
+class DuplicateCartTests(MongoTestCase):
+    """Databases from before the unique index on carts.user_id can hold several carts per user"""
+
+    def setUp(self):
+        super().setUp()
+        _reset_cart_indexes(self)
+        get_collection('carts').insert_many([
+            {'user_id': 1, 'items': [_line('a', 1), _line('b', 2)],
+             'created_at': datetime(2024, 1, 1), 'updated_at': datetime(2024, 1, 1)},
+            {'user_id': 1, 'items': [_line('a', 3, 'Less spicy')],
+             'created_at': datetime(2024, 1, 2), 'updated_at': datetime(2024, 1, 2)},
+            {'user_id': 2, 'items': [_line('c', 1)]},
+        ])
+
+    def test_cart_reads_survive_a_failed_index_build(self):
+        with self.assertLogs('menu.cart_store', 'ERROR'):
+            cart = cart_store.get_cart(2)
+        self.assertEqual(cart['items'][0]['item_id'], 'c')
+        # Tried again later rather than running without the unique index
+        self.assertFalse(cart_store._indexes_ready)
+        self.assertGreater(cart_store._index_retry_at, 0)
+
+        get_collection('carts').delete_many({'user_id': 1})
+        cart_store._index_retry_at = 0.0
+        cart_store.get_cart(2)
+        self.assertTrue(cart_store._indexes_ready)
+
+    def test_ensure_indexes_merges_duplicates(self):
+        call_command('ensure_indexes', 'carts', stdout=StringIO())
+
+        carts = list(get_collection('carts').find({'user_id': 1}))
+        self.assertEqual(len(carts), 1)
+        lines = {line['item_id']: line for line in carts[0]['items']}
+        self.assertEqual(lines['a']['quantity'], 4)
+        self.assertEqual(lines['a']['special_instructions'], 'Less spicy')
+        self.assertEqual(lines['b']['quantity'], 2)
+        self.assertEqual(carts[0]['created_at'], datetime(2024, 1, 1))
+        self.assertEqual(get_collection('carts').count_documents({'user_id': 2}), 1)
+
+        index = get_collection('carts').index_information()['user_id_1']
+        self.assertTrue(index['unique'])
+
+class ConcurrentAdds:
+    """Parallel adds to one user's cart: a single document, and no quantity lost"""
+
+    THREADS = 8
+    ADDS = 25
+
+    def setUp(self):
+        super().setUp()
+        _reset_cart_indexes(self)
+
+    def add_concurrently(self):
+        # Each round every thread adds the same new dish at once, racing to create the line (and first the cart)
+        start = threading.Barrier(self.THREADS)
+
+        def add(_):
+            try:
+                for n in range(self.ADDS):
+                    start.wait()
+                    cart_store.add_item(7, _line(f'dish{n}', 1))
+            except Exception:
+                # Release the other threads instead of leaving them at the barrier
+                start.abort()
+                raise
+
+        # Switch threads often enough for requests to interleave between the increment and the push
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            list(pool.map(add, range(self.THREADS)))
+
+        carts = list(get_collection('carts').find({'user_id': 7}))
+        self.assertEqual(len(carts), 1)
+        quantities = {line['item_id']: line['quantity'] for line in carts[0]['items']}
+        self.assertEqual(quantities, {f'dish{n}': self.THREADS for n in range(self.ADDS)})
+
+class CartConcurrencyTests(ConcurrentAdds, MongoTestCase):
+    def test_parallel_adds(self):
+        with atomic_operations():
+            self.add_concurrently()
+
+class LiveCartConcurrencyTests(ConcurrentAdds, LiveMongoTestCase):
+    def test_parallel_adds(self):
+        self.add_concurrently()
@@ -2,9 +2,10 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from mongo_client import get_collection
+from accounts.permissions import IsVerifiedAdminUser
+from http_cache import CATALOG_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, cached, make_etag, not_modified
+from . import cart_store, catalog
 from bson import ObjectId
-from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,18 +15,16 @@ logger = logging.getLogger(__name__)
 def get_categories(request):
     """Get all active categories"""
     try:
-        categories_collection = get_collection('categories')
-        categories = list(categories_collection.find({'is_active': True}).sort('sort_order', 1))
+        snapshot = catalog.get_snapshot()
+        etag = make_etag('categories', snapshot.fingerprint)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
 
-        # Convert ObjectId to string
-        for category in categories:
-            category['id'] = str(category['_id'])
-            del category['_id']
-
-        return Response({
+        return cached(Response({
             'success': True,
-            'categories': categories
-        })
+            'categories': snapshot.categories
+        }), etag, CATALOG_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error getting categories: {e}")
         return Response({
@@ -38,45 +37,60 @@ def get_categories(request):
 def get_menu_items(request):
     """Get menu items with optional filtering"""
     try:
-        items_collection = get_collection('menu_items')
-
         # Get query parameters
         category = request.GET.get('category')
         search = request.GET.get('search')
         is_veg = request.GET.get('is_veg')
 
-        # Build query
-        query = {'is_available': True}
+        snapshot = catalog.get_snapshot()
+        etag = make_etag('menu_items', snapshot.fingerprint)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
 
-        if category:
-            query['category'] = category
+        items = snapshot.filter_items(search=search, category=category, is_veg=is_veg)
 
-        if search:
-            query['$or'] = [
-                {'name': {'$regex': search, '$options': 'i'}},
-                {'description': {'$regex': search, '$options': 'i'}}
-            ]
-
-        if is_veg is not None:
-            query['is_veg'] = is_veg.lower() == 'true'
+        return cached(Response({
+            'success': True,
+            'items': items,
+            'count': len(items)
+        }), etag, CATALOG_CACHE_CONTROL)
+    except Exception as e:
+        logger.error(f"Error getting menu items: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error fetching menu items'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        items = list(items_collection.find(query).sort('name', 1))
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest(request):
+    """Typeahead suggestions for the menu search box"""
+    try:
+        query = request.GET.get('q', '')
+        try:
+            limit = max(1, int(request.GET.get('limit', 8)))
+        except ValueError:
+            limit = 8
 
-        # Convert ObjectId to string
-        for item in items:
-            item['id'] = str(item['_id'])
-            del item['_id']
+        snapshot = catalog.get_snapshot()
 
         return Response({
             'success': True,
-            'items': items,
-            'count': len(items)
+            'items': [
+                {'id': item['id'], 'name': item['name'], 'price': item['price']}
+                for item in snapshot.item_suggestions.suggest(query, limit)
+            ],
+            'categories': [
+                {'id': category['id'], 'name': category['name']}
+                for category in snapshot.category_suggestions.suggest(query, limit)
+            ]
         })
     except Exception as e:
-        logger.error(f"Error getting menu items: {e}")
+        logger.error(f"Error getting suggestions: {e}")
         return Response({
             'success': False,
-            'message': 'Error fetching menu items'
+            'message': 'Error fetching suggestions'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
@@ -84,16 +98,19 @@ def get_menu_items(request):
 def get_menu_item(request, item_id):
     """Get single menu item by ID"""
     try:
-        items_collection = get_collection('menu_items')
-        item = items_collection.find_one({'_id': ObjectId(item_id)})
+        snapshot = catalog.get_snapshot()
+        etag = make_etag('menu_item', snapshot.fingerprint, item_id)
+        unchanged = not_modified(request, etag, CATALOG_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
+
+        item = snapshot.get_item(item_id)
 
         if item:
-            item['id'] = str(item['_id'])
-            del item['_id']
-            return Response({
+            return cached(Response({
                 'success': True,
                 'item': item
-            })
+            }), etag, CATALOG_CACHE_CONTROL)
         else:
             return Response({
                 'success': False,
@@ -121,69 +138,26 @@ def add_to_cart(request):
                 'message': 'Item ID and quantity are required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_collection = get_collection('carts')
-        items_collection = get_collection('menu_items')
-
         # Get item details
-        try:
-            item = items_collection.find_one({'_id': ObjectId(data['item_id'])})
-            if not item or not item.get('is_available'):
-                return Response({
-                    'success': False,
-                    'message': 'Item not found or not available'
-                }, status=status.HTTP_404_NOT_FOUND)
-        except:
+        if not ObjectId.is_valid(data['item_id']):
             return Response({
                 'success': False,
                 'message': 'Invalid item ID'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create cart item
-        cart_item = {
-            'item_id': data['item_id'],
-            'name': item['name'],
-            'price': float(item['price']),
-            'quantity': int(data['quantity']),
-            'special_instructions': data.get('special_instructions', ''),
-            'image_url': item.get('image_url', ''),
-            'is_veg': item.get('is_veg', True),
-            'added_at': datetime.now()
-        }
-
-        # Check if user has existing cart
-        cart = cart_collection.find_one({'user_id': user_id})
+        item = catalog.get_item(data['item_id'])
+        if not item or not item.get('is_available'):
+            return Response({
+                'success': False,
+                'message': 'Item not found or not available'
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        if cart:
-            # Check if item already exists in cart
-            existing_item_index = -1
-            for i, cart_item_existing in enumerate(cart.get('items', [])):
-                if cart_item_existing['item_id'] == data['item_id']:
-                    existing_item_index = i
-                    break
-
-            if existing_item_index >= 0:
-                # Update quantity
-                cart['items'][existing_item_index]['quantity'] += int(data['quantity'])
-                cart['items'][existing_item_index]['special_instructions'] = data.get('special_instructions', '')
-            else:
-                # Add new item
-                cart['items'].append(cart_item)
-
-            cart['updated_at'] = datetime.now()
-            cart_collection.replace_one({'user_id': user_id}, cart)
-        else:
-            # Create new cart
-            new_cart = {
-                'user_id': user_id,
-                'items': [cart_item],
-                'created_at': datetime.now(),
-                'updated_at': datetime.now()
-            }
-            cart_collection.insert_one(new_cart)
+        cart = cart_store.add_item(user_id, cart_store.new_line(item, data))
 
         return Response({
             'success': True,
-            'message': 'Item added to cart successfully'
+            'message': 'Item added to cart successfully',
+            'cart': cart_store.summarize(cart)
         })
     except Exception as e:
         logger.error(f"Error adding to cart: {e}")
@@ -198,45 +172,18 @@ def get_cart(request):
     """Get user's cart"""
     try:
         user_id = request.user.id
-        cart_collection = get_collection('carts')
-
-        cart = cart_collection.find_one({'user_id': user_id})
-
-        if cart:
-            # Calculate totals
-            total_amount = 0
-            total_items = 0
-
-            for item in cart.get('items', []):
-                total_amount += item['price'] * item['quantity']
-                total_items += item['quantity']
+        etag = make_etag('cart', user_id, cart_store.get_version(user_id))
+        unchanged = not_modified(request, etag, PRIVATE_CACHE_CONTROL)
+        if unchanged:
+            return unchanged
 
-            # Calculate delivery fee (free above 500)
-            delivery_fee = 0 if total_amount >= 500 else 50
+        cart = cart_store.get_cart(user_id)
 
-            return Response({
-                'success': True,
-                'cart': {
-                    'items': cart.get('items', []),
-                    'total_items': total_items,
-                    'subtotal': round(total_amount, 2),
-                    'delivery_fee': delivery_fee,
-                    'total_amount': round(total_amount + delivery_fee, 2),
-                    'free_delivery_threshold': 500
-                }
-            })
-        else:
-            return Response({
-                'success': True,
-                'cart': {
-                    'items': [],
-                    'total_items': 0,
-                    'subtotal': 0,
-                    'delivery_fee': 0,
-                    'total_amount': 0,
-                    'free_delivery_threshold': 500
-                }
-            })
+        # Tag the cart actually read; it may have changed since the version check
+        return cached(Response({
+            'success': True,
+            'cart': cart_store.summarize(cart)
+        }), make_etag('cart', user_id, cart and cart.get('updated_at')), PRIVATE_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error getting cart: {e}")
         return Response({
@@ -249,19 +196,13 @@ def get_cart(request):
 def remove_from_cart(request, item_id):
     """Remove item from cart"""
     try:
-        user_id = request.user.id
-        cart_collection = get_collection('carts')
-
-        cart = cart_collection.find_one({'user_id': user_id})
+        cart = cart_store.remove_item(request.user.id, item_id)
 
         if cart:
-            cart['items'] = [item for item in cart.get('items', []) if item['item_id'] != item_id]
-            cart['updated_at'] = datetime.now()
-            cart_collection.replace_one({'user_id': user_id}, cart)
-
             return Response({
                 'success': True,
-                'message': 'Item removed from cart'
+                'message': 'Item removed from cart',
+                'cart': cart_store.summarize(cart)
             })
 
         return Response({
@@ -280,30 +221,26 @@ def remove_from_cart(request, item_id):
 def update_cart_item(request, item_id):
     """Update cart item quantity and instructions"""
     try:
-        user_id = request.user.id
         data = request.data
-        cart_collection = get_collection('carts')
+        quantity = data.get('quantity')
 
-        cart = cart_collection.find_one({'user_id': user_id})
+        cart = cart_store.update_item(
+            request.user.id,
+            item_id,
+            quantity=int(quantity) if quantity is not None else None,
+            special_instructions=data.get('special_instructions')
+        )
 
         if cart:
-            for item in cart.get('items', []):
-                if item['item_id'] == item_id:
-                    item['quantity'] = int(data.get('quantity', item['quantity']))
-                    item['special_instructions'] = data.get('special_instructions', item.get('special_instructions', ''))
-                    break
-
-            cart['updated_at'] = datetime.now()
-            cart_collection.replace_one({'user_id': user_id}, cart)
-
             return Response({
                 'success': True,
-                'message': 'Cart item updated'
+                'message': 'Cart item updated',
+                'cart': cart_store.summarize(cart)
             })
 
         return Response({
             'success': False,
-            'message': 'Cart not found'
+            'message': 'Item not found in cart'
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(f"Error updating cart item: {e}")
@@ -317,14 +254,12 @@ def update_cart_item(request, item_id):
 def clear_cart(request):
     """Clear user's cart"""
     try:
-        user_id = request.user.id
-        cart_collection = get_collection('carts')
-
-        cart_collection.delete_one({'user_id': user_id})
+        cart_store.clear(request.user.id)
 
         return Response({
             'success': True,
-            'message': 'Cart cleared successfully'
+            'message': 'Cart cleared successfully',
+            'cart': cart_store.summarize(None)
         })
     except Exception as e:
         logger.error(f"Error clearing cart: {e}")
@@ -332,3 +267,21 @@ def clear_cart(request):
             'success': False,
             'message': 'Error clearing cart'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsVerifiedAdminUser])
+def invalidate_catalog(request):
+    """Force every worker to reload the menu catalog (admin only)"""
+    try:
+        catalog.invalidate()
+
+        return Response({
+            'success': True,
+            'message': 'Menu catalog will be reloaded'
+        })
+    except Exception as e:
+        logger.error(f"Error invalidating catalog: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error invalidating catalog'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
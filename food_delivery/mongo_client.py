@@ -1,43 +1,127 @@
 from pymongo import MongoClient
 from django.conf import settings
+from query_metrics import listener
+import asyncio
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# MONGODB_SETTINGS keys and the MongoClient options they map to
+CLIENT_OPTIONS = {
+    'MAX_POOL_SIZE': 'maxPoolSize',
+    'MIN_POOL_SIZE': 'minPoolSize',
+    'MAX_IDLE_TIME_MS': 'maxIdleTimeMS',
+    'WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+    'COMPRESSORS': 'compressors',
+    'READ_PREFERENCE': 'readPreference',
+    'APP_NAME': 'appname',
+}
+
 class MongoConnection:
+    """
+    Process-wide MongoDB client.
+
+    The client is created on first use rather than at import, and recreated
+    when the process id changes, so a server that forks workers after
+    importing the app (gunicorn --preload) never shares sockets across
+    processes. Pool size, timeouts, compression and read preference come from
+    MONGODB_SETTINGS. Every command is reported to query_metrics.
+
+    Async views (ASGI) use a separate Motor client with the same options,
+    bound to the event loop that first used it.
+    """
+
     _instance = None
     _client = None
     _db = None
+    _pid = None
+    _async_client = None
+    _async_loop = None
+    _async_pid = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._client is None:
-            self.connect()
+    def client_options(self):
+        mongodb_config = settings.MONGODB_SETTINGS
+        options = {
+            option: mongodb_config[key]
+            for key, option in CLIENT_OPTIONS.items()
+            if mongodb_config.get(key) not in (None, '', [])
+        }
+        # Per-request command counts and timings (query_metrics)
+        options['event_listeners'] = [listener]
+        return options
 
     def connect(self):
-        try:
-            mongodb_config = settings.MONGODB_SETTINGS
-            self._client = MongoClient(mongodb_config['HOST'])
+        mongodb_config = settings.MONGODB_SETTINGS
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return
+            # A client inherited from the parent process is dropped, not closed:
+            # its sockets belong to the parent
+            self._client = MongoClient(mongodb_config['HOST'], **self.client_options())
             self._db = self._client[mongodb_config['DB_NAME']]
-            logger.info("Connected to MongoDB successfully")
-            print("✅ Connected to MongoDB successfully")
-        except Exception as e:
-            logger.error(f"MongoDB connection failed: {e}")
-            print(f"❌ MongoDB connection failed: {e}")
+            self._pid = os.getpid()
+            logger.info(f"Created MongoDB client for process {self._pid}")
 
-    def get_db(self):
-        if self._db is None:
+    def get_client(self):
+        if self._client is None or self._pid != os.getpid():
             self.connect()
+        return self._client
+
+    def get_db(self):
+        self.get_client()
         return self._db
 
     def get_collection(self, collection_name):
         return self.get_db()[collection_name]
 
-# Global instance
+    def get_async_client(self):
+        """Motor client for the running event loop"""
+        # Imported here so the WSGI deployment does not need motor
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        loop = asyncio.get_running_loop()
+        if (self._async_client is None or self._async_loop is not loop
+                or self._async_pid != os.getpid()):
+            with self._lock:
+                if self._async_client is not None and self._async_pid == os.getpid():
+                    self._async_client.close()
+                self._async_client = AsyncIOMotorClient(
+                    settings.MONGODB_SETTINGS['HOST'], io_loop=loop, **self.client_options()
+                )
+                self._async_loop = loop
+                self._async_pid = os.getpid()
+                logger.info(f"Created async MongoDB client for process {self._async_pid}")
+        return self._async_client
+
+    def get_async_collection(self, collection_name):
+        return self.get_async_client()[settings.MONGODB_SETTINGS['DB_NAME']][collection_name]
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            if self._async_client is not None and self._async_pid == os.getpid():
+                self._async_client.close()
+            self._client = self._db = self._pid = None
+            self._async_client = self._async_loop = self._async_pid = None
+
+    def health_check(self):
+        """Ping the server; raises if it cannot be reached within the selection timeout"""
+        self.get_client().admin.command('ping')
+        return {'status': 'ok', 'pid': os.getpid()}
+
+# Global instance; nothing connects until the first query
 mongo_connection = MongoConnection()
 
 def get_mongo_db():
@@ -45,3 +129,10 @@ def get_mongo_db():
 
 def get_collection(collection_name):
     return mongo_connection.get_collection(collection_name)
+
+def get_async_collection(collection_name):
+    """Motor collection, for async views"""
+    return mongo_connection.get_async_collection(collection_name)
+
+def health_check():
+    return mongo_connection.health_check()
@@ -0,0 +1,114 @@
+"""
+MongoDB index registry.
+
+INDEXES declares every index the application relies on; `ensure_indexes()`
+creates them idempotently (run `python manage.py ensure_indexes`, or let
+setup_data.py do it). QUERY_SHAPES lists the queries issued on hot paths;
+the test suite (srinu_foods/tests.py, when a mongod is reachable) and
+`python manage.py check_query_plans` explain them and fail on any that falls
+back to a collection scan.
+
+Add an index here, and its query shape below, whenever a view starts
+querying on a new field.
+"""
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from mongo_client import get_collection
+from datetime import datetime
+from bson import ObjectId
+
+NEWEST_FIRST = [('created_at', DESCENDING), ('_id', DESCENDING)]
+
+# How long a stored Idempotency-Key response is replayed (orders/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+INDEXES = {
+    'carts': [
+        IndexModel([('user_id', ASCENDING)], unique=True),
+    ],
+    'user_profiles': [
+        IndexModel([('user_id', ASCENDING)], unique=True),
+    ],
+    'orders': [
+        IndexModel([('order_number', ASCENDING)], unique=True),
+        IndexModel([('user_id', ASCENDING)] + NEWEST_FIRST),
+        IndexModel([('status', ASCENDING)] + NEWEST_FIRST),
+        IndexModel(NEWEST_FIRST),
+        IndexModel([('updated_at', ASCENDING), ('_id', ASCENDING)]),
+    ],
+    'order_stage_stats': [
+        IndexModel([('scope', ASCENDING)]),
+    ],
+    'menu_items': [
+        IndexModel([('category', ASCENDING), ('is_available', ASCENDING), ('name', ASCENDING)]),
+    ],
+    'categories': [
+        IndexModel([('is_active', ASCENDING), ('sort_order', ASCENDING)]),
+    ],
+    'idempotency_keys': [
+        IndexModel([('created_at', ASCENDING)], expireAfterSeconds=IDEMPOTENCY_KEY_TTL),
+    ],
+}
+
+_SAMPLE_TIME = datetime(2024, 1, 1)
+_SAMPLE_ID = ObjectId('000000000000000000000000')
+
+# (description, collection, filter, sort) for every hot-path query
+QUERY_SHAPES = [
+    ('cart by user', 'carts', {'user_id': 1}, None),
+    ('cart line by user', 'carts', {'user_id': 1, 'items.item_id': 'item'}, None),
+    ('profile by user', 'user_profiles', {'user_id': 1}, None),
+    ('my orders, first page', 'orders', {'user_id': 1}, NEWEST_FIRST),
+    ('my orders, next page', 'orders', {'$and': [{'user_id': 1}, {'$or': [
+        {'created_at': {'$lt': _SAMPLE_TIME}},
+        {'created_at': _SAMPLE_TIME, '_id': {'$lt': _SAMPLE_ID}}
+    ]}]}, NEWEST_FIRST),
+    ('all orders, first page', 'orders', {}, NEWEST_FIRST),
+    ('orders by status, first page', 'orders', {'status': 'pending'}, NEWEST_FIRST),
+    ('order changes since cursor', 'orders', {'$or': [
+        {'updated_at': {'$gt': _SAMPLE_TIME}},
+        {'updated_at': _SAMPLE_TIME, '_id': {'$gt': _SAMPLE_ID}}
+    ]}, [('updated_at', ASCENDING), ('_id', ASCENDING)]),
+    ('recent orders', 'orders', {}, [('created_at', DESCENDING)]),
+    ("today's orders", 'orders', {'created_at': {'$gte': _SAMPLE_TIME, '$lt': _SAMPLE_TIME}}, None),
+    ('order by number', 'orders', {'order_number': 'SF1000000'}, None),
+    ('kitchen queue reload', 'orders', {'status': {'$in': ['pending', 'confirmed']}},
+     [('created_at', ASCENDING), ('_id', ASCENDING)]),
+    ('ETA open orders reload', 'orders', {'status': {'$nin': ['delivered', 'cancelled']}}, None),
+    ('ETA warm-up', 'orders', {'created_at': {'$gte': _SAMPLE_TIME}}, NEWEST_FIRST),
+    ('stage stats by scope', 'order_stage_stats', {'scope': 'all'}, None),
+    ('menu items by category', 'menu_items', {'category': 'Biryanis', 'is_available': True}, [('name', ASCENDING)]),
+    ('active categories', 'categories', {'is_active': True}, [('sort_order', ASCENDING)]),
+]
+
+def ensure_indexes(collections=None):
+    """Create the registered indexes (all collections, or just `collections`); returns their names"""
+    created = []
+    for collection_name, indexes in INDEXES.items():
+        if collections is not None and collection_name not in collections:
+            continue
+        created += get_collection(collection_name).create_indexes(indexes)
+    return created
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def explain_query_shapes():
+    """Return (description, collection, stages, uses_collscan) for each registered query shape"""
+    results = []
+    for description, collection_name, query, sort in QUERY_SHAPES:
+        cursor = get_collection(collection_name).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+        stages = list(_plan_stages(winning_plan))
+        results.append((description, collection_name, stages, 'COLLSCAN' in stages))
+    return results
@@ -0,0 +1,115 @@
+"""
+Test support: runs a test against an in-memory MongoDB (mongomock) in place
+of the configured server, so `python manage.py test` needs no mongod.
+
+mongomock does not apply an operation atomically, as a mongod does for
+each single-document write; tests that race threads against it use
+`atomic_operations()`. Tests that need the real server, such as explain()
+plans, use LiveMongoTestCase instead: a scratch database on the configured
+mongod, dropped afterwards, and skipped when no mongod answers.
+"""
+
+from django.conf import settings
+from django.test import TestCase
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import PyMongoError
+from mongo_client import mongo_connection
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+import functools
+import os
+import threading
+import unittest
+import uuid
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+def _use(client, db_name):
+    with mongo_connection._lock:
+        mongo_connection._client = client
+        mongo_connection._db = client[db_name]
+        mongo_connection._pid = os.getpid()
+
+@unittest.skipIf(mongomock is None, 'mongomock is not installed')
+class MongoTestCase(TestCase):
+    """TestCase with a fresh, empty MongoDB for every test"""
+
+    def setUp(self):
+        super().setUp()
+        _use(mongomock.MongoClient(), 'test')
+        self.addCleanup(mongo_connection.close)
+
+# Collection methods that read or write one document, or a batch of them
+ATOMIC_METHODS = (
+    'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+    'create_index', 'create_indexes',
+)
+
+def _find_one_and_update(collection, filter, update, projection=None, upsert=False,
+                         return_document=ReturnDocument.BEFORE, **kwargs):
+    # mongomock's own version re-selects the document by _id, so `items.$` lands on the first line
+    before = collection.find_one(filter)
+    if before is None:
+        if not upsert:
+            return None
+        document_id = collection.update_one(filter, update, upsert=True).upserted_id
+        if return_document == ReturnDocument.AFTER:
+            return collection.find_one({'_id': document_id}, projection)
+        return None
+    collection.update_one({**filter, '_id': before['_id']}, update)
+    if return_document == ReturnDocument.AFTER:
+        return collection.find_one({'_id': before['_id']}, projection)
+    return before
+
+@contextmanager
+def atomic_operations():
+    """Run each mongomock collection operation under one lock, as a mongod applies it atomically"""
+    lock = threading.RLock()
+
+    def atomic(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return wrapper
+
+    with ExitStack() as stack:
+        for name in ATOMIC_METHODS:
+            method = getattr(mongomock.collection.Collection, name)
+            if name == 'find_one_and_update':
+                method = _find_one_and_update
+            stack.enter_context(mock.patch.object(mongomock.collection.Collection, name, atomic(method)))
+        yield
+
+_mongod_available = None
+
+def mongod_available():
+    """Whether the configured mongod answers a ping; checked once per test run"""
+    global _mongod_available
+    if _mongod_available is None:
+        client = MongoClient(settings.MONGODB_SETTINGS['HOST'], serverSelectionTimeoutMS=1000)
+        try:
+            client.admin.command('ping')
+            _mongod_available = True
+        except PyMongoError:
+            _mongod_available = False
+        finally:
+            client.close()
+    return _mongod_available
+
+class LiveMongoTestCase(TestCase):
+    """TestCase with a fresh database on the configured mongod; skipped without one"""
+
+    def setUp(self):
+        super().setUp()
+        if not mongod_available():
+            self.skipTest(f"no mongod at {settings.MONGODB_SETTINGS['HOST']}")
+        client = MongoClient(settings.MONGODB_SETTINGS['HOST'])
+        db_name = f"{settings.MONGODB_SETTINGS['DB_NAME']}_test_{uuid.uuid4().hex[:8]}"
+        _use(client, db_name)
+        self.addCleanup(mongo_connection.close)
+        self.addCleanup(client.drop_database, db_name)
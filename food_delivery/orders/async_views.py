@@ -0,0 +1,166 @@
+"""
+Async variants of order placement, the order list, dashboard stats and the
+live order stream, routed by srinu_foods/asgi_urls.py.
+
+Responses match orders/views.py; MongoDB is reached through Motor. Leasing an
+order number block, writing to the ingestion queue and rebuilding the stats
+rollup are blocking and rare, so they run on worker threads.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from accounts.identity import CachedJWTAuthentication
+from async_api import async_api_view, json_response, IS_AUTHENTICATED, IS_ADMIN_USER
+from mongo_client import get_async_collection
+from mongo_json import api_documents
+from menu import cart_store, catalog
+from . import checkout, eta, events, idempotency, ingestion, kitchen, pagination, stats
+from .order_numbers import anext_order_number
+from .streaming import QueryParamJWTAuthentication, aevent_stream
+from bson import ObjectId
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _place_order(user, data):
+    """Turn the user's cart into an order; returns (status code, response body)"""
+    cart = await cart_store.atake(user.id)
+
+    if not cart or not cart.get('items'):
+        return 400, checkout.EMPTY_CART
+
+    try:
+        items, unavailable = checkout.price_lines(await catalog.aget_snapshot(), cart['items'])
+        if unavailable:
+            await cart_store.arestore(cart)
+            return 409, checkout.unavailable_error(unavailable)
+
+        order_data = checkout.build_order(user, data, items, await anext_order_number())
+        order_data['estimated_delivery_time'] = await eta.aestimate_new_order(order_data)
+
+        if ingestion.write_behind_enabled():
+            order_data['_id'] = ObjectId()
+            await sync_to_async(ingestion.submit, thread_sensitive=False)(order_data)
+            return 202, checkout.placed(order_data)
+
+        await get_async_collection('orders').insert_one(order_data)
+    except Exception:
+        await cart_store.arestore(cart)
+        raise
+
+    try:
+        await stats.arecord_order_created(order_data)
+    except Exception as e:
+        logger.error(f"Error updating order stats: {e}")
+
+    events.publish(events.ORDER_CREATED, order_data)
+    # Pushing moved ETAs writes to MongoDB; keep it off the event loop
+    await sync_to_async(eta.orders_created, thread_sensitive=False)([order_data])
+    await sync_to_async(kitchen.orders_created, thread_sensitive=False)([order_data])
+
+    return 201, checkout.placed(order_data)
+
+@async_api_view(['POST'], IS_AUTHENTICATED)
+async def create_order(request):
+    """Create a new order from user's cart"""
+    user = request.user
+    data = request.data
+    key = request.headers.get(idempotency.HEADER)
+
+    error = checkout.validation_error(data, key)
+    if error:
+        return json_response({
+            'success': False,
+            'message': error
+        }, status=400)
+
+    try:
+        if key:
+            previous = await idempotency.aclaim(user.id, key)
+            if previous and previous['state'] == idempotency.COMPLETED:
+                return json_response(previous['body'], status=previous['status_code'])
+            if previous:
+                return json_response(checkout.IN_PROGRESS, status=409)
+
+        try:
+            status_code, body = await _place_order(user, data)
+        except ingestion.QueueFull as e:
+            if key:
+                await idempotency.arelease(user.id, key)
+            logger.error(f"Order queue full: {e}")
+            return json_response(checkout.QUEUE_FULL, status=503, headers={'Retry-After': '5'})
+        except Exception:
+            if key:
+                await idempotency.arelease(user.id, key)
+            raise
+
+        if key:
+            if 200 <= status_code < 300:
+                await idempotency.acomplete(user.id, key, status_code, body)
+            else:
+                await idempotency.arelease(user.id, key)
+
+        return json_response(body, status=status_code)
+
+    except Exception as e:
+        logger.error(f"Error creating order: {e}")
+        return json_response(checkout.FAILED, status=500)
+
+@async_api_view(['GET'], IS_AUTHENTICATED)
+async def get_my_orders(request):
+    """Get current user's orders"""
+    try:
+        orders, next_cursor = await pagination.afetch_page(
+            get_async_collection('orders'),
+            {'user_id': request.user.id},
+            cursor=request.GET.get('cursor'),
+            limit=pagination.page_size(request.GET.get('limit')),
+            projection=pagination.SUMMARY_PROJECTION
+        )
+
+        return json_response({
+            'success': True,
+            'orders': api_documents(orders),
+            'next_cursor': next_cursor
+        })
+    except pagination.InvalidCursor:
+        return json_response({
+            'success': False,
+            'message': 'Invalid cursor'
+        }, status=400)
+    except Exception as e:
+        logger.error(f"Error getting user orders: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error fetching orders'
+        }, status=500)
+
+@async_api_view(['GET'], IS_ADMIN_USER)
+async def get_dashboard_stats(request):
+    """Get dashboard statistics for admin"""
+    try:
+        if request.GET.get('live', '').lower() == 'true':
+            dashboard = await sync_to_async(stats.live_dashboard_stats, thread_sensitive=False)()
+        else:
+            dashboard = await stats.adashboard_stats()
+
+        api_documents(dashboard['recent_orders'])
+
+        return json_response({
+            'success': True,
+            'stats': dashboard
+        })
+    except Exception as e:
+        logger.error(f"Error getting dashboard stats: {e}")
+        return json_response({
+            'success': False,
+            'message': 'Error fetching dashboard statistics'
+        }, status=500)
+
+@async_api_view(['GET'], IS_AUTHENTICATED, [QueryParamJWTAuthentication(), CachedJWTAuthentication()])
+async def order_stream(request):
+    """Stream order events: staff see every order, customers only their own"""
+    response = StreamingHttpResponse(aevent_stream(events.subscribe(request.user)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,69 @@
+"""
+Delta sync for the admin order board.
+
+Every write to an order sets `updated_at`, so the orders changed since a
+point in time are the ones after a cursor on (updated_at, _id), read with
+the matching ascending index. The cursor handed back never moves past
+`now - SETTLE_SECONDS`: a write stamped just before the read can commit
+just after it (another worker, a slightly slow clock), so the most recent
+changes are sent once more on the next poll and the board applies them
+idempotently by order id.
+
+Orders are never deleted, so there are no tombstones. A client whose cursor
+is older than MAX_AGE, or that has more than MAX_CHANGES changes waiting, is
+told to `resync`: reload the board from `admin/all/`, which hands out a
+fresh cursor as `sync_cursor`.
+"""
+
+from django.conf import settings
+from bson import ObjectId
+from datetime import datetime, timedelta
+from . import pagination
+
+DEFAULT_SETTINGS = {
+    'SETTLE_SECONDS': 5,
+    'MAX_CHANGES': 200,
+    'MAX_AGE': 3600,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'ORDER_CHANGES', {}))
+    return config
+
+_FIRST_ID = ObjectId('000000000000000000000000')
+
+def _settled(config):
+    return datetime.now() - timedelta(seconds=config['SETTLE_SECONDS'])
+
+def sync_cursor():
+    """Cursor for a board loaded now; pass it to fetch_changes on the next poll"""
+    return pagination.encode_cursor({'updated_at': _settled(get_settings()), '_id': _FIRST_ID}, field='updated_at')
+
+def fetch_changes(collection, cursor, projection=None):
+    """
+    Return (orders, next_cursor, resync) for the orders changed after `cursor`,
+    oldest change first; on resync the orders are empty and next_cursor is None
+    """
+    config = get_settings()
+    updated_at, order_id = pagination.decode_cursor(cursor)
+    settled = _settled(config)
+
+    if updated_at < settled - timedelta(seconds=config['MAX_AGE']):
+        return [], None, True
+
+    orders = list(
+        collection.find({'$or': [
+            {'updated_at': {'$gt': updated_at}},
+            {'updated_at': updated_at, '_id': {'$gt': order_id}}
+        ]}, projection)
+        .sort([('updated_at', 1), ('_id', 1)])
+        .limit(config['MAX_CHANGES'] + 1)
+    )
+    if len(orders) > config['MAX_CHANGES']:
+        return [], None, True
+
+    # Everything up to `settled` has been read; later changes come again next time
+    if settled > updated_at:
+        cursor = pagination.encode_cursor({'updated_at': settled, '_id': _FIRST_ID}, field='updated_at')
+    return orders, cursor, False
@@ -0,0 +1,115 @@
+"""
+Order placement steps shared by the sync and async create_order views.
+
+Everything here is pure: the views take the cart, allocate the order number
+and write the order, and use these helpers for validation, pricing and the
+response bodies.
+"""
+
+from menu import cart_store
+from . import idempotency
+from datetime import datetime, timedelta
+
+REQUIRED_FIELDS = ['delivery_address', 'phone']
+DELIVERY_ESTIMATE = timedelta(minutes=45)
+
+EMPTY_CART = {
+    'success': False,
+    'message': 'Cart is empty'
+}
+
+IN_PROGRESS = {
+    'success': False,
+    'message': 'This order is already being placed'
+}
+
+QUEUE_FULL = {
+    'success': False,
+    'message': 'We are receiving too many orders right now, please try again shortly'
+}
+
+FAILED = {
+    'success': False,
+    'message': 'Error placing order'
+}
+
+def validation_error(data, key):
+    """Error message for a bad request body or Idempotency-Key, or None"""
+    for field in REQUIRED_FIELDS:
+        if not data.get(field):
+            return f'{field.replace("_", " ").title()} is required'
+
+    if key is not None and not 0 < len(key) <= idempotency.MAX_KEY_LENGTH:
+        return f'{idempotency.HEADER} must be 1-{idempotency.MAX_KEY_LENGTH} characters'
+
+    return None
+
+def price_lines(snapshot, lines):
+    """Re-price cart lines against a catalog snapshot; returns (lines, unavailable names)"""
+    priced = []
+    unavailable = []
+
+    for line in lines:
+        item = snapshot.get_item(line['item_id'])
+        if not item or not item.get('is_available'):
+            unavailable.append(line.get('name', line['item_id']))
+            continue
+        priced.append({
+            **line,
+            'name': item['name'],
+            'price': float(item['price']),
+            'image_url': item.get('image_url', ''),
+            'is_veg': item.get('is_veg', True)
+        })
+
+    return priced, unavailable
+
+def unavailable_error(names):
+    return {
+        'success': False,
+        'message': f'No longer available: {", ".join(names)}'
+    }
+
+def build_order(user, data, items, order_number):
+    """The order document for priced cart lines"""
+    # Calculate totals
+    subtotal = sum(item['price'] * item['quantity'] for item in items)
+    delivery_fee = 0 if subtotal >= cart_store.FREE_DELIVERY_THRESHOLD else cart_store.DELIVERY_FEE
+    total_amount = subtotal + delivery_fee
+
+    now = datetime.now()
+
+    return {
+        'order_number': order_number,
+        'user_id': user.id,
+        'customer_name': f"{user.first_name} {user.last_name}".strip() or user.username,
+        'customer_email': user.email,
+        'customer_phone': data['phone'],
+        'delivery_address': data['delivery_address'],
+        'items': items,
+        'subtotal': round(subtotal, 2),
+        'delivery_fee': delivery_fee,
+        'total_amount': round(total_amount, 2),
+        'payment_method': data.get('payment_method', 'cod'),
+        'payment_status': 'pending',
+        'status': 'pending',
+        'status_history': [{'status': 'pending', 'at': now}],
+        'special_instructions': data.get('special_instructions', ''),
+        'created_at': now,
+        'updated_at': now,
+        'estimated_delivery_time': now + DELIVERY_ESTIMATE
+    }
+
+def placed(order):
+    """Response body for a placed (or queued) order"""
+    return {
+        'success': True,
+        'message': 'Order placed successfully',
+        'order': {
+            'id': str(order['_id']),
+            'order_number': order['order_number'],
+            'total_amount': order['total_amount'],
+            'status': order['status'],
+            'estimated_delivery_time': order['estimated_delivery_time'].isoformat()
+        }
+    }
@@ -0,0 +1,450 @@
+"""
+Delivery time estimates.
+
+`EtaEngine` keeps every open order in memory with the status it is in, when
+it got there and how long its slowest dish takes to cook (the catalog's
+`preparation_time`). An estimate is the time left in the current status
+plus the expected time of each status still ahead, so it costs a few
+dictionary lookups and no query.
+
+Expected times are learned from the orders themselves. Each time an order
+leaves a status, its time in that status updates a running average for the
+status and the kitchen queue depth (orders confirmed or preparing) at the
+moment it entered it. For `preparing`, the average is a ratio to the order's
+own preparation time, so a slow biryani and a quick chai are both
+estimated well. Until a depth bucket has MIN_SAMPLES observations the
+status-wide average is used, and DEFAULT_STAGE_SECONDS before anything has
+been seen.
+
+Each worker process follows the open orders on a background thread. It
+warms up by replaying the last WARMUP_DAYS of `status_history` through the
+same code, and every REFRESH_INTERVAL seconds reloads the open orders from
+MongoDB to pick up changes made by other processes. Requests only update
+the in-memory orders and wake the thread; until the warm-up is done, new
+orders get the fixed estimate from orders/checkout.py.
+
+An order's planned delivery time is when its current status started plus
+the expected time of that status and of every status still ahead, so it
+changes when the order moves or the queue and averages shift, never because
+time passes. When an order's planned time moves by PUSH_THRESHOLD seconds
+or more, the thread saves the new estimate to `estimated_delivery_time`
+(with `eta_updated_at`, leaving `updated_at` and delta sync alone) and
+pushes it to the customer as an `order_eta_changed` event.
+
+Each process learns its own averages, so only the process that created an
+order or last changed its status pushes its estimates; others following it
+would each write a slightly different one. An order a process sees moved by
+another in a refresh stops being its own, and orders loaded at warm-up
+belong to no process until they next change status.
+"""
+
+from django.conf import settings
+from pymongo import UpdateOne
+from mongo_client import get_collection
+from menu import catalog
+from . import events
+from bson import ObjectId
+from datetime import datetime, timedelta
+import heapq
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'LEARNING_RATE': 0.05,
+    'DEPTH_BUCKETS': (2, 5, 10, 20),
+    'MIN_SAMPLES': 20,
+    'PUSH_THRESHOLD': 60,
+    'REFRESH_INTERVAL': 60,
+    'WARMUP_DAYS': 7,
+    'WARMUP_ORDERS': 20000,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'ORDER_ETA', {}))
+    return config
+
+PIPELINE = ('pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered')
+KITCHEN = ('confirmed', 'preparing')
+FINAL = ('delivered', 'cancelled')
+
+# Before any history: minutes per status; preparing is a multiple of the dish's preparation time
+DEFAULT_STAGE_SECONDS = {
+    'pending': 2 * 60,
+    'confirmed': 3 * 60,
+    'ready': 6 * 60,
+    'out_for_delivery': 22 * 60,
+}
+DEFAULT_PREP_RATIO = 1.0
+DEFAULT_PREP_SECONDS = 20 * 60
+
+class RunningAverage:
+    """Mean of the first 1/rate samples, then an exponentially weighted average"""
+
+    __slots__ = ('value', 'samples')
+
+    def __init__(self):
+        self.value = 0.0
+        self.samples = 0
+
+    def add(self, sample, rate):
+        self.samples += 1
+        self.value += (sample - self.value) * max(rate, 1 / self.samples)
+
+class OpenOrder:
+    __slots__ = ('order_id', 'user_id', 'order_number', 'status', 'entered_at', 'depth', 'prep_seconds',
+                 'planned', 'eta', 'owned')
+
+    def __init__(self, order_id, user_id, order_number, prep_seconds):
+        self.order_id = order_id
+        self.user_id = user_id
+        self.order_number = order_number
+        self.prep_seconds = prep_seconds
+        self.status = 'pending'
+        self.entered_at = None
+        self.depth = 0
+        self.planned = None
+        self.eta = None
+        # Created or last moved by this process, which pushes its estimates
+        self.owned = False
+
+class EtaEngine:
+    """In-memory model of the open orders; not thread-safe, callers hold a lock"""
+
+    def __init__(self, config=None):
+        self.config = config or get_settings()
+        self.averages = {}
+        self.orders = {}
+        self.kitchen_depth = 0
+
+    def _bucket(self, depth):
+        for index, limit in enumerate(self.config['DEPTH_BUCKETS']):
+            if depth <= limit:
+                return index
+        return len(self.config['DEPTH_BUCKETS'])
+
+    def expected(self, status, depth, prep_seconds):
+        """Expected seconds in `status` for an order entering it at kitchen `depth`"""
+        average = self.averages.get((status, self._bucket(depth)))
+        if average is None or average.samples < self.config['MIN_SAMPLES']:
+            average = self.averages.get((status, None))
+
+        if status == 'preparing':
+            return prep_seconds * (average.value if average else DEFAULT_PREP_RATIO)
+        return average.value if average else DEFAULT_STAGE_SECONDS.get(status, 0)
+
+    def _learn(self, order, seconds):
+        sample = seconds / order.prep_seconds if order.status == 'preparing' else seconds
+        for key in ((order.status, self._bucket(order.depth)), (order.status, None)):
+            self.averages.setdefault(key, RunningAverage()).add(sample, self.config['LEARNING_RATE'])
+
+    def _enter(self, order, status, at):
+        order.depth = self.kitchen_depth
+        order.status = status
+        order.entered_at = at
+        if status in KITCHEN:
+            self.kitchen_depth += 1
+
+    def add(self, order_id, created_at, prep_seconds, user_id=None, order_number=None, status='pending'):
+        order = OpenOrder(order_id, user_id, order_number, prep_seconds)
+        self.orders[order_id] = order
+        self._enter(order, status, created_at)
+        return order
+
+    def transition(self, order_id, new_status, at):
+        order = self.orders.get(order_id)
+        if order is None or order.status == new_status:
+            return
+
+        # Cancellations say nothing about how long a status takes
+        if new_status != 'cancelled':
+            self._learn(order, max(0.0, (at - order.entered_at).total_seconds()))
+        if order.status in KITCHEN:
+            self.kitchen_depth -= 1
+
+        if new_status in FINAL:
+            del self.orders[order_id]
+        else:
+            self._enter(order, new_status, at)
+
+    def _ahead(self, order):
+        # Expected seconds of the statuses after the current one
+        return sum(
+            self.expected(status, self.kitchen_depth, order.prep_seconds)
+            for status in PIPELINE[PIPELINE.index(order.status) + 1:-1]
+        )
+
+    def remaining(self, order, now):
+        """Seconds until `order` is expected to be delivered"""
+        current = self.expected(order.status, order.depth, order.prep_seconds)
+        elapsed = (now - order.entered_at).total_seconds()
+        # An order running late is still expected to take a little longer
+        return max(current - elapsed, current * 0.1) + self._ahead(order)
+
+    def planned(self, order):
+        """Delivery time planned from when `order` entered its status; the same at any `now`"""
+        current = self.expected(order.status, order.depth, order.prep_seconds)
+        return order.entered_at + timedelta(seconds=current + self._ahead(order))
+
+    def estimate(self, order_id, now):
+        order = self.orders.get(order_id)
+        return None if order is None else now + timedelta(seconds=self.remaining(order, now))
+
+    def estimate_new(self, prep_seconds, now):
+        """ETA of an order placed now"""
+        order = OpenOrder(None, None, None, prep_seconds)
+        order.entered_at = now
+        order.depth = self.kitchen_depth
+        return now + timedelta(seconds=self.remaining(order, now))
+
+    def recompute(self, now, threshold):
+        """
+        Re-plan every open order; returns the owned ones whose planned delivery
+        moved by `threshold` seconds or more, with `eta` set to their new
+        estimate. Other orders, and owned ones with no plan yet, are re-planned
+        without being returned.
+        """
+        moved = []
+        for order in self.orders.values():
+            planned = self.planned(order)
+            if order.planned is None or not order.owned:
+                order.planned = planned
+            elif abs((planned - order.planned).total_seconds()) >= threshold:
+                order.planned = planned
+                order.eta = now + timedelta(seconds=self.remaining(order, now))
+                moved.append(order)
+        return moved
+
+def prep_seconds(items, snapshot):
+    """Preparation time of the slowest dish among order lines, from the catalog"""
+    minutes = [
+        (snapshot.get_item(item['item_id']) or {}).get('preparation_time')
+        for item in items
+    ]
+    minutes = [m for m in minutes if m]
+    return max(minutes) * 60 if minutes else DEFAULT_PREP_SECONDS
+
+def history_events(orders):
+    """(at, order, status) for every status_history entry of `orders`, in time order"""
+    streams = [
+        [(entry['at'], index, order, entry['status']) for entry in order.get('status_history', [])]
+        for index, order in enumerate(orders)
+    ]
+    for at, _, order, status in heapq.merge(*streams, key=lambda event: (event[0], event[1])):
+        yield at, order, status
+
+def replay(engine, orders, snapshot):
+    """Feed the status histories of `orders` through `engine`, oldest change first"""
+    for at, order, status in history_events(orders):
+        order_id = str(order['_id'])
+        if order_id not in engine.orders and status == 'pending':
+            engine.add(order_id, at, prep_seconds(order.get('items', []), snapshot),
+                       order.get('user_id'), order.get('order_number'))
+        else:
+            engine.transition(order_id, status, at)
+
+# Fields the engine needs from an order document
+ORDER_PROJECTION = {
+    'status': 1, 'status_history': 1, 'created_at': 1, 'updated_at': 1,
+    'user_id': 1, 'order_number': 1, 'items.item_id': 1,
+}
+
+class _EngineHolder:
+    """This process's engine and the background thread that keeps it current"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engine = None
+        self._pid = None
+        self._touched = set()
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def peek(self):
+        """The engine, or None if this process has not loaded it yet"""
+        return self._engine if self._pid == os.getpid() else None
+
+    def locked(self):
+        return self._lock
+
+    def touch(self, order_id):
+        """Note an order changed by this process, so a refresh already under way keeps it; hold the lock"""
+        self._touched.add(order_id)
+
+    def wake(self):
+        """Start the thread if it is not running and have it re-plan the open orders"""
+        with self._start_lock:
+            # Threads do not survive a fork
+            if self._thread is None or not self._thread.is_alive():
+                self._wake = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='eta-engine', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        refreshed_at = None
+        while True:
+            self._wake.clear()
+            config = get_settings()
+            try:
+                refreshed_at = self._update(config, refreshed_at)
+            except Exception as e:
+                logger.error(f"Error updating delivery estimates: {e}")
+            waited = time.monotonic() - refreshed_at if refreshed_at is not None else 0.0
+            self._wake.wait(max(0.0, config['REFRESH_INTERVAL'] - waited))
+
+    def _update(self, config, refreshed_at):
+        """Load or refresh the engine when due, then push the ETAs that moved; returns when it last refreshed"""
+        engine = self.peek()
+        if engine is None:
+            engine = self._load()
+            with self._lock:
+                self._engine, self._pid = engine, os.getpid()
+                self._touched = set()
+            refreshed_at = time.monotonic()
+        elif time.monotonic() - refreshed_at >= config['REFRESH_INTERVAL']:
+            with self._lock:
+                self._touched = set()
+            documents, snapshot = self._open_orders(), catalog.get_snapshot()
+            with self._lock:
+                self._refresh(engine, documents, snapshot)
+            refreshed_at = time.monotonic()
+
+        with self._lock:
+            moved = engine.recompute(datetime.now(), config['PUSH_THRESHOLD'])
+        _push(moved)
+        return refreshed_at
+
+    def _load(self):
+        config = get_settings()
+        engine = EtaEngine(config)
+        since = datetime.now() - timedelta(days=config['WARMUP_DAYS'])
+        recent = list(
+            get_collection('orders')
+            .find({'created_at': {'$gte': since}}, ORDER_PROJECTION)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(config['WARMUP_ORDERS'])
+        )
+        replay(engine, reversed(recent), catalog.get_snapshot())
+        logger.info(f"ETA engine learned from {len(recent)} orders; {len(engine.orders)} open")
+        return engine
+
+    def _open_orders(self):
+        # Open orders as MongoDB has them, including ones other processes created or moved
+        return list(get_collection('orders').find(
+            {'status': {'$nin': list(FINAL)}},
+            {**ORDER_PROJECTION, 'status_history': {'$slice': -1}}
+        ))
+
+    def _refresh(self, engine, documents, snapshot):
+        previous = engine.orders
+        engine.orders, engine.kitchen_depth = {}, 0
+        for document in sorted(documents, key=lambda document: document['created_at']):
+            order_id = str(document['_id'])
+            if order_id in self._touched:
+                continue
+            history = document.get('status_history') or [{}]
+            order = engine.add(
+                order_id,
+                history[-1].get('at', document.get('updated_at', document['created_at'])),
+                prep_seconds(document.get('items', []), snapshot),
+                document.get('user_id'), document.get('order_number'), document['status']
+            )
+            known = previous.get(order_id)
+            # Still in the status it was planned in; otherwise another process moved it and now owns it
+            if known is not None and known.status == order.status:
+                order.depth, order.planned, order.eta, order.owned = known.depth, known.planned, known.eta, known.owned
+
+        # Changed here after the query ran, so memory is newer than the documents
+        for order_id in self._touched:
+            known = previous.get(order_id)
+            if known is not None:
+                engine.orders[order_id] = known
+                if known.status in KITCHEN:
+                    engine.kitchen_depth += 1
+
+_holder = _EngineHolder()
+
+def estimate_new_order(order):
+    """ETA for a priced order that is about to be saved; the fixed estimate until the engine has warmed up"""
+    engine = _holder.peek()
+    if engine is None:
+        _holder.wake()
+        return order['estimated_delivery_time']
+    try:
+        prep = prep_seconds(order['items'], catalog.get_snapshot())
+        with _holder.locked():
+            return engine.estimate_new(prep, order['created_at'])
+    except Exception as e:
+        logger.error(f"Error estimating delivery time: {e}")
+        return order['estimated_delivery_time']
+
+async def aestimate_new_order(order):
+    """estimate_new_order() for async views"""
+    engine = _holder.peek()
+    if engine is None:
+        _holder.wake()
+        return order['estimated_delivery_time']
+    try:
+        prep = prep_seconds(order['items'], await catalog.aget_snapshot())
+        with _holder.locked():
+            return engine.estimate_new(prep, order['created_at'])
+    except Exception as e:
+        logger.error(f"Error estimating delivery time: {e}")
+        return order['estimated_delivery_time']
+
+def orders_created(orders):
+    """Start following newly saved orders; the engine's thread pushes the ETAs that moved"""
+    try:
+        engine = _holder.peek()
+        if engine is not None:
+            snapshot = catalog.get_snapshot()
+            with _holder.locked():
+                for order in orders:
+                    opened = engine.add(str(order['_id']), order['created_at'],
+                                        prep_seconds(order['items'], snapshot),
+                                        order.get('user_id'), order.get('order_number'))
+                    # Already saved with the order and sent in the response
+                    opened.planned = engine.planned(opened)
+                    opened.eta = order.get('estimated_delivery_time')
+                    opened.owned = True
+                    _holder.touch(opened.order_id)
+        _holder.wake()
+    except Exception as e:
+        logger.error(f"Error updating delivery estimates: {e}")
+
+def status_changed(changes, at):
+    """Apply (order before the update, new status) pairs changed at `at`; the thread pushes ETAs that moved"""
+    try:
+        engine = _holder.peek()
+        if engine is not None:
+            with _holder.locked():
+                for order, new_status in changes:
+                    order_id = str(order['_id'])
+                    engine.transition(order_id, new_status, at)
+                    if order_id in engine.orders:
+                        engine.orders[order_id].owned = True
+                    _holder.touch(order_id)
+        _holder.wake()
+    except Exception as e:
+        logger.error(f"Error updating delivery estimates: {e}")
+
+def _push(moved):
+    if not moved:
+        return
+
+    # Not updated_at: a new estimate is not a change the admin board or delta sync need to see
+    now = datetime.now()
+    get_collection('orders').bulk_write([
+        UpdateOne(
+            {'_id': ObjectId(order.order_id), 'status': {'$nin': list(FINAL)}},
+            {'$set': {'estimated_delivery_time': order.eta, 'eta_updated_at': now}}
+        )
+        for order in moved
+    ], ordered=False)
+    events.publish_eta_changes(moved)
@@ -0,0 +1,206 @@
+"""
+Order events for the live stream.
+
+`create_order` and `update_order_status` publish events; `/api/orders/stream/`
+subscribes and forwards them to the browser as server-sent events.
+
+A bulk status update publishes one `order_status_batch` event for staff,
+plus the usual per-order events for the customers concerned. Those, and
+the `order_eta_changed` events from orders/eta.py, are marked
+`customer_only` and staff subscriptions skip them.
+
+The broker is chosen by ORDER_EVENTS['BACKEND'] so a cross-process backend
+(Redis pub/sub, a capped MongoDB collection, ...) can replace the default
+in-process one. A backend needs `publish(event)` and `subscribe(predicate)`,
+where subscribe returns an object with `get(timeout)` and `close()`, and
+preferably `aget(timeout)` for the async stream (without it, each async
+stream waits in a worker thread).
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from datetime import datetime
+import asyncio
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = 'order_created'
+ORDER_STATUS_CHANGED = 'order_status_changed'
+ORDER_STATUS_BATCH = 'order_status_batch'
+ORDER_ETA_CHANGED = 'order_eta_changed'
+# Sent when a subscriber fell behind and events were dropped
+RESYNC = 'resync'
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'orders.events.InProcessBroker',
+    'SUBSCRIBER_QUEUE_SIZE': 100,
+    'HEARTBEAT_INTERVAL': 15,
+    'MAX_STREAM_DURATION': 300,
+    'MAX_SYNC_STREAMS': 0,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'ORDER_EVENTS', {}))
+    return config
+
+class Subscription:
+    def __init__(self, broker, predicate, maxsize):
+        self._broker = broker
+        self._predicate = predicate
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._overflowed = False
+        # (event loop, asyncio.Event) of a pending aget(), woken from the publishing thread
+        self._waiter = None
+
+    def offer(self, event):
+        if not self._predicate(event):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+        waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The loop was closed under a stream that is going away
+                pass
+
+    def _take(self, timeout):
+        if self._overflowed:
+            self._overflowed = False
+            # Drop the backlog; the client reloads everything on resync
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            return {'type': RESYNC}
+        try:
+            return self._queue.get(block=timeout > 0, timeout=timeout or None)
+        except queue.Empty:
+            return None
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within `timeout` seconds"""
+        return self._take(timeout)
+
+    async def aget(self, timeout):
+        """get() for async views: waits on the event loop instead of holding a thread"""
+        event = self._take(0)
+        if event is not None:
+            return event
+
+        ready = asyncio.Event()
+        self._waiter = (asyncio.get_running_loop(), ready)
+        try:
+            # An event offered before the waiter was registered did not wake it
+            event = self._take(0)
+            if event is None:
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+                event = self._take(0)
+            return event
+        finally:
+            self._waiter = None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+class InProcessBroker:
+    """Fans events out to subscribers in this worker process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, predicate):
+        subscription = Subscription(self, predicate, get_settings()['SUBSCRIBER_QUEUE_SIZE'])
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(event)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(get_settings()['BACKEND'])()
+    return _broker
+
+def _order_event(event_type, order, **extra):
+    return {
+        'type': event_type,
+        'order_id': str(order['_id']),
+        'order_number': order.get('order_number'),
+        'user_id': order.get('user_id'),
+        'status': order.get('status'),
+        'at': datetime.now().isoformat(),
+        **extra
+    }
+
+def publish(event_type, order, **extra):
+    """Publish an order event; never raises, the order change has already happened"""
+    try:
+        get_broker().publish(_order_event(event_type, order, **extra))
+    except Exception as e:
+        logger.error(f"Error publishing order event: {e}")
+
+def publish_status_batch(changes):
+    """Publish status changes of many orders; `changes` are (order after the update, previous status) pairs"""
+    try:
+        broker = get_broker()
+        events = [_order_event(ORDER_STATUS_CHANGED, order, previous_status=previous, customer_only=True)
+                  for order, previous in changes]
+        broker.publish({
+            'type': ORDER_STATUS_BATCH,
+            'orders': [{key: value for key, value in event.items() if key not in ('type', 'customer_only')}
+                       for event in events],
+            'at': datetime.now().isoformat()
+        })
+        for event in events:
+            broker.publish(event)
+    except Exception as e:
+        logger.error(f"Error publishing order events: {e}")
+
+def publish_eta_changes(orders):
+    """Tell customers their new delivery estimate; `orders` are eta.OpenOrder objects"""
+    try:
+        broker = get_broker()
+        for order in orders:
+            broker.publish({
+                'type': ORDER_ETA_CHANGED,
+                'order_id': order.order_id,
+                'order_number': order.order_number,
+                'user_id': order.user_id,
+                'status': order.status,
+                'estimated_delivery_time': order.eta.isoformat(),
+                'at': datetime.now().isoformat(),
+                'customer_only': True
+            })
+    except Exception as e:
+        logger.error(f"Error publishing order events: {e}")
+
+def subscribe(user):
+    """Subscribe to events visible to `user`: everything for staff, own orders otherwise"""
+    if user.is_staff:
+        return get_broker().subscribe(lambda event: not event.get('customer_only'))
+    return get_broker().subscribe(lambda event: event.get('user_id') == user.id)
@@ -0,0 +1,74 @@
+"""
+Idempotency keys for order placement.
+
+A client sends the same `Idempotency-Key` header when it retries a request.
+The first request claims the key; once it finishes, its response is stored so
+retries get the original response back instead of placing a second order.
+Keys expire after mongo_indexes.IDEMPOTENCY_KEY_TTL seconds through a TTL
+index on `idempotency_keys.created_at`.
+"""
+
+from asgiref.sync import sync_to_async
+from pymongo.errors import DuplicateKeyError
+from mongo_client import get_collection, get_async_collection
+from mongo_indexes import ensure_indexes
+from datetime import datetime
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+IN_PROGRESS = 'in_progress'
+COMPLETED = 'completed'
+
+_indexes_ready = False
+
+def _keys():
+    global _indexes_ready
+    if not _indexes_ready:
+        ensure_indexes(['idempotency_keys'])
+        _indexes_ready = True
+    return get_collection('idempotency_keys')
+
+async def _akeys():
+    if not _indexes_ready:
+        await sync_to_async(_keys, thread_sensitive=False)()
+    return get_async_collection('idempotency_keys')
+
+def _key_id(user_id, key):
+    return f'{user_id}:{key}'
+
+def _claim_record(user_id, key):
+    return {'_id': _key_id(user_id, key), 'state': IN_PROGRESS, 'created_at': datetime.now()}
+
+def _completed(status_code, body):
+    return {'$set': {'state': COMPLETED, 'status_code': status_code, 'body': body}}
+
+def claim(user_id, key):
+    """Claim a key; returns None if claimed now, or the existing record if it was already used"""
+    try:
+        _keys().insert_one(_claim_record(user_id, key))
+        return None
+    except DuplicateKeyError:
+        return _keys().find_one({'_id': _key_id(user_id, key)})
+
+def complete(user_id, key, status_code, body):
+    """Store the response so retries with the same key can replay it"""
+    _keys().update_one({'_id': _key_id(user_id, key)}, _completed(status_code, body))
+
+def release(user_id, key):
+    """Forget a key whose request failed, so a retry runs again"""
+    _keys().delete_one({'_id': _key_id(user_id, key)})
+
+async def aclaim(user_id, key):
+    keys = await _akeys()
+    try:
+        await keys.insert_one(_claim_record(user_id, key))
+        return None
+    except DuplicateKeyError:
+        return await keys.find_one({'_id': _key_id(user_id, key)})
+
+async def acomplete(user_id, key, status_code, body):
+    await (await _akeys()).update_one({'_id': _key_id(user_id, key)}, _completed(status_code, body))
+
+async def arelease(user_id, key):
+    await (await _akeys()).delete_one({'_id': _key_id(user_id, key)})
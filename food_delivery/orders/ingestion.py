@@ -0,0 +1,333 @@
+"""
+Write-behind order ingestion for peak hours.
+
+With ORDER_INGESTION['WRITE_BEHIND'] on, `create_order` prices the order,
+appends it to a SQLite queue in WAL mode on local disk and answers 202
+straight away. Concurrent requests share one SQLite transaction (group
+commit), so a burst costs a handful of fsyncs. A background thread drains the queue into `orders` with
+`insert_many` and then runs the stats and event hooks for the inserted orders.
+
+Orders get their `_id` before they are queued, so a batch that is retried
+after a partial failure (or drained by two processes sharing the queue file)
+never inserts an order twice: a duplicate `_id` is recognised and
+acknowledged. An order MongoDB rejects for any other reason, such as a
+clash on the unique `order_number` index, would be rejected again on every
+retry, so it is logged and moved to the `failed_orders` table of the queue
+file instead of blocking the orders behind it.
+Rows stay in the queue until MongoDB has them, so orders queued before a
+crash or restart are inserted when a server process starts again: the
+WSGI and ASGI entry points call `resume()`, which management commands and
+tests never load (`python manage.py drain_order_queue` flushes them by hand).
+
+The queue holds at most MAX_PENDING orders; beyond that `enqueue` raises
+QueueFull and the view answers 503 with Retry-After.
+"""
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError
+from mongo_client import get_collection
+from datetime import datetime
+import bson
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'WRITE_BEHIND': False,
+    'QUEUE_PATH': 'order_queue.sqlite3',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.1,
+    'MAX_PENDING': 5000,
+    'RETRY_DELAY': 1.0,
+    'SYNCHRONOUS': 'FULL',
+    'DRAIN_ON_STARTUP': True,
+}
+
+DUPLICATE_KEY = 11000
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'ORDER_INGESTION', {}))
+    return config
+
+def write_behind_enabled():
+    return bool(get_settings()['WRITE_BEHIND'])
+
+class QueueFull(Exception):
+    pass
+
+def _already_inserted(error):
+    if error.get('code') != DUPLICATE_KEY:
+        return False
+    # Servers before MongoDB 4.4 report no keyPattern, only the index name
+    if 'keyPattern' not in error:
+        return ' index: _id_ ' in error.get('errmsg', '')
+    return error['keyPattern'] == {'_id': 1}
+
+class OrderQueue:
+    """Durable FIFO of order documents in a SQLite file"""
+
+    def __init__(self, path, max_pending, synchronous='FULL'):
+        self.path = str(path)
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffer = []
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={synchronous}')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS pending_orders ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'document BLOB NOT NULL, '
+            'enqueued_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS failed_orders ('
+            'id INTEGER PRIMARY KEY, '
+            'document BLOB NOT NULL, '
+            'enqueued_at REAL NOT NULL, '
+            'failed_at REAL NOT NULL, '
+            'error_code INTEGER, '
+            'error TEXT)'
+        )
+        self._pending = self._count()
+
+    def _count(self):
+        return self._conn.execute('SELECT COUNT(*) FROM pending_orders').fetchone()[0]
+
+    def __len__(self):
+        return self._pending
+
+    def enqueue(self, order):
+        """Append an order; it is on disk when this returns"""
+        # [document, enqueued_at, outcome]: outcome is None until committed, then True or the error
+        entry = [bson.encode(order), time.time(), None]
+        if self._pending + len(self._buffer) >= self.max_pending:
+            # Another process sharing the file may have drained it meanwhile
+            with self._lock:
+                self._pending = self._count()
+        with self._buffer_lock:
+            if self._pending + len(self._buffer) >= self.max_pending:
+                raise QueueFull(f'{self._pending} orders waiting to be written')
+            self._buffer.append(entry)
+
+        # Group commit: whoever holds the lock writes every buffered order in one
+        # transaction, so concurrent requests share a single fsync
+        with self._lock:
+            if entry[2] is None:
+                with self._buffer_lock:
+                    batch, self._buffer = self._buffer, []
+                try:
+                    with self._conn:
+                        self._conn.execute('BEGIN')
+                        self._conn.executemany(
+                            'INSERT INTO pending_orders (document, enqueued_at) VALUES (?, ?)',
+                            [(document, enqueued_at) for document, enqueued_at, _ in batch]
+                        )
+                    self._pending += len(batch)
+                    outcome = True
+                except sqlite3.Error as e:
+                    outcome = e
+                for queued in batch:
+                    queued[2] = outcome
+
+        if entry[2] is not True:
+            raise entry[2]
+
+    def peek(self, limit):
+        """Oldest `limit` orders as (row id, document) pairs, left in the queue"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, document FROM pending_orders ORDER BY id LIMIT ?', (limit,)
+            ).fetchall()
+        return [(row_id, bson.decode(document)) for row_id, document in rows]
+
+    def ack(self, row_ids):
+        """Remove orders that MongoDB now has"""
+        if not row_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany('DELETE FROM pending_orders WHERE id = ?', [(i,) for i in row_ids])
+            # Another process may share the file, so recount instead of subtracting
+            self._pending = self._count()
+
+    def reject(self, failures):
+        """Move orders MongoDB refused to failed_orders; `failures` are (row id, write error) pairs"""
+        if not failures:
+            return
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO failed_orders (id, document, enqueued_at, failed_at, error_code, error) '
+                'SELECT id, document, enqueued_at, ?, ?, ? FROM pending_orders WHERE id = ?',
+                [(time.time(), error.get('code'), error.get('errmsg'), row_id) for row_id, error in failures]
+            )
+            self._conn.executemany('DELETE FROM pending_orders WHERE id = ?', [(i,) for i, _ in failures])
+            self._pending = self._count()
+
+    def failed(self):
+        """Orders moved to failed_orders, as (row id, document, error) tuples"""
+        with self._lock:
+            rows = self._conn.execute('SELECT id, document, error FROM failed_orders ORDER BY id').fetchall()
+        return [(row_id, bson.decode(document), error) for row_id, document, error in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class OrderIngestor:
+    """Drains an OrderQueue into a MongoDB collection on a background thread"""
+
+    def __init__(self, queue, collection_name='orders', batch_size=200,
+                 flush_interval=0.1, retry_delay=1.0, on_inserted=None):
+        self.queue = queue
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.on_inserted = on_inserted
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread if it is not running"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='order-ingestor', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, order):
+        self.queue.enqueue(order)
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                written = self.flush_batch()
+            except Exception as e:
+                logger.error(f"Error writing queued orders, retrying: {e}")
+                self._stop.wait(self.retry_delay)
+                continue
+            if not written:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+
+    def flush_batch(self):
+        """Write one batch; returns how many queued orders left the queue, inserted or moved to failed_orders"""
+        batch = self.queue.peek(self.batch_size)
+        if not batch:
+            return 0
+
+        documents = [document for _, document in batch]
+        # updated_at is when the order reached MongoDB, so delta sync (orders/changes.py)
+        # picks up orders that sat in the queue longer than its settle window
+        written_at = datetime.now()
+        for document in documents:
+            document['updated_at'] = written_at
+        failed = {}
+        try:
+            get_collection(self.collection_name).insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index']: error for error in e.details['writeErrors']}
+
+        # A duplicate _id was inserted by an earlier attempt and is settled too;
+        # any other write error would repeat on every retry
+        settled, rejected = [], []
+        for index, (row_id, document) in enumerate(batch):
+            error = failed.get(index)
+            if error is None or _already_inserted(error):
+                settled.append(row_id)
+            else:
+                logger.error(
+                    f"Order {document.get('order_number')} ({document['_id']}) was refused by MongoDB "
+                    f"and moved to failed_orders: {error.get('errmsg')}"
+                )
+                rejected.append((row_id, error))
+        inserted = [document for index, document in enumerate(documents) if index not in failed]
+
+        self.queue.ack(settled)
+        self.queue.reject(rejected)
+        if inserted and self.on_inserted:
+            try:
+                self.on_inserted(inserted)
+            except Exception as e:
+                logger.error(f"Error running hooks for queued orders: {e}")
+        return len(batch)
+
+    def drain(self):
+        """Write everything queued, in the calling thread; returns how many orders left the queue"""
+        total = 0
+        while True:
+            written = self.flush_batch()
+            if not written:
+                return total
+            total += written
+
+def _after_insert(orders):
+    from . import eta, events, kitchen, stats
+
+    try:
+        stats.record_orders_created(orders)
+    except Exception as e:
+        logger.error(f"Error updating order stats: {e}")
+    for order in orders:
+        events.publish(events.ORDER_CREATED, order)
+    eta.orders_created(orders)
+    kitchen.orders_created(orders)
+
+_ingestor = None
+_ingestor_pid = None
+_ingestor_lock = threading.Lock()
+
+def get_ingestor():
+    """The ingestor for the configured queue file, one per process"""
+    global _ingestor, _ingestor_pid
+    # SQLite connections and threads do not survive a fork
+    if _ingestor_pid != os.getpid():
+        with _ingestor_lock:
+            if _ingestor_pid != os.getpid():
+                config = get_settings()
+                _ingestor = OrderIngestor(
+                    OrderQueue(queue_path(), config['MAX_PENDING'], config['SYNCHRONOUS']),
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    retry_delay=config['RETRY_DELAY'],
+                    on_inserted=_after_insert
+                )
+                _ingestor_pid = os.getpid()
+    return _ingestor
+
+def submit(order):
+    """Queue an order for insertion; raises QueueFull when the backlog is at its limit"""
+    get_ingestor().submit(order)
+
+def queue_path():
+    path = get_settings()['QUEUE_PATH']
+    return path if os.path.isabs(path) else os.path.join(settings.BASE_DIR, path)
+
+def resume():
+    """
+    Start draining orders left in the queue by a previous run; called by the
+    server entry points (srinu_foods/wsgi.py and asgi.py) only, unless
+    DRAIN_ON_STARTUP is off because another process drains the queue
+    """
+    config = get_settings()
+    if config['WRITE_BEHIND'] and config['DRAIN_ON_STARTUP'] and os.path.exists(queue_path()):
+        get_ingestor().start()
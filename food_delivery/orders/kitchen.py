@@ -0,0 +1,303 @@
+"""
+Kitchen work queue.
+
+Orders waiting for the kitchen (pending or confirmed) are grouped by dish:
+every line for the same `item_id` joins that dish's queue, oldest first, and
+the kitchen cooks a dish in batches of up to BATCH_LIMIT portions. A batch
+takes the dish's `preparation_time` plus PORTION_OVERHEAD of it for every
+extra portion, so six biryanis in one pot cost far less than six pots.
+
+The next batch for a free station is the one with the most portions per
+minute of cooking, weighted up as its oldest order waits. A batch whose
+oldest order has waited MAX_WAIT seconds is urgent, and urgent batches go
+first, oldest order first: batching holds no order back for more than
+MAX_WAIT, and past it the queue drains oldest first, as FIFO would.
+
+`KitchenQueue` is updated in memory as orders are created and move on.
+`plan()` lays the waiting batches out over STATIONS stations without
+changing the queue, for the admin endpoint. `next_batch()` takes a batch
+out, for the simulation in benchmarks/kitchen_sim.py. Only the admin
+endpoint loads the waiting orders from MongoDB, on first use and again once
+REFRESH_INTERVAL seconds have passed, to see orders other processes created
+or moved; checkouts and status updates never query for the queue.
+"""
+
+from django.conf import settings
+from mongo_client import get_collection
+from menu import catalog
+from datetime import datetime, timedelta
+import heapq
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'STATIONS': 4,
+    'BATCH_LIMIT': 6,
+    'PORTION_OVERHEAD': 0.15,
+    'MAX_WAIT': 900,
+    'REFRESH_INTERVAL': 60,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'KITCHEN', {}))
+    return config
+
+WAITING = ('pending', 'confirmed')
+DEFAULT_PREP_SECONDS = 20 * 60
+
+class Line:
+    __slots__ = ('order_id', 'order_number', 'item_id', 'quantity', 'created_at')
+
+    def __init__(self, order_id, order_number, item_id, quantity, created_at):
+        self.order_id = order_id
+        self.order_number = order_number
+        self.item_id = item_id
+        self.quantity = quantity
+        self.created_at = created_at
+
+class Batch:
+    __slots__ = ('item_id', 'lines', 'portions', 'oldest', 'seconds')
+
+    def __init__(self, item_id, lines, prep_seconds, overhead):
+        self.item_id = item_id
+        self.lines = lines
+        self.portions = sum(line.quantity for line in lines)
+        self.oldest = lines[0].created_at
+        self.seconds = prep_seconds * (1 + overhead * (self.portions - 1))
+
+class KitchenQueue:
+    """Waiting order lines grouped by dish; not thread-safe, callers hold a lock"""
+
+    def __init__(self, prep_seconds, config=None):
+        self.prep_seconds = prep_seconds
+        self.config = config or get_settings()
+        self.dishes = {}
+        self.orders = {}
+
+    def add(self, order_id, created_at, items, order_number=None):
+        """Queue an order's lines; `items` are order lines with item_id and quantity"""
+        # The first order a process sees is also in the load that precedes it
+        self.remove(order_id)
+        lines = [Line(order_id, order_number, item['item_id'], item['quantity'], created_at) for item in items]
+        self.orders[order_id] = lines
+        for line in lines:
+            queue = self.dishes.setdefault(line.item_id, [])
+            queue.append(line)
+            # Orders reloaded from MongoDB or written late can arrive out of order
+            if len(queue) > 1 and queue[-2].created_at > created_at:
+                queue.sort(key=lambda line: line.created_at)
+
+    def remove(self, order_id):
+        """Drop whatever is left of an order that moved on or was cancelled"""
+        for line in self.orders.pop(order_id, ()):
+            self._take(line)
+
+    def _take(self, line):
+        queue = self.dishes[line.item_id]
+        queue.remove(line)
+        if not queue:
+            del self.dishes[line.item_id]
+
+    def _chunks(self, item_id):
+        """The dish's waiting lines cut into batches of up to BATCH_LIMIT portions, oldest first"""
+        lines, portions = [], 0
+        for line in self.dishes[item_id]:
+            if lines and portions + line.quantity > self.config['BATCH_LIMIT']:
+                yield self._batch(item_id, lines)
+                lines, portions = [], 0
+            lines.append(line)
+            portions += line.quantity
+        yield self._batch(item_id, lines)
+
+    def _batch(self, item_id, lines):
+        return Batch(item_id, lines, self.prep_seconds(item_id), self.config['PORTION_OVERHEAD'])
+
+    def _pick(self, batches, at):
+        max_wait = self.config['MAX_WAIT']
+        urgent = [batch for batch in batches if (at - batch.oldest).total_seconds() >= max_wait]
+        if urgent:
+            return min(urgent, key=lambda batch: batch.oldest)
+        return max(batches, key=lambda batch: (
+            batch.portions / batch.seconds * (1 + (at - batch.oldest).total_seconds() / max_wait)
+        ))
+
+    def next_batch(self, at, batching=True):
+        """
+        Take the batch a station free at `at` should cook next, or None if
+        nothing is waiting; without `batching`, the oldest line on its own (FIFO)
+        """
+        if not self.dishes:
+            return None
+        if batching:
+            # A dish's first batch holds its oldest orders, so later ones never win
+            batch = self._pick([next(self._chunks(item_id)) for item_id in self.dishes], at)
+        else:
+            line = min((queue[0] for queue in self.dishes.values()), key=lambda line: line.created_at)
+            batch = self._batch(line.item_id, [line])
+
+        for line in batch.lines:
+            self._take(line)
+            lines = self.orders[line.order_id]
+            lines.remove(line)
+            if not lines:
+                del self.orders[line.order_id]
+        return batch
+
+    def plan(self, now, stations_free_at=None):
+        """[(batch, station, start)] for everything waiting, without changing the queue"""
+        chunks = {item_id: self._chunks(item_id) for item_id in self.dishes}
+        heads = {item_id: next(batches) for item_id, batches in chunks.items()}
+        stations = [(at, station) for station, at in enumerate(
+            stations_free_at or [now] * self.config['STATIONS']
+        )]
+        heapq.heapify(stations)
+
+        plan = []
+        while heads:
+            at, station = heapq.heappop(stations)
+            batch = self._pick(list(heads.values()), at)
+            following = next(chunks[batch.item_id], None)
+            if following is None:
+                del heads[batch.item_id]
+            else:
+                heads[batch.item_id] = following
+            plan.append((batch, station, at))
+            heapq.heappush(stations, (at + timedelta(seconds=batch.seconds), station))
+        return plan
+
+def catalog_prep_seconds(snapshot):
+    """item_id -> the dish's preparation_time in seconds, for KitchenQueue"""
+    def prep_seconds(item_id):
+        minutes = (snapshot.get_item(item_id) or {}).get('preparation_time')
+        return minutes * 60 if minutes else DEFAULT_PREP_SECONDS
+    return prep_seconds
+
+class _QueueHolder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self._loaded_at = 0.0
+        # Changes made while a reload is querying, replayed onto the reloaded queue
+        self._missed = None
+
+    def _load(self):
+        queue = KitchenQueue(catalog_prep_seconds(catalog.get_snapshot()))
+        waiting = get_collection('orders').find(
+            {'status': {'$in': list(WAITING)}},
+            {'created_at': 1, 'order_number': 1, 'items.item_id': 1, 'items.quantity': 1}
+        ).sort([('created_at', 1), ('_id', 1)])
+        for order in waiting:
+            queue.add(str(order['_id']), order['created_at'], order.get('items', []), order.get('order_number'))
+        logger.info(f"Kitchen queue loaded with {len(queue.orders)} waiting orders")
+        return queue
+
+    def peek(self):
+        """The queue, or None if this process has not loaded it yet"""
+        return self._queue if self._pid == os.getpid() else None
+
+    def _fresh(self):
+        queue = self.peek()
+        if queue is not None and time.monotonic() - self._loaded_at < queue.config['REFRESH_INTERVAL']:
+            return queue
+        return None
+
+    def get(self):
+        """The queue for this process, loaded on first use and reloaded every REFRESH_INTERVAL; for work_queue()"""
+        queue = self._fresh()
+        if queue is not None:
+            return queue
+
+        with self._reload_lock:
+            # Another request may have reloaded it meanwhile
+            queue = self._fresh()
+            if queue is not None:
+                return queue
+            with self._lock:
+                self._missed = []
+            try:
+                queue = self._load()
+            except Exception:
+                with self._lock:
+                    self._missed = None
+                raise
+            with self._lock:
+                for change in self._missed:
+                    change(queue)
+                self._queue, self._pid, self._loaded_at = queue, os.getpid(), time.monotonic()
+                self._missed = None
+            return queue
+
+    def apply(self, change):
+        """Run `change(queue)` on the loaded queue, in memory; before the first load there is nothing to change"""
+        with self._lock:
+            queue = self.peek()
+            if queue is not None:
+                change(queue)
+            if self._missed is not None:
+                self._missed.append(change)
+
+    def locked(self):
+        return self._lock
+
+_holder = _QueueHolder()
+
+def orders_created(orders):
+    """Queue newly saved orders"""
+    def add(queue):
+        for order in orders:
+            queue.add(str(order['_id']), order['created_at'], order['items'], order.get('order_number'))
+
+    try:
+        _holder.apply(add)
+    except Exception as e:
+        logger.error(f"Error updating kitchen queue: {e}")
+
+def status_changed(changes):
+    """Drop orders that left pending/confirmed; `changes` are (order before the update, new status) pairs"""
+    def remove(queue):
+        for order, new_status in changes:
+            if new_status not in WAITING:
+                queue.remove(str(order['_id']))
+
+    try:
+        _holder.apply(remove)
+    except Exception as e:
+        logger.error(f"Error updating kitchen queue: {e}")
+
+def work_queue():
+    """The kitchen's next batches, for the admin endpoint"""
+    queue = _holder.get()
+    snapshot = catalog.get_snapshot()
+    now = datetime.now()
+    with _holder.locked():
+        plan = queue.plan(now)
+        waiting = len(queue.orders)
+        oldest = min((lines[0].created_at for lines in queue.orders.values() if lines), default=None)
+
+    max_wait = queue.config['MAX_WAIT']
+    return {
+        'waiting_orders': waiting,
+        'oldest_wait_seconds': round((now - oldest).total_seconds()) if oldest else 0,
+        'batches': [{
+            'item_id': batch.item_id,
+            'name': (snapshot.get_item(batch.item_id) or {}).get('name', batch.item_id),
+            'portions': batch.portions,
+            'cook_minutes': round(batch.seconds / 60, 1),
+            'station': station,
+            'starts_in_seconds': round((start - now).total_seconds()),
+            'urgent': (start - batch.oldest).total_seconds() >= max_wait,
+            'orders': [{
+                'order_id': line.order_id,
+                'order_number': line.order_number,
+                'quantity': line.quantity,
+                'waiting_seconds': round((now - line.created_at).total_seconds()),
+            } for line in batch.lines]
+        } for batch, station, start in plan]
+    }
@@ -0,0 +1,103 @@
+"""
+Order number allocation.
+
+Each worker leases a block of sequence numbers from the `counters` collection
+with a single $inc, then hands them out from memory, so placing an order
+costs a database round trip only once per BLOCK_SIZE orders. Numbers are
+unique across processes and increase roughly with time; blocks left unused
+when a worker exits just leave gaps.
+
+Numbers look like SF1000042. Sequences start at 1,000,000, above the old
+random six-digit numbers, and orders.order_number carries a unique index.
+"""
+
+from asgiref.sync import sync_to_async
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from mongo_client import get_collection
+from mongo_indexes import ensure_indexes
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'SF'
+COUNTER_ID = 'order_number'
+FIRST_SEQUENCE = 1000000
+BLOCK_SIZE = 50
+
+class OrderNumberAllocator:
+    def __init__(self, block_size=BLOCK_SIZE, counter_id=COUNTER_ID):
+        self.block_size = block_size
+        self.counter_id = counter_id
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = None
+        self._index_ready = False
+
+    def _lease_block(self):
+        # The counter holds how many numbers were ever leased
+        counter = get_collection('counters').find_one_and_update(
+            {'_id': self.counter_id},
+            {'$inc': {'seq': self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._end = FIRST_SEQUENCE + counter['seq']
+        self._next = self._end - self.block_size
+
+    def _ensure_index(self):
+        if self._index_ready:
+            return
+        try:
+            ensure_indexes(['orders'])
+        except OperationFailure as e:
+            # Old random numbers may already contain duplicates
+            logger.error(f"Could not create order indexes: {e}")
+        self._index_ready = True
+
+    def next_sequence(self):
+        with self._lock:
+            # A forked child must not hand out its parent's block
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = 0
+                self._ensure_index()
+
+            if self._next >= self._end:
+                self._lease_block()
+
+            sequence = self._next
+            self._next += 1
+            return sequence
+
+    def next_order_number(self):
+        return f'{PREFIX}{self.next_sequence()}'
+
+    def try_next_sequence(self):
+        """Next number from the leased block without touching the database, or None"""
+        with self._lock:
+            if self._pid != os.getpid() or self._next >= self._end:
+                return None
+            sequence = self._next
+            self._next += 1
+            return sequence
+
+    async def anext_order_number(self):
+        sequence = self.try_next_sequence()
+        if sequence is None:
+            # Leasing a block is rare; do it on a worker thread
+            sequence = await sync_to_async(self.next_sequence, thread_sensitive=False)()
+        return f'{PREFIX}{sequence}'
+
+_allocator = OrderNumberAllocator()
+
+def next_order_number():
+    """Return a new unique order number, e.g. SF1000042"""
+    return _allocator.next_order_number()
+
+async def anext_order_number():
+    """next_order_number() for async views"""
+    return await _allocator.anext_order_number()
@@ -0,0 +1,98 @@
+"""
+Keyset pagination for order lists.
+
+Pages are ordered newest first on (created_at, _id). The cursor handed to the
+client is an opaque token for the last order of a page; the next page starts
+strictly after it, so deep pages cost the same as the first one.
+"""
+
+from bson import ObjectId
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# List views leave out line items; get_order_detail returns the full document.
+# item_count is computed server-side (expressions in projections need MongoDB 4.4+)
+SUMMARY_PROJECTION = {
+    'order_number': 1,
+    'user_id': 1,
+    'customer_name': 1,
+    'customer_email': 1,
+    'customer_phone': 1,
+    'delivery_address': 1,
+    'subtotal': 1,
+    'delivery_fee': 1,
+    'total_amount': 1,
+    'payment_method': 1,
+    'payment_status': 1,
+    'status': 1,
+    'special_instructions': 1,
+    'created_at': 1,
+    'updated_at': 1,
+    'estimated_delivery_time': 1,
+    'item_count': {'$sum': '$items.quantity'},
+}
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(order, field='created_at'):
+    payload = json.dumps([order[field].isoformat(), str(order['_id'])])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, order_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), ObjectId(order_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a client-supplied page size, capped at MAX_PAGE_SIZE"""
+    try:
+        size = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def _page_query(query, cursor):
+    if not cursor:
+        return query
+    created_at, order_id = decode_cursor(cursor)
+    return {
+        '$and': [query, {'$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': order_id}}
+        ]}]
+    }
+
+def _split_page(orders, limit):
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1])
+    return orders, next_cursor
+
+def fetch_page(collection, query, cursor=None, limit=DEFAULT_PAGE_SIZE, projection=None):
+    """Return (orders, next_cursor) for one page; next_cursor is None on the last page"""
+    # One extra document tells us whether there is another page
+    orders = list(
+        collection.find(_page_query(query, cursor), projection)
+        .sort([('created_at', -1), ('_id', -1)])
+        .limit(limit + 1)
+    )
+    return _split_page(orders, limit)
+
+async def afetch_page(collection, query, cursor=None, limit=DEFAULT_PAGE_SIZE, projection=None):
+    """fetch_page() on a Motor collection"""
+    orders = await (
+        collection.find(_page_query(query, cursor), projection)
+        .sort([('created_at', -1), ('_id', -1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    return _split_page(orders, limit)
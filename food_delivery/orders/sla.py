@@ -0,0 +1,173 @@
+"""
+Time-in-state metrics for order stages.
+
+Every status change appends `{'status', 'at'}` to the order's
+`status_history`, so the time an order spent in a status is known the moment
+it leaves it. `record()` folds those durations into `order_stage_stats`, one
+document per stage (from-status, to-status) for all time and one per day:
+
+    {'_id': 'all:preparing:ready', 'scope': 'all', 'from': 'preparing',
+     'to': 'ready', 'count': n, 'total_seconds': s, 'total_squares': s2,
+     'min_seconds': a, 'max_seconds': b, 'buckets': {'71': n, ...}}
+
+Count, sum and sum of squares give the mean and standard deviation; the
+buckets are a log-scale histogram (each bucket is BUCKET_GROWTH times wider
+than the one before) from which percentiles are read to within about 2.5%.
+Every field is updated with $inc/$min/$max, so concurrent workers never
+lose an update and the admin endpoint reads a handful of small documents.
+"""
+
+from pymongo import ReplaceOne, UpdateOne
+from mongo_client import get_collection
+from .transitions import STATUSES
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = 'all'
+BUCKET_GROWTH = 1.05
+PERCENTILES = (50, 90, 95, 99)
+
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+def day_scope(moment):
+    return f"day:{moment.strftime('%Y-%m-%d')}"
+
+def entered_at(order):
+    """When `order` entered its current status, or None for orders older than status_history"""
+    history = order.get('status_history')
+    if history and history[-1]['status'] == order['status']:
+        return history[-1]['at']
+    if order['status'] == 'pending':
+        return order.get('created_at')
+    return None
+
+def bucket(seconds):
+    """Histogram bucket holding `seconds`; bucket i covers (GROWTH^(i-1), GROWTH^i]"""
+    return 0 if seconds <= 1 else math.ceil(math.log(seconds) / _LOG_GROWTH)
+
+def bucket_value(index):
+    # Midpoint (in relative terms) of the bucket, so the error is at most half its width
+    return 2 * BUCKET_GROWTH ** index / (BUCKET_GROWTH + 1)
+
+class _StageTotals:
+    __slots__ = ('count', 'total', 'squares', 'low', 'high', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = self.squares = 0.0
+        self.low = math.inf
+        self.high = 0.0
+        self.buckets = {}
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.squares += seconds * seconds
+        self.low = min(self.low, seconds)
+        self.high = max(self.high, seconds)
+        key = str(bucket(seconds))
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+def _accumulate(totals, old_status, new_status, seconds, at):
+    for scope in (ALL_TIME, day_scope(at)):
+        totals.setdefault((scope, old_status, new_status), _StageTotals()).add(max(0.0, seconds))
+
+def _doc_id(scope, old_status, new_status):
+    return f'{scope}:{old_status}:{new_status}'
+
+def record(changes, at):
+    """Count the time in state for (order before the update, new status) pairs changed at `at`"""
+    totals = {}
+    for order, new_status in changes:
+        entered = entered_at(order)
+        if entered is not None:
+            _accumulate(totals, order['status'], new_status, (at - entered).total_seconds(), at)
+
+    if not totals:
+        return
+
+    get_collection('order_stage_stats').bulk_write([
+        UpdateOne(
+            {'_id': _doc_id(*key)},
+            {
+                '$inc': {
+                    'count': stage.count,
+                    'total_seconds': stage.total,
+                    'total_squares': stage.squares,
+                    **{f'buckets.{index}': n for index, n in stage.buckets.items()}
+                },
+                '$min': {'min_seconds': stage.low},
+                '$max': {'max_seconds': stage.high},
+                '$setOnInsert': {'scope': key[0], 'from': key[1], 'to': key[2]}
+            },
+            upsert=True
+        )
+        for key, stage in totals.items()
+    ], ordered=False)
+
+def rebuild():
+    """Recompute every stage document from the orders' status_history"""
+    totals = {}
+    orders = get_collection('orders').find(
+        {'status_history.1': {'$exists': True}}, {'status_history': 1}
+    ).batch_size(2000)
+    for order in orders:
+        history = order['status_history']
+        for entered, left in zip(history, history[1:]):
+            _accumulate(totals, entered['status'], left['status'],
+                        (left['at'] - entered['at']).total_seconds(), left['at'])
+
+    collection = get_collection('order_stage_stats')
+    collection.delete_many({'_id': {'$nin': [_doc_id(*key) for key in totals]}})
+    if totals:
+        collection.bulk_write([
+            ReplaceOne({'_id': _doc_id(*key)}, {
+                'scope': key[0], 'from': key[1], 'to': key[2],
+                'count': stage.count,
+                'total_seconds': stage.total,
+                'total_squares': stage.squares,
+                'min_seconds': stage.low,
+                'max_seconds': stage.high,
+                'buckets': stage.buckets
+            }, upsert=True)
+            for key, stage in totals.items()
+        ])
+    logger.info(f"Rebuilt stage stats for {len(totals)} stages")
+
+def percentile(buckets, count, fraction):
+    """Approximate percentile from a bucket histogram holding `count` samples"""
+    rank = fraction * (count - 1)
+    seen = 0
+    for index in sorted(int(key) for key in buckets):
+        seen += buckets[str(index)]
+        if seen > rank:
+            return bucket_value(index) if index else 0.0
+    return 0.0
+
+def summarize(doc):
+    count = doc['count']
+    mean = doc['total_seconds'] / count
+    variance = max(0.0, doc['total_squares'] / count - mean * mean)
+    summary = {
+        'from': doc['from'],
+        'to': doc['to'],
+        'count': count,
+        'mean_seconds': round(mean, 1),
+        'stddev_seconds': round(math.sqrt(variance), 1),
+        'min_seconds': round(doc['min_seconds'], 1),
+        'max_seconds': round(doc['max_seconds'], 1),
+    }
+    for p in PERCENTILES:
+        # Never outside the observed range, which the bucket midpoints can be
+        value = percentile(doc['buckets'], count, p / 100)
+        summary[f'p{p}_seconds'] = round(min(max(value, doc['min_seconds']), doc['max_seconds']), 1)
+    return summary
+
+def stage_stats(scope=ALL_TIME):
+    """Per-stage summaries for `scope` (ALL_TIME or day_scope(date)), in pipeline order"""
+    docs = get_collection('order_stage_stats').find({'scope': scope})
+    stages = [summarize(doc) for doc in docs if doc.get('count')]
+    stages.sort(key=lambda stage: (STATUSES.index(stage['from']), STATUSES.index(stage['to'])))
+    return stages
@@ -0,0 +1,320 @@
+"""
+Dashboard statistics for orders.
+
+The `order_stats` collection holds counters that are updated as orders are
+created and change status, so the dashboard reads a couple of small documents
+instead of scanning `orders`:
+
+    {'_id': 'totals', 'orders': N, 'status_counts': {'pending': n, ...}}
+    {'_id': 'day:2024-01-31', 'date': '2024-01-31', 'orders': n,
+     'revenue': x, 'status_counts': {...}}
+
+Revenue excludes cancelled orders. `rebuild()` recomputes every counter from
+`orders`; `live_dashboard_stats()` computes the same figures in one $facet
+pipeline for verification.
+
+The counters are written after the order, as a separate best-effort update
+(a multi-document transaction would need a replica set), so a failed write
+can leave them off. Every ORDER_STATS['RECONCILE_INTERVAL'] seconds the
+first dashboard request to notice claims a reconciliation, across all
+processes, and a background thread compares the rollup with
+`live_dashboard_stats()`. If they still disagree RECONCILE_SETTLE seconds
+later, the thread rebuilds the rollup. `python manage.py rebuild_order_stats`
+does the same by hand.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from pymongo import UpdateOne, ReplaceOne
+from mongo_client import get_collection, get_async_collection
+from datetime import datetime, timedelta
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'RECONCILE_INTERVAL': 900,
+    'RECONCILE_SETTLE': 2.0,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'ORDER_STATS', {}))
+    return config
+
+TOTALS_ID = 'totals'
+
+# Dashboard figures the rollup provides; recent orders are read from orders either way
+COUNTED_FIGURES = ('total_orders', 'today_orders', 'pending_orders', 'preparing_orders', 'today_revenue')
+RECENT_ORDERS_LIMIT = 5
+
+RECENT_ORDER_PROJECTION = {
+    'order_number': 1,
+    'customer_name': 1,
+    'status': 1,
+    'total_amount': 1,
+    'created_at': 1,
+}
+
+def _day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+def _day_id(day):
+    return f'day:{day}'
+
+def _revenue(status, total_amount):
+    return 0 if status == 'cancelled' else total_amount
+
+def record_order_created(order):
+    """Count a newly inserted order"""
+    record_orders_created([order])
+
+def record_orders_created(orders):
+    """Count a batch of newly inserted orders with one write per touched document"""
+    operations = _created_operations(orders)
+    if operations:
+        get_collection('order_stats').bulk_write(operations, ordered=False)
+
+async def arecord_order_created(order):
+    """record_order_created() for async views"""
+    await get_async_collection('order_stats').bulk_write(_created_operations([order]), ordered=False)
+
+def _created_operations(orders):
+    totals = {}
+    days = {}
+    for order in orders:
+        status_key = f"status_counts.{order['status']}"
+        totals['orders'] = totals.get('orders', 0) + 1
+        totals[status_key] = totals.get(status_key, 0) + 1
+
+        day = days.setdefault(_day_key(order['created_at']), {})
+        day['orders'] = day.get('orders', 0) + 1
+        day['revenue'] = day.get('revenue', 0) + _revenue(order['status'], order['total_amount'])
+        day[status_key] = day.get(status_key, 0) + 1
+
+    if not totals:
+        return []
+
+    return [
+        UpdateOne({'_id': TOTALS_ID}, {'$inc': totals}, upsert=True),
+        *[
+            UpdateOne(
+                {'_id': _day_id(day)},
+                {'$inc': increments, '$setOnInsert': {'date': day}},
+                upsert=True
+            )
+            for day, increments in days.items()
+        ]
+    ]
+
+def record_status_change(order, new_status):
+    """Move an order between status counters; `order` is the document before the update"""
+    record_status_changes([(order, new_status)])
+
+def record_status_changes(changes):
+    """record_status_change() for a batch of (order before the update, new status) pairs, in one write"""
+    totals = {}
+    days = {}
+    for order, new_status in changes:
+        old_status = order['status']
+        if old_status == new_status:
+            continue
+
+        revenue_delta = (_revenue(new_status, order['total_amount'])
+                         - _revenue(old_status, order['total_amount']))
+        day = days.setdefault(_day_id(_day_key(order['created_at'])), {})
+        for counters in (totals, day):
+            for key, delta in ((f'status_counts.{old_status}', -1), (f'status_counts.{new_status}', 1)):
+                counters[key] = counters.get(key, 0) + delta
+        day['revenue'] = day.get('revenue', 0) + revenue_delta
+
+    if not days:
+        return
+
+    get_collection('order_stats').bulk_write([
+        UpdateOne({'_id': TOTALS_ID}, {'$inc': totals}, upsert=True),
+        *[UpdateOne({'_id': day_id}, {'$inc': increments}, upsert=True) for day_id, increments in days.items()]
+    ], ordered=False)
+
+def rebuild():
+    """Recompute every counter from the orders collection"""
+    pipeline = [
+        {'$group': {
+            '_id': {
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}},
+                'status': '$status'
+            },
+            'orders': {'$sum': 1},
+            'amount': {'$sum': '$total_amount'}
+        }}
+    ]
+
+    # A rebuilt rollup is reconciled
+    totals = {'_id': TOTALS_ID, 'orders': 0, 'status_counts': {}, 'reconciled_at': datetime.now()}
+    days = {}
+    for row in get_collection('orders').aggregate(pipeline):
+        day, order_status = row['_id']['day'], row['_id']['status']
+        doc = days.setdefault(day, {
+            '_id': _day_id(day), 'date': day, 'orders': 0, 'revenue': 0, 'status_counts': {}
+        })
+        doc['orders'] += row['orders']
+        doc['revenue'] += _revenue(order_status, row['amount'])
+        doc['status_counts'][order_status] = row['orders']
+        totals['orders'] += row['orders']
+        totals['status_counts'][order_status] = totals['status_counts'].get(order_status, 0) + row['orders']
+
+    stats_collection = get_collection('order_stats')
+    stats_collection.delete_many({'_id': {'$nin': [doc['_id'] for doc in days.values()] + [TOTALS_ID]}})
+    stats_collection.bulk_write(
+        [ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in [totals, *days.values()]]
+    )
+    logger.info(f"Rebuilt order stats for {len(days)} days")
+
+def _recent_orders_cursor(collection):
+    return (
+        collection
+        .find({}, RECENT_ORDER_PROJECTION)
+        .sort('created_at', -1)
+        .limit(RECENT_ORDERS_LIMIT)
+    )
+
+def _dashboard(docs, today_id, recent_orders):
+    totals = docs.get(TOTALS_ID, {})
+    today = docs.get(today_id, {})
+    status_counts = totals.get('status_counts', {})
+
+    return {
+        'total_orders': totals.get('orders', 0),
+        'today_orders': today.get('orders', 0),
+        'pending_orders': status_counts.get('pending', 0),
+        'preparing_orders': status_counts.get('confirmed', 0) + status_counts.get('preparing', 0),
+        'today_revenue': round(today.get('revenue', 0), 2),
+        'recent_orders': recent_orders
+    }
+
+def _rollup_docs(today_id):
+    stats_collection = get_collection('order_stats')
+    return {doc['_id']: doc for doc in stats_collection.find({'_id': {'$in': [TOTALS_ID, today_id]}})}
+
+def dashboard_stats():
+    """Dashboard figures from the rollup; rebuilt from orders the first time"""
+    today_id = _day_id(_day_key(datetime.now()))
+
+    docs = _rollup_docs(today_id)
+    if TOTALS_ID not in docs:
+        rebuild()
+        docs = _rollup_docs(today_id)
+    elif _reconcile_due(docs[TOTALS_ID]):
+        _start_reconcile()
+
+    return _dashboard(docs, today_id, list(_recent_orders_cursor(get_collection('orders'))))
+
+async def adashboard_stats():
+    """dashboard_stats() for async views"""
+    stats_collection = get_async_collection('order_stats')
+    today_id = _day_id(_day_key(datetime.now()))
+    ids = {'_id': {'$in': [TOTALS_ID, today_id]}}
+
+    docs = {doc['_id']: doc for doc in await stats_collection.find(ids).to_list(None)}
+    if TOTALS_ID not in docs:
+        await sync_to_async(rebuild, thread_sensitive=False)()
+        docs = {doc['_id']: doc for doc in await stats_collection.find(ids).to_list(None)}
+    elif _reconcile_due(docs[TOTALS_ID]):
+        await sync_to_async(_start_reconcile, thread_sensitive=False)()
+
+    recent_orders = await _recent_orders_cursor(get_async_collection('orders')).to_list(None)
+    return _dashboard(docs, today_id, recent_orders)
+
+def live_dashboard_stats():
+    """Dashboard figures computed directly from orders in a single $facet pipeline"""
+    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+    today_match = {'created_at': {'$gte': today_start, '$lt': today_end}}
+
+    pipeline = [
+        {'$facet': {
+            'total': [{'$count': 'count'}],
+            'today': [
+                {'$match': today_match},
+                {'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'revenue': {'$sum': {
+                        '$cond': [{'$eq': ['$status', 'cancelled']}, 0, '$total_amount']
+                    }}
+                }}
+            ],
+            'by_status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+            'recent': [
+                {'$sort': {'created_at': -1}},
+                {'$limit': RECENT_ORDERS_LIMIT},
+                {'$project': RECENT_ORDER_PROJECTION}
+            ]
+        }}
+    ]
+
+    result = next(get_collection('orders').aggregate(pipeline))
+    total = result['total'][0]['count'] if result['total'] else 0
+    today = result['today'][0] if result['today'] else {}
+    status_counts = {row['_id']: row['count'] for row in result['by_status']}
+
+    return {
+        'total_orders': total,
+        'today_orders': today.get('count', 0),
+        'pending_orders': status_counts.get('pending', 0),
+        'preparing_orders': status_counts.get('confirmed', 0) + status_counts.get('preparing', 0),
+        'today_revenue': round(today.get('revenue', 0), 2),
+        'recent_orders': result['recent']
+    }
+
+def mismatches():
+    """{figure: (rollup, live)} for every dashboard figure on which the rollup disagrees with orders"""
+    today_id = _day_id(_day_key(datetime.now()))
+    rollup = _dashboard(_rollup_docs(today_id), today_id, [])
+    live = live_dashboard_stats()
+    return {figure: (rollup[figure], live[figure]) for figure in COUNTED_FIGURES if rollup[figure] != live[figure]}
+
+def reconcile(settle=None):
+    """Rebuild the rollup if it disagrees with orders, twice `settle` seconds apart; returns the differences"""
+    if settle is None:
+        settle = get_settings()['RECONCILE_SETTLE']
+    differences = mismatches()
+    if differences and settle:
+        # Orders written while both were read can make them differ for a moment
+        time.sleep(settle)
+        differences = mismatches()
+    if differences:
+        logger.warning(f"Order stats disagreed with orders, rebuilding: {differences}")
+        rebuild()
+    return differences
+
+def _reconcile_due(totals):
+    interval = get_settings()['RECONCILE_INTERVAL']
+    reconciled_at = totals.get('reconciled_at')
+    return bool(interval) and (reconciled_at is None or datetime.now() - reconciled_at >= timedelta(seconds=interval))
+
+def _claim_reconcile():
+    """True for the one caller, across processes, that should reconcile now"""
+    now = datetime.now()
+    stale = now - timedelta(seconds=get_settings()['RECONCILE_INTERVAL'])
+    claimed = get_collection('order_stats').update_one(
+        {'_id': TOTALS_ID, '$or': [{'reconciled_at': {'$exists': False}}, {'reconciled_at': {'$lte': stale}}]},
+        {'$set': {'reconciled_at': now}}
+    )
+    return claimed.modified_count == 1
+
+def _reconcile_in_background():
+    try:
+        reconcile()
+    except Exception as e:
+        logger.error(f"Error reconciling order stats: {e}")
+
+def _start_reconcile():
+    """Reconcile on a background thread if no other request or process has claimed it"""
+    try:
+        if _claim_reconcile():
+            threading.Thread(target=_reconcile_in_background, name='order-stats-reconcile', daemon=True).start()
+    except Exception as e:
+        logger.error(f"Error reconciling order stats: {e}")
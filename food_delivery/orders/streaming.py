@@ -0,0 +1,141 @@
+"""
+Server-sent events transport for the order stream.
+
+EventSource cannot set an Authorization header, so the stream also accepts
+the access token as a `token` query parameter.
+
+Under ASGI the stream is an async view (`aevent_stream`): an open stream
+is a coroutine waiting on the event loop, so thousands of idle tabs cost
+little. Under WSGI every open stream holds a worker thread, so each
+process serves at most ORDER_EVENTS['MAX_SYNC_STREAMS'] of them and
+answers 503 to the rest; EventSource gives up on a 503 and the pages fall
+back to polling.
+"""
+
+from rest_framework.renderers import BaseRenderer
+from accounts.identity import CachedJWTAuthentication
+from . import events
+import asyncio
+import json
+import threading
+import time
+
+class QueryParamJWTAuthentication(CachedJWTAuthentication):
+    """JWT authentication reading the access token from ?token="""
+
+    def authenticate(self, request):
+        raw_token = request.query_params.get('token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        raw_token = request.GET.get('token')
+        if not raw_token:
+            return None
+        return await self.aauthenticate_token(raw_token)
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF negotiate text/event-stream; only error responses go through it"""
+
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data)}\n\n".encode()
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+class _SyncStreamSlots:
+    """Streams currently holding a WSGI worker thread in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._open >= events.get_settings()['MAX_SYNC_STREAMS']:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open -= 1
+
+_sync_stream_slots = _SyncStreamSlots()
+
+class _SyncStream:
+    """event_stream() frames that give their slot back when the response is closed"""
+
+    def __init__(self, subscription):
+        self._subscription = subscription
+        self._frames = event_stream(subscription)
+        self._closed = False
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        # Also runs for a stream closed before its first frame, which a generator's finally would miss
+        if self._closed:
+            return
+        self._closed = True
+        self._frames.close()
+        self._subscription.close()
+        _sync_stream_slots.release()
+
+def open_sync_stream(user):
+    """Iterable of SSE frames for a WSGI response, or None when this process has no stream slot left"""
+    if not _sync_stream_slots.acquire():
+        return None
+    try:
+        return _SyncStream(events.subscribe(user))
+    except Exception:
+        _sync_stream_slots.release()
+        raise
+
+def event_stream(subscription):
+    """Yield SSE frames until MAX_STREAM_DURATION, then let the client reconnect"""
+    config = events.get_settings()
+    deadline = time.monotonic() + config['MAX_STREAM_DURATION']
+
+    try:
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=config['HEARTBEAT_INTERVAL'])
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        subscription.close()
+
+async def aevent_stream(subscription):
+    """event_stream() for the async view; waits for events without holding a thread"""
+    config = events.get_settings()
+    deadline = time.monotonic() + config['MAX_STREAM_DURATION']
+    # Brokers without aget() fall back to waiting in a worker thread
+    aget = getattr(subscription, 'aget', None)
+
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = min(config['HEARTBEAT_INTERVAL'], remaining)
+            if aget:
+                event = await aget(timeout)
+            else:
+                event = await asyncio.to_thread(subscription.get, timeout)
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        subscription.close()
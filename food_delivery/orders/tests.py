@@ -0,0 +1,464 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import close_old_connections
+from django.test import SimpleTestCase, override_settings
+from accounts.identity import get_identity, issue_tokens
+from mongo_client import get_collection
+from mongo_testing import LiveMongoTestCase, MongoTestCase, atomic_operations
+from orders import eta, events, ingestion, kitchen, order_numbers, stats, transitions
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo.errors import BulkWriteError
+from io import StringIO
+from unittest import mock
+import bson
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def _ingestor_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'order-ingestor']
+
+class IngestionStartupTests(SimpleTestCase):
+    """The write-behind drainer runs only where a server entry point asks for it"""
+
+    def setUp(self):
+        queue_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(queue_dir.cleanup)
+        self.queue_path = os.path.join(queue_dir.name, 'queue.sqlite3')
+        ingestion.OrderQueue(self.queue_path, 10).close()
+        self.addCleanup(self._reset_ingestor)
+
+    def _reset_ingestor(self):
+        if ingestion._ingestor is not None:
+            ingestion._ingestor.stop(timeout=5)
+            ingestion._ingestor.queue.close()
+        ingestion._ingestor = ingestion._ingestor_pid = None
+
+    def _settings(self, **overrides):
+        return override_settings(ORDER_INGESTION={
+            'WRITE_BEHIND': True, 'QUEUE_PATH': self.queue_path, **overrides
+        })
+
+    def test_loading_the_app_starts_no_drainer(self):
+        with self._settings():
+            self.assertEqual(_ingestor_threads(), [])
+
+    def test_resume_starts_the_drainer(self):
+        with self._settings():
+            ingestion.resume()
+            self.assertEqual(len(_ingestor_threads()), 1)
+
+    def test_resume_respects_drain_on_startup(self):
+        with self._settings(DRAIN_ON_STARTUP=False):
+            ingestion.resume()
+            self.assertEqual(_ingestor_threads(), [])
+
+class IngestionWriteErrorTests(SimpleTestCase):
+    """Only a duplicate _id counts as already inserted; other refusals leave the queue for failed_orders"""
+
+    def setUp(self):
+        queue_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(queue_dir.cleanup)
+        self.queue = ingestion.OrderQueue(os.path.join(queue_dir.name, 'queue.sqlite3'), 10)
+        self.addCleanup(self.queue.close)
+        self.orders = [{'_id': bson.ObjectId(), 'order_number': f'SF{n}'} for n in range(4)]
+        for order in self.orders:
+            self.queue.enqueue(order)
+        self.inserted = []
+        self.ingestor = ingestion.OrderIngestor(self.queue, on_inserted=self.inserted.extend)
+
+    def test_write_errors(self):
+        collection = mock.Mock()
+        collection.insert_many.side_effect = BulkWriteError({'writeErrors': [
+            {'index': 0, 'code': 11000, 'keyPattern': {'_id': 1}, 'errmsg': 'E11000 dup key _id'},
+            {'index': 1, 'code': 11000, 'keyPattern': {'order_number': 1}, 'errmsg': 'E11000 dup key order_number'},
+            {'index': 2, 'code': 121, 'errmsg': 'Document failed validation'},
+        ]})
+        with mock.patch.object(ingestion, 'get_collection', return_value=collection), \
+                self.assertLogs('orders.ingestion', 'ERROR') as logs:
+            self.assertEqual(self.ingestor.drain(), 4)
+
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual([order['_id'] for order in self.inserted], [self.orders[3]['_id']])
+        self.assertEqual(
+            [(document['order_number'], error) for _, document, error in self.queue.failed()],
+            [('SF1', 'E11000 dup key order_number'), ('SF2', 'Document failed validation')]
+        )
+        self.assertIn('SF1', logs.output[0])
+
+STREAM_SETTINGS = {'HEARTBEAT_INTERVAL': 1, 'MAX_STREAM_DURATION': 3}
+
+class OrderStreamTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('streamer', password='secret123')
+        # Cached, so authenticating on the event loop needs no database
+        get_identity(self.user.id)
+        self.token = str(issue_tokens(self.user).access_token)
+
+    def _order_event(self):
+        return {'type': events.ORDER_STATUS_CHANGED, 'user_id': self.user.id, 'order_number': 'SF1', 'status': 'ready'}
+
+    @override_settings(ROOT_URLCONF='srinu_foods.asgi_urls', ORDER_EVENTS=STREAM_SETTINGS)
+    def test_asgi_stream_sends_frames_as_they_happen(self):
+        # As the test client does: the test transaction must outlive the request
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+
+        received = async_to_sync(self._run_asgi_stream)()
+
+        started = received[0][0]
+        body = [(at, message) for at, message in received if message['type'] == 'http.response.body']
+        frames = [(at - started, message['body'].decode()) for at, message in body if message.get('body')]
+        self.assertEqual(received[0][1]['status'], 200)
+        event_at = next(at for at, frame in frames if 'event: order_status_changed' in frame)
+        self.assertLess(event_at, STREAM_SETTINGS['MAX_STREAM_DURATION'] - 1)
+        self.assertFalse(body[-1][1].get('more_body', False))
+
+    async def _run_asgi_stream(self):
+        application = get_asgi_application()
+        received = []
+        disconnected = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            received.append((time.monotonic(), message))
+            if message.get('body', b'').startswith(b'retry'):
+                asyncio.get_running_loop().call_later(0.2, events.get_broker().publish, self._order_event())
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/orders/stream/', 'root_path': '',
+            'query_string': f'token={self.token}'.encode(), 'headers': [],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+        }
+        await application(scope, receive, send)
+        disconnected.set()
+        return received
+
+    @override_settings(ORDER_EVENTS={**STREAM_SETTINGS, 'MAX_SYNC_STREAMS': 1})
+    def test_wsgi_streams_are_capped(self):
+        url = f'/api/orders/stream/?token={self.token}'
+        first = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(first.status_code, 200)
+
+        refused = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(refused.status_code, 503)
+        self.assertEqual(refused['Retry-After'], '30')
+
+        first.close()
+        second = self.client.get(url, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(second.status_code, 200)
+        second.close()
+
+class EtaPushTests(MongoTestCase):
+    """ETAs are pushed when the plan changes, from the engine's thread, without touching updated_at"""
+
+    def setUp(self):
+        super().setUp()
+        self.placed_at = datetime(2026, 1, 1, 12, 0)
+        self.engine = eta.EtaEngine(eta.get_settings())
+        self.engine.add('a', self.placed_at, 20 * 60, 1, 'SF1').owned = True
+
+    def test_time_alone_pushes_nothing(self):
+        self.assertEqual(self.engine.recompute(self.placed_at, 60), [])
+        # Hours late, the plan is the same plan
+        self.assertEqual(self.engine.recompute(self.placed_at + timedelta(hours=3), 60), [])
+
+    def test_status_change_pushes_the_new_estimate(self):
+        self.engine.recompute(self.placed_at, 60)
+        confirmed_at = self.placed_at + timedelta(hours=1)
+        self.engine.transition('a', 'confirmed', confirmed_at)
+
+        moved = self.engine.recompute(confirmed_at, 60)
+        self.assertEqual([order.order_id for order in moved], ['a'])
+        self.assertEqual(moved[0].eta, self.engine.estimate('a', confirmed_at))
+        self.assertEqual(self.engine.recompute(confirmed_at + timedelta(hours=1), 60), [])
+
+    def test_only_the_owning_process_pushes(self):
+        self.engine.add('b', self.placed_at, 20 * 60, 2, 'SF2')
+        self.engine.recompute(self.placed_at, 60)
+        confirmed_at = self.placed_at + timedelta(hours=1)
+        self.engine.transition('a', 'confirmed', confirmed_at)
+        self.engine.transition('b', 'confirmed', confirmed_at)
+
+        # 'b' was created and moved by another process, which pushes its estimates
+        self.assertEqual([order.order_id for order in self.engine.recompute(confirmed_at, 60)], ['a'])
+
+    def test_requests_only_wake_the_thread(self):
+        orders = get_collection('orders')
+        placed_eta = self.placed_at + timedelta(minutes=45)
+        order_id = orders.insert_one({
+            'user_id': 1, 'order_number': 'SF2', 'status': 'pending',
+            'created_at': self.placed_at, 'updated_at': self.placed_at, 'estimated_delivery_time': placed_eta,
+        }).inserted_id
+        engine = eta.EtaEngine(eta.get_settings())
+        engine.add(str(order_id), self.placed_at, 20 * 60, 1, 'SF2')
+        engine.recompute(self.placed_at, 60)
+        holder = eta._EngineHolder()
+        holder._engine, holder._pid = engine, os.getpid()
+
+        with mock.patch.object(eta, '_holder', holder), mock.patch.object(holder, 'wake') as wake:
+            eta.status_changed([({'_id': order_id}, 'confirmed')], self.placed_at + timedelta(hours=1))
+            wake.assert_called_once_with()
+            self.assertEqual(orders.find_one({'_id': order_id})['estimated_delivery_time'], placed_eta)
+
+            # What the thread does when woken
+            holder._update(eta.get_settings(), time.monotonic())
+
+        order = orders.find_one({'_id': order_id})
+        self.assertGreater(order['estimated_delivery_time'], placed_eta)
+        self.assertIn('eta_updated_at', order)
+        self.assertEqual(order['updated_at'], self.placed_at)
+
+class UniqueOrderNumbers:
+    """Allocators standing in for worker processes, leasing small blocks from one counter, never repeat a number"""
+
+    ALLOCATORS = 6
+    THREADS_EACH = 2
+    NUMBERS_EACH = 60
+
+    def allocate_concurrently(self):
+        counter_id = f'test_{self.id()}'
+        self.addCleanup(lambda: get_collection('counters').delete_one({'_id': counter_id}))
+        allocators = [order_numbers.OrderNumberAllocator(block_size=3, counter_id=counter_id)
+                      for _ in range(self.ALLOCATORS)]
+
+        def allocate(n):
+            allocator = allocators[n % self.ALLOCATORS]
+            return [allocator.next_order_number() for _ in range(self.NUMBERS_EACH)]
+
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        workers = self.ALLOCATORS * self.THREADS_EACH
+        with ThreadPoolExecutor(workers) as pool:
+            numbers = [number for batch in pool.map(allocate, range(workers)) for number in batch]
+
+        self.assertEqual(len(numbers), workers * self.NUMBERS_EACH)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertTrue(all(number.startswith(order_numbers.PREFIX) for number in numbers))
+
+class OrderNumberTests(UniqueOrderNumbers, MongoTestCase):
+    def test_no_collisions(self):
+        with atomic_operations():
+            self.allocate_concurrently()
+
+class LiveOrderNumberTests(UniqueOrderNumbers, LiveMongoTestCase):
+    def test_no_collisions(self):
+        self.allocate_concurrently()
+
+class KitchenQueueTests(MongoTestCase):
+    """Checkout and status hooks change the kitchen queue in memory; only work_queue() queries for it"""
+
+    def setUp(self):
+        super().setUp()
+        self.holder = kitchen._QueueHolder()
+        patcher = mock.patch.object(kitchen, '_holder', self.holder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.created_at = datetime.now() - timedelta(minutes=5)
+
+    def _order(self, number, status='pending'):
+        order = {'_id': bson.ObjectId(), 'order_number': number, 'status': status, 'created_at': self.created_at,
+                 'items': [{'item_id': 'biryani', 'quantity': 2}]}
+        get_collection('orders').insert_one(order)
+        return order
+
+    def _queued(self):
+        return [order['order_number'] for batch in kitchen.work_queue()['batches'] for order in batch['orders']]
+
+    def test_hooks_never_query(self):
+        first = self._order('SF1')
+        with mock.patch.object(kitchen, 'get_collection') as get_collection_mock:
+            kitchen.orders_created([first])
+            kitchen.status_changed([(first, 'confirmed')])
+        get_collection_mock.assert_not_called()
+        self.assertIsNone(self.holder.peek())
+
+        self.assertEqual(self._queued(), ['SF1'])
+        second = self._order('SF2')
+        with mock.patch.object(kitchen, 'get_collection') as get_collection_mock:
+            kitchen.orders_created([second])
+            kitchen.status_changed([(first, 'preparing')])
+            self.assertEqual(self._queued(), ['SF2'])
+        get_collection_mock.assert_not_called()
+
+    def test_changes_during_a_reload_are_kept(self):
+        first = self._order('SF1')
+        load = self.holder._load
+
+        def load_while_an_order_is_placed():
+            queue = load()
+            # Saved after the reload's query ran
+            kitchen.orders_created([{**first, '_id': bson.ObjectId(), 'order_number': 'SF2'}])
+            return queue
+
+        with mock.patch.object(self.holder, '_load', load_while_an_order_is_placed):
+            self.assertEqual(sorted(self._queued()), ['SF1', 'SF2'])
+
+def _placed(status, **fields):
+    at = datetime(2026, 1, 1, 12, 0)
+    order = {'_id': bson.ObjectId(), 'status': status, 'created_at': at, 'updated_at': at,
+             'status_history': [{'status': status, 'at': at}], 'total_amount': 500.0, 'user_id': 1, **fields}
+    get_collection('orders').insert_one(order)
+    return order
+
+class TransitionTests(MongoTestCase):
+    def test_transition_table(self):
+        self.assertTrue(transitions.can_transition('pending', 'confirmed'))
+        self.assertTrue(transitions.can_transition('ready', 'delivered'))
+        self.assertTrue(transitions.can_transition('out_for_delivery', 'cancelled'))
+        self.assertFalse(transitions.can_transition('delivered', 'pending'))
+        self.assertFalse(transitions.can_transition('cancelled', 'confirmed'))
+        self.assertFalse(transitions.can_transition('preparing', 'confirmed'))
+        self.assertFalse(transitions.can_transition('pending', 'delivered'))
+        for status in transitions.STATUSES:
+            self.assertIn(status, transitions.ALLOWED_TRANSITIONS)
+
+    def test_update_status(self):
+        orders = get_collection('orders')
+        order = _placed('pending')
+        at = datetime(2026, 1, 1, 12, 5)
+
+        result, previous = transitions.update_status(orders, order['_id'], 'confirmed', at=at)
+        self.assertEqual((result, previous['status']), (transitions.UPDATED, 'pending'))
+        self.assertEqual(orders.find_one({'_id': order['_id']})['status_history'][-1],
+                         {'status': 'confirmed', 'at': at})
+
+        self.assertEqual(transitions.update_status(orders, order['_id'], 'confirmed')[0], transitions.UNCHANGED)
+        self.assertEqual(transitions.update_status(orders, order['_id'], 'pending')[0],
+                         transitions.INVALID_TRANSITION)
+        self.assertEqual(transitions.update_status(orders, bson.ObjectId(), 'confirmed'),
+                         (transitions.NOT_FOUND, None))
+        self.assertEqual(orders.find_one({'_id': order['_id']})['status'], 'confirmed')
+
+class _RacingCollection:
+    """The orders collection, with other admins' changes landing just before and after our bulk write"""
+
+    def __init__(self, collection, before_write, after_write):
+        self.collection = collection
+        self.before_write = before_write
+        self.after_write = after_write
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, *args, **kwargs):
+        self.before_write()
+        written = self.collection.bulk_write(*args, **kwargs)
+        self.after_write()
+        return written
+
+class BulkStatusUpdateTests(MongoTestCase):
+    def test_results_per_item(self):
+        pending, delivered, ready = _placed('pending'), _placed('delivered'), _placed('ready')
+        results, changes = transitions.apply_status_updates(get_collection('orders'), [
+            {'order_id': str(pending['_id']), 'status': 'confirmed'},
+            {'order_id': str(pending['_id']), 'status': 'preparing'},
+            {'order_id': str(delivered['_id']), 'status': 'pending'},
+            {'order_id': str(ready['_id']), 'status': 'ready'},
+            {'order_id': str(bson.ObjectId()), 'status': 'confirmed'},
+            {'order_id': 'not-an-id', 'status': 'confirmed'},
+            {'order_id': str(ready['_id']), 'status': 'eaten'},
+            'not an object',
+        ])
+        self.assertEqual([result['result'] for result in results], [
+            transitions.UPDATED, transitions.DUPLICATE, transitions.INVALID_TRANSITION, transitions.UNCHANGED,
+            transitions.NOT_FOUND, transitions.INVALID_ORDER_ID, transitions.INVALID_STATUS,
+            transitions.INVALID_ORDER_ID,
+        ])
+        self.assertEqual([(order['_id'], new_status) for order, new_status in changes], [(pending['_id'], 'confirmed')])
+
+    def test_writes_changed_again_afterwards_still_count(self):
+        orders = get_collection('orders')
+        first, second = _placed('pending'), _placed('pending')
+        # Someone else confirms `second` between our read and our write, and then edits `first` after it
+        racing = _RacingCollection(
+            orders,
+            lambda: orders.update_one({'_id': second['_id']}, {'$set': {'status': 'confirmed'}}),
+            lambda: orders.update_one({'_id': first['_id']}, {'$set': {'updated_at': datetime.now()}}),
+        )
+        results, changes = transitions.apply_status_updates(racing, [
+            {'order_id': str(first['_id']), 'status': 'confirmed'},
+            {'order_id': str(second['_id']), 'status': 'confirmed'},
+        ], at=datetime(2026, 1, 1, 12, 5))
+
+        self.assertEqual([result['result'] for result in results], [transitions.UPDATED, transitions.CONFLICT])
+        self.assertEqual([order['_id'] for order, _ in changes], [first['_id']])
+
+    def test_endpoint(self):
+        admin = User.objects.create_user('kitchen-admin', password='secret123', is_staff=True)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {issue_tokens(admin).access_token}'
+        order = _placed('pending')
+        url = '/api/orders/admin/bulk-update-status/'
+
+        response = self.client.post(url, [{'order_id': str(order['_id']), 'status': 'confirmed'}],
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch.object(eta, 'status_changed'), mock.patch.object(kitchen, 'status_changed'):
+            response = self.client.post(url, {'updates': [
+                {'order_id': str(order['_id']), 'status': 'confirmed'},
+                {'order_id': str(order['_id']), 'status': 'ready'},
+            ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['updated'], 1)
+        self.assertEqual([result['result'] for result in body['results']], [transitions.UPDATED, transitions.DUPLICATE])
+
+@override_settings(ORDER_STATS={'RECONCILE_SETTLE': 0})
+class OrderStatsReconcileTests(MongoTestCase):
+    """Counter updates are best effort; reconciliation repairs the ones that were missed"""
+
+    def setUp(self):
+        super().setUp()
+        self.orders = [_placed('pending', created_at=datetime.now()) for _ in range(3)]
+        stats.rebuild()
+
+    def _miss_an_update(self):
+        # Confirmed, but the counter update never landed
+        get_collection('orders').update_one({'_id': self.orders[0]['_id']}, {'$set': {'status': 'confirmed'}})
+
+    def test_reconcile_rebuilds_only_on_mismatch(self):
+        self.assertEqual(stats.reconcile(), {})
+        self._miss_an_update()
+        with self.assertLogs('orders.stats', 'WARNING'):
+            self.assertEqual(stats.reconcile(), {'pending_orders': (3, 2), 'preparing_orders': (0, 1)})
+        self.assertEqual(stats.mismatches(), {})
+
+    def test_one_dashboard_request_claims_a_due_reconcile(self):
+        stale = datetime.now() - timedelta(seconds=stats.get_settings()['RECONCILE_INTERVAL'] + 1)
+        get_collection('order_stats').update_one({'_id': stats.TOTALS_ID}, {'$set': {'reconciled_at': stale}})
+        self._miss_an_update()
+
+        with mock.patch.object(stats.threading, 'Thread') as thread:
+            for _ in range(3):
+                stats.dashboard_stats()
+        thread.assert_called_once_with(target=stats._reconcile_in_background, name='order-stats-reconcile', daemon=True)
+
+        # What the thread runs
+        with self.assertLogs('orders.stats', 'WARNING'):
+            stats._reconcile_in_background()
+        self.assertEqual(stats.mismatches(), {})
+
+    def test_command(self):
+        self._miss_an_update()
+        output = StringIO()
+        call_command('rebuild_order_stats', '--check', stdout=output)
+        self.assertIn('pending_orders: 3 in order_stats, 2 in orders', output.getvalue())
+        self.assertEqual(stats.mismatches(), {})
@@ -0,0 +1,149 @@
+"""
+Order status transitions.
+
+ALLOWED_TRANSITIONS lists the statuses each status may move to; `delivered`
+and `cancelled` are final. Every write is conditional on the status it was
+checked against, so two people moving the same order at once cannot both
+succeed, and an order cannot be walked back from `delivered` to `pending`.
+Each change appends `{'status', 'at'}` to the order's `status_history`
+(started by checkout.build_order), which orders/sla.py turns into
+time-in-state metrics.
+
+`apply_status_updates` serves the bulk endpoint: it reads all the orders in
+one query, checks each requested change against the table, writes the valid
+ones with a single unordered `bulk_write` and reports a result per item.
+"""
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from datetime import datetime
+
+STATUSES = ('pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered', 'cancelled')
+
+ALLOWED_TRANSITIONS = {
+    'pending': ('confirmed', 'preparing', 'cancelled'),
+    'confirmed': ('preparing', 'ready', 'cancelled'),
+    'preparing': ('ready', 'cancelled'),
+    'ready': ('out_for_delivery', 'delivered', 'cancelled'),
+    'out_for_delivery': ('delivered', 'cancelled'),
+    'delivered': (),
+    'cancelled': (),
+}
+
+MAX_BULK_UPDATES = 100
+
+# Per-item results of apply_status_updates
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+CONFLICT = 'conflict'
+INVALID_TRANSITION = 'invalid_transition'
+INVALID_STATUS = 'invalid_status'
+INVALID_ORDER_ID = 'invalid_order_id'
+DUPLICATE = 'duplicate'
+
+# What the stats rollup, stage metrics and order events need from the order before the update
+PREVIOUS_PROJECTION = {
+    'status': 1, 'created_at': 1, 'total_amount': 1, 'user_id': 1, 'order_number': 1,
+    'status_history': {'$slice': -1},
+}
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, ())
+
+def _sources(new_status):
+    return [status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+def _transition(new_status, at):
+    return {
+        '$set': {'status': new_status, 'updated_at': at},
+        '$push': {'status_history': {'status': new_status, 'at': at}}
+    }
+
+def update_status(collection, order_id, new_status, at=None):
+    """
+    Move one order to `new_status` at `at` (default now); returns (result,
+    order before the update), the order being None when it does not exist
+    """
+    previous = collection.find_one_and_update(
+        {'_id': order_id, 'status': {'$in': _sources(new_status)}},
+        _transition(new_status, at or datetime.now()),
+        projection=PREVIOUS_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous is not None:
+        return UPDATED, previous
+
+    current = collection.find_one({'_id': order_id}, PREVIOUS_PROJECTION)
+    if current is None:
+        return NOT_FOUND, None
+    if current['status'] == new_status:
+        return UNCHANGED, current
+    return INVALID_TRANSITION, current
+
+def apply_status_updates(collection, updates, at=None):
+    """
+    Apply a list of {'order_id', 'status'} updates at `at` (default now); returns (results, changes)
+    where results has one entry per update, in order, and changes are the
+    (order before the update, new status) pairs that were written
+    """
+    results = []
+    requested = {}
+    for update in updates:
+        update = update if isinstance(update, dict) else {}
+        result = {'order_id': str(update.get('order_id')), 'status': update.get('status')}
+        results.append(result)
+        if not isinstance(update.get('order_id'), str) or not ObjectId.is_valid(update['order_id']):
+            result['result'] = INVALID_ORDER_ID
+            continue
+        order_id = ObjectId(update['order_id'])
+        if result['status'] not in STATUSES:
+            result['result'] = INVALID_STATUS
+        elif order_id in requested:
+            result['result'] = DUPLICATE
+        else:
+            requested[order_id] = result
+
+    current = {
+        order['_id']: order
+        for order in collection.find({'_id': {'$in': list(requested)}}, PREVIOUS_PROJECTION)
+    } if requested else {}
+
+    now = at or datetime.now()
+    operations, pending = [], []
+    for order_id, result in requested.items():
+        order = current.get(order_id)
+        if order is None:
+            result['result'] = NOT_FOUND
+            continue
+        result['previous_status'] = order['status']
+        if order['status'] == result['status']:
+            result['result'] = UNCHANGED
+        elif not can_transition(order['status'], result['status']):
+            result['result'] = INVALID_TRANSITION
+        else:
+            # Only if nobody moved the order since it was read
+            operations.append(UpdateOne({'_id': order_id, 'status': order['status']}, _transition(result['status'], now)))
+            pending.append((order, result))
+
+    if not operations:
+        return results, []
+
+    written = collection.bulk_write(operations, ordered=False)
+    if written.matched_count == len(operations):
+        landed = {order['_id'] for order, _ in pending}
+    else:
+        # Some orders changed after they were read; ours carry our history entry, whatever changed them since
+        landed = {order['_id'] for order in collection.find({'$or': [
+            {'_id': order['_id'], 'status_history': {'$elemMatch': {'status': result['status'], 'at': now}}}
+            for order, result in pending
+        ]}, {'_id': 1})}
+
+    changes = []
+    for order, result in pending:
+        if order['_id'] in landed:
+            result['result'] = UPDATED
+            changes.append((order, result['status']))
+        else:
+            result['result'] = CONFLICT
+    return results, changes
@@ -4,8 +4,13 @@ from . import views
 urlpatterns = [
     path('create/', views.create_order, name='create_order'),
     path('my-orders/', views.get_my_orders, name='get_my_orders'),
+    path('stream/', views.order_stream, name='order_stream'),
     path('<str:order_id>/', views.get_order_detail, name='get_order_detail'),
     path('admin/all/', views.get_all_orders, name='get_all_orders'),
+    path('admin/changes/', views.get_order_changes, name='get_order_changes'),
+    path('admin/bulk-update-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
     path('admin/<str:order_id>/update-status/', views.update_order_status, name='update_order_status'),
     path('admin/dashboard/stats/', views.get_dashboard_stats, name='get_dashboard_stats'),
+    path('admin/dashboard/stages/', views.get_stage_stats, name='get_stage_stats'),
+    path('admin/kitchen/queue/', views.get_kitchen_queue, name='get_kitchen_queue'),
 ]
@@ -1,103 +1,111 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from accounts.identity import CachedJWTAuthentication
+from accounts.permissions import IsVerifiedAdminUser
+from django.http import StreamingHttpResponse
 from mongo_client import get_collection
+from http_cache import PRIVATE_CACHE_CONTROL, cached, make_etag, not_modified
+from mongo_json import MongoJSONRenderer, api_document, api_documents
+from menu import cart_store, catalog
+from . import changes, checkout, eta, events, idempotency, ingestion, kitchen, pagination, sla, stats, transitions
+from .order_numbers import next_order_number
+from .streaming import QueryParamJWTAuthentication, EventStreamRenderer, open_sync_stream
 from bson import ObjectId
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def create_order(request):
-    """Create a new order from user's cart"""
-    try:
-        user = request.user
-        data = request.data
+def _place_order(user, data):
+    """Turn the user's cart into an order; returns (status code, response body)"""
+    # Take the cart in one step so a concurrent checkout cannot order it twice
+    cart = cart_store.take(user.id)
 
-        # Validate required fields
-        required_fields = ['delivery_address', 'phone']
-        for field in required_fields:
-            if not data.get(field):
-                return Response({
-                    'success': False,
-                    'message': f'{field.replace("_", " ").title()} is required'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get user's cart
-        cart_collection = get_collection('carts')
-        cart = cart_collection.find_one({'user_id': user.id})
+    if not cart or not cart.get('items'):
+        return status.HTTP_400_BAD_REQUEST, checkout.EMPTY_CART
 
-        if not cart or not cart.get('items'):
-            return Response({
-                'success': False,
-                'message': 'Cart is empty'
-            }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        items, unavailable = checkout.price_lines(catalog.get_snapshot(), cart['items'])
+        if unavailable:
+            cart_store.restore(cart)
+            return status.HTTP_409_CONFLICT, checkout.unavailable_error(unavailable)
+
+        order_data = checkout.build_order(user, data, items, next_order_number())
+        order_data['estimated_delivery_time'] = eta.estimate_new_order(order_data)
+
+        if ingestion.write_behind_enabled():
+            # Written to MongoDB by the ingestion worker, which also runs the hooks below
+            order_data['_id'] = ObjectId()
+            ingestion.submit(order_data)
+            return status.HTTP_202_ACCEPTED, checkout.placed(order_data)
+
+        get_collection('orders').insert_one(order_data)
+    except Exception:
+        cart_store.restore(cart)
+        raise
+
+    # Counters are best effort; the order itself is already saved
+    try:
+        stats.record_order_created(order_data)
+    except Exception as e:
+        logger.error(f"Error updating order stats: {e}")
 
-        # Calculate totals
-        subtotal = sum(item['price'] * item['quantity'] for item in cart['items'])
-        delivery_fee = 0 if subtotal >= 500 else 50
-        total_amount = subtotal + delivery_fee
-
-        # Generate order number
-        order_number = f"SF{random.randint(100000, 999999)}"
-
-        # Get user profile for additional info
-        user_profiles = get_collection('user_profiles')
-        profile = user_profiles.find_one({'user_id': user.id})
-
-        # Create order
-        order_data = {
-            'order_number': order_number,
-            'user_id': user.id,
-            'customer_name': f"{user.first_name} {user.last_name}".strip() or user.username,
-            'customer_email': user.email,
-            'customer_phone': data['phone'],
-            'delivery_address': data['delivery_address'],
-            'items': cart['items'],
-            'subtotal': round(subtotal, 2),
-            'delivery_fee': delivery_fee,
-            'total_amount': round(total_amount, 2),
-            'payment_method': data.get('payment_method', 'cod'),
-            'payment_status': 'pending',
-            'status': 'pending',
-            'special_instructions': data.get('special_instructions', ''),
-            'created_at': datetime.now(),
-            'updated_at': datetime.now(),
-            'estimated_delivery_time': datetime.now() + timedelta(minutes=45)
-        }
-
-        # Save order
-        orders_collection = get_collection('orders')
-        result = orders_collection.insert_one(order_data)
+    events.publish(events.ORDER_CREATED, order_data)
+    eta.orders_created([order_data])
+    kitchen.orders_created([order_data])
 
-        # Clear user's cart
-        cart_collection.delete_one({'user_id': user.id})
+    return status.HTTP_201_CREATED, checkout.placed(order_data)
 
-        # Return order details
-        order_data['id'] = str(result.inserted_id)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_order(request):
+    """Create a new order from user's cart"""
+    user = request.user
+    data = request.data
+    key = request.headers.get(idempotency.HEADER)
 
+    error = checkout.validation_error(data, key)
+    if error:
         return Response({
-            'success': True,
-            'message': 'Order placed successfully',
-            'order': {
-                'id': order_data['id'],
-                'order_number': order_data['order_number'],
-                'total_amount': order_data['total_amount'],
-                'status': order_data['status'],
-                'estimated_delivery_time': order_data['estimated_delivery_time'].isoformat()
-            }
-        }, status=status.HTTP_201_CREATED)
+            'success': False,
+            'message': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if key:
+            previous = idempotency.claim(user.id, key)
+            if previous and previous['state'] == idempotency.COMPLETED:
+                return Response(previous['body'], status=previous['status_code'])
+            if previous:
+                return Response(checkout.IN_PROGRESS, status=status.HTTP_409_CONFLICT)
+
+        try:
+            status_code, body = _place_order(user, data)
+        except ingestion.QueueFull as e:
+            if key:
+                idempotency.release(user.id, key)
+            logger.error(f"Order queue full: {e}")
+            return Response(checkout.QUEUE_FULL, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={'Retry-After': '5'})
+        except Exception:
+            if key:
+                idempotency.release(user.id, key)
+            raise
+
+        if key:
+            if status.is_success(status_code):
+                idempotency.complete(user.id, key, status_code, body)
+            else:
+                # Nothing was placed; let a retry try again
+                idempotency.release(user.id, key)
+
+        return Response(body, status=status_code)
 
     except Exception as e:
         logger.error(f"Error creating order: {e}")
-        return Response({
-            'success': False,
-            'message': 'Error placing order'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(checkout.FAILED, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -107,21 +115,26 @@ def get_my_orders(request):
         user_id = request.user.id
         orders_collection = get_collection('orders')
 
-        orders = list(orders_collection.find({'user_id': user_id}).sort('created_at', -1))
+        orders, next_cursor = pagination.fetch_page(
+            orders_collection,
+            {'user_id': user_id},
+            cursor=request.GET.get('cursor'),
+            limit=pagination.page_size(request.GET.get('limit')),
+            projection=pagination.SUMMARY_PROJECTION
+        )
 
-        # Convert ObjectId to string and format dates
-        for order in orders:
-            order['id'] = str(order['_id'])
-            del order['_id']
-            if 'created_at' in order:
-                order['created_at'] = order['created_at'].isoformat()
-            if 'estimated_delivery_time' in order:
-                order['estimated_delivery_time'] = order['estimated_delivery_time'].isoformat()
+        api_documents(orders)
 
         return Response({
             'success': True,
-            'orders': orders
+            'orders': orders,
+            'next_cursor': next_cursor
         })
+    except pagination.InvalidCursor:
+        return Response({
+            'success': False,
+            'message': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error getting user orders: {e}")
         return Response({
@@ -142,7 +155,16 @@ def get_order_detail(request, order_id):
         if not request.user.is_staff:
             query['user_id'] = user_id
 
-        order = orders_collection.find_one(query)
+        # Revalidation only needs the timestamps: every order change sets updated_at, a new ETA eta_updated_at
+        version = orders_collection.find_one(query, {'updated_at': 1, 'eta_updated_at': 1})
+        if version:
+            unchanged = not_modified(request, make_etag(
+                'order', order_id, version.get('updated_at'), version.get('eta_updated_at')
+            ), PRIVATE_CACHE_CONTROL)
+            if unchanged:
+                return unchanged
+
+        order = version and orders_collection.find_one(query)
 
         if not order:
             return Response({
@@ -150,18 +172,10 @@ def get_order_detail(request, order_id):
                 'message': 'Order not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
-        # Format response
-        order['id'] = str(order['_id'])
-        del order['_id']
-        if 'created_at' in order:
-            order['created_at'] = order['created_at'].isoformat()
-        if 'estimated_delivery_time' in order:
-            order['estimated_delivery_time'] = order['estimated_delivery_time'].isoformat()
-
-        return Response({
+        return cached(Response({
             'success': True,
-            'order': order
-        })
+            'order': api_document(order)
+        }), make_etag('order', order_id, order.get('updated_at'), order.get('eta_updated_at')), PRIVATE_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error getting order detail: {e}")
         return Response({
@@ -170,7 +184,7 @@ def get_order_detail(request, order_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
-@permission_classes([IsAdminUser])
+@permission_classes([IsVerifiedAdminUser])
 def get_all_orders(request):
     """Get all orders for admin dashboard"""
     try:
@@ -178,29 +192,36 @@ def get_all_orders(request):
 
         # Get query parameters
         status_filter = request.GET.get('status')
-        limit = int(request.GET.get('limit', 50))
 
         # Build query
         query = {}
         if status_filter:
             query['status'] = status_filter
 
-        orders = list(orders_collection.find(query).sort('created_at', -1).limit(limit))
+        # Taken before the read so no change made during it is missed
+        sync_cursor = changes.sync_cursor()
+        orders, next_cursor = pagination.fetch_page(
+            orders_collection,
+            query,
+            cursor=request.GET.get('cursor'),
+            limit=pagination.page_size(request.GET.get('limit'), default=50),
+            projection=pagination.SUMMARY_PROJECTION
+        )
 
-        # Format orders
-        for order in orders:
-            order['id'] = str(order['_id'])
-            del order['_id']
-            if 'created_at' in order:
-                order['created_at'] = order['created_at'].isoformat()
-            if 'estimated_delivery_time' in order:
-                order['estimated_delivery_time'] = order['estimated_delivery_time'].isoformat()
+        api_documents(orders)
 
         return Response({
             'success': True,
             'orders': orders,
-            'count': len(orders)
+            'count': len(orders),
+            'next_cursor': next_cursor,
+            'sync_cursor': sync_cursor
         })
+    except pagination.InvalidCursor:
+        return Response({
+            'success': False,
+            'message': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error getting all orders: {e}")
         return Response({
@@ -208,8 +229,47 @@ def get_all_orders(request):
             'message': 'Error fetching orders'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsVerifiedAdminUser])
+def get_order_changes(request):
+    """Orders created or updated since ?since=<cursor> from admin/all/ or an earlier call (admin only)"""
+    try:
+        since = request.GET.get('since')
+        if not since:
+            return Response({
+                'success': False,
+                'message': 'since is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        orders, cursor, resync = changes.fetch_changes(
+            get_collection('orders'),
+            since,
+            projection=pagination.SUMMARY_PROJECTION
+        )
+
+        api_documents(orders)
+
+        return Response({
+            'success': True,
+            'orders': orders,
+            'count': len(orders),
+            'cursor': cursor,
+            'resync': resync
+        })
+    except pagination.InvalidCursor:
+        return Response({
+            'success': False,
+            'message': 'Invalid cursor'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error getting order changes: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error fetching order changes'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['PUT'])
-@permission_classes([IsAdminUser])
+@permission_classes([IsVerifiedAdminUser])
 def update_order_status(request, order_id):
     """Update order status (admin only)"""
     try:
@@ -222,32 +282,53 @@ def update_order_status(request, order_id):
                 'message': 'Status is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        valid_statuses = ['pending', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered', 'cancelled']
-        if new_status not in valid_statuses:
+        if new_status not in transitions.STATUSES:
             return Response({
                 'success': False,
                 'message': 'Invalid status'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        orders_collection = get_collection('orders')
-
-        # Update order
-        result = orders_collection.update_one(
-            {'_id': ObjectId(order_id)},
-            {
-                '$set': {
-                    'status': new_status,
-                    'updated_at': datetime.now()
-                }
-            }
+        # Update order, keeping the previous status for the stats rollup
+        changed_at = datetime.now()
+        result, previous = transitions.update_status(
+            get_collection('orders'), ObjectId(order_id), new_status, at=changed_at
         )
 
-        if result.matched_count == 0:
+        if result == transitions.NOT_FOUND:
             return Response({
                 'success': False,
                 'message': 'Order not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
+        if result == transitions.INVALID_TRANSITION:
+            return Response({
+                'success': False,
+                'message': f"Cannot change an order from {previous['status']} to {new_status}"
+            }, status=status.HTTP_409_CONFLICT)
+
+        if result == transitions.UNCHANGED:
+            return Response({
+                'success': True,
+                'message': f'Order status is already {new_status}'
+            })
+
+        try:
+            stats.record_status_change(previous, new_status)
+        except Exception as e:
+            logger.error(f"Error updating order stats: {e}")
+        try:
+            sla.record([(previous, new_status)], changed_at)
+        except Exception as e:
+            logger.error(f"Error updating stage stats: {e}")
+
+        events.publish(
+            events.ORDER_STATUS_CHANGED,
+            {**previous, 'status': new_status},
+            previous_status=previous['status']
+        )
+        eta.status_changed([(previous, new_status)], changed_at)
+        kitchen.status_changed([(previous, new_status)])
+
         return Response({
             'success': True,
             'message': f'Order status updated to {new_status}'
@@ -259,59 +340,119 @@ def update_order_status(request, order_id):
             'message': 'Error updating order status'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsVerifiedAdminUser])
+def bulk_update_order_status(request):
+    """Update the status of many orders at once (admin only)"""
+    try:
+        # A JSON array body has no 'updates' key
+        updates = request.data.get('updates') if isinstance(request.data, dict) else None
+
+        if not isinstance(updates, list) or not updates:
+            return Response({
+                'success': False,
+                'message': 'updates must be a list of {order_id, status}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(updates) > transitions.MAX_BULK_UPDATES:
+            return Response({
+                'success': False,
+                'message': f'At most {transitions.MAX_BULK_UPDATES} updates per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        changed_at = datetime.now()
+        results, applied = transitions.apply_status_updates(get_collection('orders'), updates, at=changed_at)
+
+        if applied:
+            try:
+                stats.record_status_changes(applied)
+            except Exception as e:
+                logger.error(f"Error updating order stats: {e}")
+            try:
+                sla.record(applied, changed_at)
+            except Exception as e:
+                logger.error(f"Error updating stage stats: {e}")
+
+            events.publish_status_batch([
+                ({**previous, 'status': new_status}, previous['status']) for previous, new_status in applied
+            ])
+            eta.status_changed(applied, changed_at)
+            kitchen.status_changed(applied)
+
+        return Response({
+            'success': True,
+            'message': f'{len(applied)} of {len(updates)} orders updated',
+            'updated': len(applied),
+            'results': results
+        })
+    except Exception as e:
+        logger.error(f"Error bulk updating order status: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error updating order status'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
-@permission_classes([IsAdminUser])
-def get_dashboard_stats(request):
-    """Get dashboard statistics for admin"""
+@permission_classes([IsVerifiedAdminUser])
+def get_stage_stats(request):
+    """Time orders spend in each status, all time or for ?date=YYYY-MM-DD (admin only)"""
     try:
-        orders_collection = get_collection('orders')
+        date = request.GET.get('date')
+        if date:
+            try:
+                scope = sla.day_scope(datetime.strptime(date, '%Y-%m-%d'))
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'message': 'date must be YYYY-MM-DD'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            scope = sla.ALL_TIME
 
-        # Get today's date range
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
+        return Response({
+            'success': True,
+            'date': date,
+            'stages': sla.stage_stats(scope)
+        })
+    except Exception as e:
+        logger.error(f"Error getting stage stats: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error fetching stage statistics'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # Get statistics
-        total_orders = orders_collection.count_documents({})
-        today_orders = orders_collection.count_documents({
-            'created_at': {'$gte': today_start, '$lt': today_end}
+@api_view(['GET'])
+@permission_classes([IsVerifiedAdminUser])
+def get_kitchen_queue(request):
+    """Waiting orders grouped into prep batches, in the order to cook them (admin only)"""
+    try:
+        return Response({
+            'success': True,
+            **kitchen.work_queue()
         })
+    except Exception as e:
+        logger.error(f"Error getting kitchen queue: {e}")
+        return Response({
+            'success': False,
+            'message': 'Error fetching kitchen queue'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        pending_orders = orders_collection.count_documents({'status': 'pending'})
-        preparing_orders = orders_collection.count_documents({'status': {'$in': ['confirmed', 'preparing']}})
-
-        # Calculate today's revenue
-        today_revenue_pipeline = [
-            {'$match': {
-                'created_at': {'$gte': today_start, '$lt': today_end},
-                'status': {'$ne': 'cancelled'}
-            }},
-            {'$group': {
-                '_id': None,
-                'total': {'$sum': '$total_amount'}
-            }}
-        ]
-
-        today_revenue_result = list(orders_collection.aggregate(today_revenue_pipeline))
-        today_revenue = today_revenue_result[0]['total'] if today_revenue_result else 0
-
-        # Get recent orders
-        recent_orders = list(orders_collection.find({}).sort('created_at', -1).limit(5))
-        for order in recent_orders:
-            order['id'] = str(order['_id'])
-            del order['_id']
-            if 'created_at' in order:
-                order['created_at'] = order['created_at'].isoformat()
+@api_view(['GET'])
+@permission_classes([IsVerifiedAdminUser])
+def get_dashboard_stats(request):
+    """Get dashboard statistics for admin"""
+    try:
+        # ?live=true bypasses the rollup and aggregates the orders collection
+        if request.GET.get('live', '').lower() == 'true':
+            dashboard = stats.live_dashboard_stats()
+        else:
+            dashboard = stats.dashboard_stats()
+
+        api_documents(dashboard['recent_orders'])
 
         return Response({
             'success': True,
-            'stats': {
-                'total_orders': total_orders,
-                'today_orders': today_orders,
-                'pending_orders': pending_orders,
-                'preparing_orders': preparing_orders,
-                'today_revenue': round(today_revenue, 2),
-                'recent_orders': recent_orders
-            }
+            'stats': dashboard
         })
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
@@ -319,3 +460,22 @@ def get_dashboard_stats(request):
             'success': False,
             'message': 'Error fetching dashboard statistics'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@authentication_classes([QueryParamJWTAuthentication, CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@renderer_classes([MongoJSONRenderer, EventStreamRenderer])
+def order_stream(request):
+    """Stream order events: staff see every order, customers only their own"""
+    # Each stream holds this worker thread; past the cap the page polls instead
+    stream = open_sync_stream(request.user)
+    if stream is None:
+        return Response({
+            'success': False,
+            'message': 'Live updates are unavailable; poll for changes'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '30'})
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,296 @@
+"""
+Per-request MongoDB instrumentation.
+
+`CommandListener` is installed on the pymongo and Motor clients by
+mongo_client. While a request is being handled, `QueryMetricsMiddleware`
+keeps a `RequestQueries` in a context variable and every command the
+request sends is counted against it, by collection. The middleware then:
+
+- adds a `Server-Timing` header (total Mongo time plus one entry per
+  collection), readable in the browser's network panel;
+- logs the request when its Mongo time passes SLOW_REQUEST_MS (single
+  commands slower than SLOW_COMMAND_MS are logged by the listener);
+- records per-endpoint histograms, served in Prometheus text format by
+  `/metrics/` (admin only).
+
+Metrics are kept per worker process.
+"""
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from pymongo import monitoring
+import contextvars
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+DEFAULT_SETTINGS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'SLOW_COMMAND_MS': 100,
+    'SLOW_REQUEST_MS': 500,
+}
+
+def get_settings():
+    config = dict(DEFAULT_SETTINGS)
+    config.update(getattr(settings, 'QUERY_METRICS', {}))
+    return config
+
+_current = contextvars.ContextVar('query_metrics_request', default=None)
+
+class RequestQueries:
+    """MongoDB commands sent while handling one request"""
+
+    __slots__ = ('path', 'count', 'duration', 'by_collection', '_lock')
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.duration = 0.0
+        self.by_collection = {}
+        # Async views can run commands concurrently on Motor's threads
+        self._lock = threading.Lock()
+
+    def add(self, collection, duration):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            entry = self.by_collection.setdefault(collection, [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+
+    def server_timing(self):
+        entries = [f'mongo;dur={self.duration * 1000:.1f};desc="{self.count} commands"']
+        for collection, (count, duration) in sorted(self.by_collection.items()):
+            entries.append(f'mongo-{collection};dur={duration * 1000:.1f};desc="{count} commands"')
+        return ', '.join(entries)
+
+    def breakdown(self):
+        return ', '.join(
+            f'{collection} x{count} {duration * 1000:.1f}ms'
+            for collection, (count, duration) in sorted(self.by_collection.items())
+        )
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+class Metrics:
+    """Process-wide request and command metrics; other modules can register their own"""
+
+    REQUEST_HISTOGRAMS = {
+        'srinu_http_request_duration_seconds': ('Request handling time', TIME_BUCKETS),
+        'srinu_mongo_request_duration_seconds': ('MongoDB time per request', TIME_BUCKETS),
+        'srinu_mongo_commands_per_request': ('MongoDB commands per request', COUNT_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (description, buckets) and name -> description
+        self._histogram_types = {}
+        self._counter_types = {}
+        # name -> {label pairs: Histogram or count}
+        self._histograms = {}
+        self._counters = {}
+        self._commands = {}
+        for name, (description, buckets) in self.REQUEST_HISTOGRAMS.items():
+            self.register_histogram(name, description, buckets)
+
+    def register_histogram(self, name, description, buckets=TIME_BUCKETS):
+        with self._lock:
+            self._histogram_types.setdefault(name, (description, buckets))
+            self._histograms.setdefault(name, {})
+
+    def register_counter(self, name, description):
+        with self._lock:
+            self._counter_types.setdefault(name, description)
+            self._counters.setdefault(name, {})
+
+    def _observe(self, name, value, labels):
+        key = tuple(labels.items())
+        histogram = self._histograms[name].get(key)
+        if histogram is None:
+            histogram = self._histograms[name][key] = Histogram(self._histogram_types[name][1])
+        histogram.observe(value)
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            self._observe(name, value, labels)
+
+    def increment(self, name, amount=1, **labels):
+        key = tuple(labels.items())
+        with self._lock:
+            self._counters[name][key] = self._counters[name].get(key, 0) + amount
+
+    def observe_request(self, endpoint, duration, queries):
+        with self._lock:
+            self._observe('srinu_http_request_duration_seconds', duration, {'endpoint': endpoint})
+            self._observe('srinu_mongo_request_duration_seconds', queries.duration, {'endpoint': endpoint})
+            self._observe('srinu_mongo_commands_per_request', queries.count, {'endpoint': endpoint})
+
+    def observe_command(self, command, collection, duration, failed=False):
+        with self._lock:
+            entry = self._commands.setdefault((command, collection), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] += failed
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (description, _) in self._histogram_types.items():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for key, histogram in sorted(self._histograms[name].items()):
+                    labels = dict(key)
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{_labels(**labels, le="+Inf")}}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{_labels(**labels)}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{_labels(**labels)}}} {histogram.count}')
+
+            counters = [
+                ('srinu_mongo_commands_total', 'MongoDB commands sent', 0),
+                ('srinu_mongo_command_seconds_total', 'Time spent in MongoDB commands', 1),
+                ('srinu_mongo_command_failures_total', 'MongoDB commands that failed', 2),
+            ]
+            for name, description, index in counters:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+                for (command, collection), entry in sorted(self._commands.items()):
+                    lines.append(f'{name}{{{_labels(command=command, collection=collection)}}} {entry[index]:g}')
+
+            for name, description in self._counter_types.items():
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f'{name}{{{_labels(**dict(key))}}} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {name: {} for name in self._histogram_types}
+            self._counters = {name: {} for name in self._counter_types}
+            self._commands = {}
+
+metrics = Metrics()
+
+def _collection(event):
+    target = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+    return target if isinstance(target, str) else '-'
+
+class CommandListener(monitoring.CommandListener):
+    """Attributes each command to the request that sent it"""
+
+    def __init__(self):
+        # (connection, request id) -> (collection, RequestQueries or None)
+        self._pending = {}
+
+    def started(self, event):
+        self._pending[(event.connection_id, event.request_id)] = (_collection(event), _current.get())
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        collection, queries = self._pending.pop((event.connection_id, event.request_id), ('-', None))
+        duration = event.duration_micros / 1e6
+
+        metrics.observe_command(event.command_name, collection, duration, failed)
+        if queries is not None:
+            queries.add(collection, duration)
+
+        if duration * 1000 >= get_settings()['SLOW_COMMAND_MS']:
+            logger.warning(
+                f"Slow MongoDB command: {event.command_name} on {collection} took {duration * 1000:.1f}ms"
+                f"{' (failed)' if failed else ''} [{queries.path if queries else 'background'}]"
+            )
+
+listener = CommandListener()
+
+def current_request_queries():
+    """RequestQueries for the request being handled, or None"""
+    return _current.get()
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} /{match.route}" if match else f"{request.method} unmatched"
+
+def _finish_request(request, response, queries, started, config):
+    duration = time.perf_counter() - started
+    metrics.observe_request(_endpoint(request), duration, queries)
+
+    if config['SERVER_TIMING']:
+        timing = f'{queries.server_timing()}, app;dur={duration * 1000:.1f}'
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+    if queries.duration * 1000 >= config['SLOW_REQUEST_MS']:
+        logger.warning(
+            f"Slow request: {request.method} {request.path} spent {queries.duration * 1000:.1f}ms "
+            f"in {queries.count} MongoDB commands ({queries.breakdown()})"
+        )
+    return response
+
+@sync_and_async_middleware
+def QueryMetricsMiddleware(get_response):
+    """Tracks MongoDB commands per request; see the module docstring"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            config = get_settings()
+            if not config['ENABLED']:
+                return await get_response(request)
+
+            queries = RequestQueries(request.path)
+            token = _current.set(queries)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return _finish_request(request, response, queries, started, config)
+    else:
+        def middleware(request):
+            config = get_settings()
+            if not config['ENABLED']:
+                return get_response(request)
+
+            queries = RequestQueries(request.path)
+            token = _current.set(queries)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return _finish_request(request, response, queries, started, config)
+
+    return middleware
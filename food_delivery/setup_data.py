@@ -16,6 +16,10 @@ django.setup()
 
 from django.contrib.auth.models import User
 from mongo_client import get_collection
+from mongo_indexes import ensure_indexes
+from menu import catalog
+from orders import stats as order_stats
+from orders.order_numbers import next_order_number
 
 def create_admin_user():
     """Create admin user for the system"""
@@ -166,6 +170,7 @@ def create_categories():
         category['updated_at'] = datetime.now()
 
     result = categories.insert_many(categories_data)
+    catalog.invalidate()
     print(f"✅ Created {len(result.inserted_ids)} categories")
 
 def create_menu_items():
@@ -446,6 +451,7 @@ def create_menu_items():
         item['updated_at'] = datetime.now()
 
     result = menu_items.insert_many(menu_items_data)
+    catalog.invalidate()
     print(f"✅ Created {len(result.inserted_ids)} menu items")
 
 def create_sample_orders():
@@ -491,7 +497,7 @@ def create_sample_orders():
         total_amount = subtotal + delivery_fee
 
         order = {
-            'order_number': f'SF{random.randint(100000, 999999)}',
+            'order_number': next_order_number(),
             'user_id': user.id,
             'customer_name': f"{user.first_name} {user.last_name}".strip() or user.username,
             'customer_email': user.email,
@@ -516,6 +522,7 @@ def create_sample_orders():
     orders.delete_many({})  # Clear existing orders
 
     result = orders.insert_many(orders_data)
+    order_stats.rebuild()
     print(f"✅ Created {len(result.inserted_ids)} sample orders")
 
 def main():
@@ -524,6 +531,9 @@ def main():
     print("=" * 50)
 
     try:
+        print("\n🗂️ Creating indexes...")
+        ensure_indexes()
+
         print("\n👥 Setting up users...")
         create_admin_user()
         create_customer_users()
@@ -0,0 +1,13 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
+# Serve menu, cart, order and stats endpoints with async views (Motor)
+os.environ.setdefault('SRINU_FOODS_URLCONF', 'srinu_foods.asgi_urls')
+
+application = get_asgi_application()
+
+# Replay orders queued before the last shutdown; only server processes do this,
+# so management commands (drain_order_queue included) never start a drainer
+from orders import ingestion
+ingestion.resume()
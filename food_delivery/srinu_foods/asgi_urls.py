@@ -0,0 +1,24 @@
+"""
+URLs for the ASGI deployment: the hot endpoints go to their async variants,
+everything else falls through to the regular (sync) URL configuration.
+"""
+
+from django.urls import path, include
+from menu import async_views as menu_views
+from orders import async_views as order_views
+
+urlpatterns = [
+    path('api/menu/categories/', menu_views.get_categories, name='get_categories'),
+    path('api/menu/items/', menu_views.get_menu_items, name='get_menu_items'),
+    path('api/menu/items/<str:item_id>/', menu_views.get_menu_item, name='get_menu_item'),
+    path('api/menu/cart/', menu_views.get_cart, name='get_cart'),
+    path('api/menu/cart/add/', menu_views.add_to_cart, name='add_to_cart'),
+    path('api/menu/cart/remove/<str:item_id>/', menu_views.remove_from_cart, name='remove_from_cart'),
+    path('api/menu/cart/update/<str:item_id>/', menu_views.update_cart_item, name='update_cart_item'),
+    path('api/menu/cart/clear/', menu_views.clear_cart, name='clear_cart'),
+    path('api/orders/create/', order_views.create_order, name='create_order'),
+    path('api/orders/my-orders/', order_views.get_my_orders, name='get_my_orders'),
+    path('api/orders/admin/dashboard/stats/', order_views.get_dashboard_stats, name='get_dashboard_stats'),
+    path('api/orders/stream/', order_views.order_stream, name='order_stream'),
+    path('', include('srinu_foods.urls')),
+]
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from mongo_indexes import ensure_indexes, explain_query_shapes
+
+class Command(BaseCommand):
+    help = 'Explain every hot-path query shape and fail if any of them uses a COLLSCAN'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ensure-indexes', action='store_true',
+            help='Create the registered indexes before explaining'
+        )
+
+    def handle(self, *args, **options):
+        if options['ensure_indexes']:
+            ensure_indexes()
+
+        regressions = []
+        for description, collection_name, stages, uses_collscan in explain_query_shapes():
+            plan = ' <- '.join(stages)
+            if uses_collscan:
+                regressions.append(description)
+                self.stdout.write(self.style.ERROR(f"❌ {collection_name}: {description}: {plan}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {collection_name}: {description}: {plan}"))
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} query shape(s) fall back to COLLSCAN: {', '.join(regressions)}")
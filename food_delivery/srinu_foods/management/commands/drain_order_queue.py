@@ -0,0 +1,24 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from orders import ingestion
+
+class Command(BaseCommand):
+    help = 'Insert every order waiting in the write-behind queue into MongoDB'
+
+    def handle(self, *args, **options):
+        if not os.path.exists(ingestion.queue_path()):
+            self.stdout.write("No order queue found")
+            return
+
+        ingestor = ingestion.get_ingestor()
+        try:
+            written = ingestor.drain()
+        except Exception as e:
+            raise CommandError(f"Stopped with {len(ingestor.queue)} orders still queued: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written} queued orders"))
+        failed = ingestor.queue.failed()
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {len(failed)} orders MongoDB refused are kept in failed_orders in {ingestion.queue_path()}"
+            ))
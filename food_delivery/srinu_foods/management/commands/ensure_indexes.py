@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure
+from mongo_indexes import INDEXES, ensure_indexes
+from menu import cart_store
+
+class Command(BaseCommand):
+    help = 'Create the MongoDB indexes declared in mongo_indexes.INDEXES (idempotent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('collections', nargs='*', help='Limit to these collections')
+
+    def handle(self, *args, **options):
+        collections = options['collections'] or list(INDEXES)
+        failed = []
+
+        for collection_name in collections:
+            if collection_name not in INDEXES:
+                raise CommandError(f"No indexes registered for '{collection_name}'")
+            try:
+                if collection_name == 'carts':
+                    # Carts created by the old read-then-insert race would break the unique index
+                    merged = cart_store.merge_duplicate_carts()
+                    if merged:
+                        self.stdout.write(f"🛒 Merged {merged} duplicate carts")
+                names = ensure_indexes([collection_name])
+                self.stdout.write(self.style.SUCCESS(f"✅ {collection_name}: {', '.join(names)}"))
+            except OperationFailure as e:
+                failed.append(collection_name)
+                self.stderr.write(self.style.ERROR(f"❌ {collection_name}: {e}"))
+
+        if failed:
+            raise CommandError(f"Could not create indexes on: {', '.join(failed)}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orders import stats
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters in order_stats from the orders collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Rebuild only if the counters disagree with the orders'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            stats.rebuild()
+            self.stdout.write(self.style.SUCCESS("✅ Rebuilt order stats"))
+            return
+
+        differences = stats.reconcile()
+        if not differences:
+            self.stdout.write(self.style.SUCCESS("✅ Order stats match the orders"))
+            return
+        for figure, (rollup, live) in differences.items():
+            self.stdout.write(self.style.WARNING(f"⚠️ {figure}: {rollup} in order_stats, {live} in orders"))
+        self.stdout.write(self.style.SUCCESS("✅ Rebuilt order stats"))
@@ -18,12 +18,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'srinu_foods',
     'accounts',
     'menu',
     'orders',
 ]
 
 MIDDLEWARE = [
+    'query_metrics.QueryMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -34,7 +36,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'srinu_foods.urls'
+# asgi.py switches to srinu_foods.asgi_urls, which routes the hot endpoints to async views
+ROOT_URLCONF = os.environ.get('SRINU_FOODS_URLCONF', 'srinu_foods.urls')
 
 TEMPLATES = [
     {
@@ -53,6 +56,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'srinu_foods.wsgi.application'
+ASGI_APPLICATION = 'srinu_foods.asgi.application'
 
 # Database - SQLite for Django auth, MongoDB for restaurant data
 DATABASES = {
@@ -65,7 +69,100 @@ DATABASES = {
 # MongoDB configuration
 MONGODB_SETTINGS = {
     'HOST': 'mongodb://localhost:27017',
-    'DB_NAME': 'srinu_foods_db'
+    'DB_NAME': 'srinu_foods_db',
+    # Connection pool, per worker process
+    'MAX_POOL_SIZE': 100,
+    'MIN_POOL_SIZE': 0,
+    'WAIT_QUEUE_TIMEOUT_MS': 2000,  # fail instead of queueing forever when the pool is exhausted
+    # Fail fast when MongoDB is unreachable
+    'SERVER_SELECTION_TIMEOUT_MS': 5000,
+    'CONNECT_TIMEOUT_MS': 5000,
+    'COMPRESSORS': [],  # e.g. ['zstd', 'snappy', 'zlib']; needs the matching python package
+    'READ_PREFERENCE': 'primary',
+    'APP_NAME': 'srinu_foods',
+}
+
+# In-process menu catalog (see menu/catalog.py)
+CATALOG_SETTINGS = {
+    'POLL_INTERVAL': 5,  # seconds between version checks
+    'MAX_AGE': 300,  # seconds before a forced reload
+    'USE_CHANGE_STREAM': False,  # requires a replica set
+}
+
+# Live order events (see orders/events.py)
+ORDER_EVENTS = {
+    'BACKEND': 'orders.events.InProcessBroker',
+    'SUBSCRIBER_QUEUE_SIZE': 100,
+    'HEARTBEAT_INTERVAL': 15,  # seconds between keepalive comments
+    'MAX_STREAM_DURATION': 300,  # seconds before the client reconnects
+    # Streams per process under WSGI, where each holds a worker thread; beyond
+    # this the pages poll instead. ASGI streams are not limited.
+    'MAX_SYNC_STREAMS': 4 if DEBUG else 0,
+}
+
+# Write-behind order ingestion for peak hours (see orders/ingestion.py)
+ORDER_INGESTION = {
+    'WRITE_BEHIND': False,  # queue orders locally and answer 202
+    'QUEUE_PATH': BASE_DIR / 'order_queue.sqlite3',
+    'BATCH_SIZE': 200,  # orders per insert_many
+    'FLUSH_INTERVAL': 0.1,  # seconds the worker sleeps when the queue is empty
+    'MAX_PENDING': 5000,  # queued orders before create_order answers 503
+    'RETRY_DELAY': 1.0,  # seconds between attempts while MongoDB is unavailable
+    'SYNCHRONOUS': 'FULL',  # SQLite fsync level; NORMAL risks the newest orders on power loss
+    'DRAIN_ON_STARTUP': True,  # server processes (wsgi.py/asgi.py) drain orders left from the last run
+}
+
+ORDER_CHANGES = {
+    'SETTLE_SECONDS': 5,  # recent changes are sent again on the next poll in case an earlier write lands late
+    'MAX_CHANGES': 200,  # more pending changes than this and the board reloads instead
+    'MAX_AGE': 3600,  # seconds; older cursors are told to reload
+}
+
+ORDER_ETA = {
+    'LEARNING_RATE': 0.05,  # weight of each new observation in the running averages
+    'DEPTH_BUCKETS': (2, 5, 10, 20),  # kitchen queue depths learned separately
+    'MIN_SAMPLES': 20,  # observations before a depth bucket is trusted
+    'PUSH_THRESHOLD': 60,  # seconds a planned delivery must move before customers are told
+    'REFRESH_INTERVAL': 60,  # seconds between reloads of the open orders, on a background thread
+    'WARMUP_DAYS': 7,  # status history replayed when a process starts estimating
+    'WARMUP_ORDERS': 20000,
+}
+
+ORDER_STATS = {
+    'RECONCILE_INTERVAL': 900,  # seconds between checks of the dashboard counters against orders; 0 turns them off
+    'RECONCILE_SETTLE': 2.0,  # seconds before a mismatch is checked again, and the counters rebuilt
+}
+
+KITCHEN = {
+    'STATIONS': 4,  # batches cooked at the same time
+    'BATCH_LIMIT': 6,  # most portions of one dish cooked together
+    'PORTION_OVERHEAD': 0.15,  # extra share of preparation_time per additional portion
+    'MAX_WAIT': 900,  # seconds before an order's batch jumps the queue
+    'REFRESH_INTERVAL': 60,  # seconds between reloads of the waiting orders, by the admin endpoint
+}
+
+QUERY_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,  # per-collection MongoDB timings in a Server-Timing header
+    'SLOW_COMMAND_MS': 100,  # log single MongoDB commands slower than this
+    'SLOW_REQUEST_MS': 500,  # log requests spending longer than this in MongoDB
+}
+
+IDENTITY_CACHE = {
+    'TTL': 300,  # seconds before a cached user/profile is reloaded
+    'MAX_SIZE': 10000,  # cached users per worker, least recently used evicted
+    # Build request.user from access-token claims with no lookup; names and the
+    # staff flag are then as of login until the token expires
+    'TRUST_TOKEN_CLAIMS': False,
+}
+
+# Password checks run in accounts.passwords' process pool
+AUTHENTICATION_BACKENDS = ['accounts.passwords.PooledModelBackend']
+
+PASSWORD_POOL = {
+    'WORKERS': 2,  # hashing processes per server worker; 0 hashes inline
+    'MAX_CONCURRENT': 8,  # operations in flight per server worker
+    'QUEUE_TIMEOUT': 5,  # seconds to wait for a slot before answering 503
 }
 
 # Password validation
@@ -87,13 +184,13 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.identity.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'mongo_json.MongoJSONRenderer',
     ],
 }
 
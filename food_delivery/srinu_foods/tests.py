@@ -0,0 +1,27 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from pymongo.errors import ServerSelectionTimeoutError
+from mongo_indexes import QUERY_SHAPES, ensure_indexes, explain_query_shapes
+from mongo_testing import LiveMongoTestCase
+
+class QueryPlanTests(LiveMongoTestCase):
+    """Every registered hot-path query is served by an index; mongomock cannot explain(), so this needs a mongod"""
+
+    def test_no_query_shape_uses_a_collscan(self):
+        ensure_indexes()
+        plans = explain_query_shapes()
+        self.assertEqual(len(plans), len(QUERY_SHAPES))
+        for description, collection_name, stages, uses_collscan in plans:
+            with self.subTest(description):
+                self.assertFalse(uses_collscan, f"{collection_name}: {' <- '.join(stages)}")
+
+class HealthViewTests(SimpleTestCase):
+
+    def test_driver_errors_are_logged_not_returned(self):
+        error = ServerSelectionTimeoutError('mongo-internal.example:27017: [Errno 111] Connection refused')
+        with mock.patch('srinu_foods.urls.health_check', side_effect=error), \
+                self.assertLogs('srinu_foods.urls', 'ERROR') as logs:
+            response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 503)
+        self.assertNotIn('mongo-internal', response.content.decode())
+        self.assertIs(logs.records[0].exc_info[1], error)
@@ -1,12 +1,33 @@
+import logging
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from mongo_client import health_check
+from query_metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 def home_view(request):
     return render(request, 'index.html')
 
+def health_view(request):
+    try:
+        return JsonResponse({'success': True, 'mongodb': health_check()})
+    except Exception:
+        # Driver errors carry hostnames and topology; keep them in the logs
+        logger.exception('Health check could not reach MongoDB')
+        return JsonResponse({'success': False, 'mongodb': {'status': 'error', 'message': 'MongoDB is unavailable'}}, status=503)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def admin_dashboard_view(request):
     return render(request, 'admin_dashboard.html')
 
@@ -16,6 +37,8 @@ urlpatterns = [
     path('api/menu/', include('menu.urls')),
     path('api/orders/', include('orders.urls')),
     path('dashboard/', admin_dashboard_view, name='admin_dashboard'),
+    path('health/', health_view, name='health'),
+    path('metrics/', metrics_view, name='metrics'),
     path('', home_view, name='home'),
 ]
 
@@ -4,3 +4,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'srinu_foods.settings')
 
 application = get_wsgi_application()
+
+# Replay orders queued before the last shutdown; only server processes do this,
+# so management commands (drain_order_queue included) never start a drainer
+from orders import ingestion
+ingestion.resume()
@@ -1,11 +1,28 @@
 // Srinu Foods - Admin Dashboard Application
 
+// Next step offered as a bulk action when the board is filtered by status
+const BULK_NEXT_STATUS = {
+    pending: { status: 'confirmed', label: 'Confirm' },
+    confirmed: { status: 'preparing', label: 'Start Preparing' },
+    preparing: { status: 'ready', label: 'Mark Ready' },
+    ready: { status: 'out_for_delivery', label: 'Send Out' },
+    out_for_delivery: { status: 'delivered', label: 'Mark Delivered' }
+};
+
 class AdminDashboard {
     constructor() {
         this.currentUser = null;
         this.authToken = localStorage.getItem('authToken');
         this.orders = [];
+        this.ordersCursor = null;
+        this.ordersFilter = '';
+        this.syncCursor = null; // orders/admin/changes/ cursor for the loaded board
+        this.syncing = null;
         this.stats = {};
+        this.orderStream = null;
+        this.pollTimer = null;
+        this.refreshTimer = null;
+        this.validators = new Map(); // url -> { etag, body } for conditional GETs
 
         this.init();
     }
@@ -16,10 +33,40 @@ class AdminDashboard {
         await this.loadDashboardStats();
         await this.loadOrders();
 
-        // Auto-refresh every 30 seconds
-        setInterval(() => {
-            this.refreshDashboard();
-        }, 30000);
+        // Live updates; falls back to refreshing every 30 seconds
+        this.connectOrderStream();
+    }
+
+    connectOrderStream() {
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+
+        this.orderStream = new EventSource(`/api/orders/stream/?token=${encodeURIComponent(this.authToken)}`);
+        ['order_created', 'order_status_changed', 'order_status_batch', 'resync'].forEach(type => {
+            this.orderStream.addEventListener(type, () => this.scheduleRefresh());
+        });
+        this.orderStream.onopen = () => this.stopPolling();
+        // EventSource reconnects by itself; poll until it does
+        this.orderStream.onerror = () => this.startPolling();
+    }
+
+    scheduleRefresh() {
+        // Collapse a burst of events into one refresh
+        clearTimeout(this.refreshTimer);
+        this.refreshTimer = setTimeout(() => this.refreshDashboard(), 1000);
+    }
+
+    startPolling() {
+        if (!this.pollTimer) {
+            this.pollTimer = setInterval(() => this.refreshDashboard(), 30000);
+        }
+    }
+
+    stopPolling() {
+        clearInterval(this.pollTimer);
+        this.pollTimer = null;
     }
 
     async checkAdminAuth() {
@@ -174,16 +221,29 @@ class AdminDashboard {
         container.innerHTML = tableHtml;
     }
 
-    async loadOrders(statusFilter = '') {
+    async loadOrders(statusFilter = '', append = false) {
         try {
-            let url = '/api/orders/admin/all/';
+            const params = new URLSearchParams();
             if (statusFilter) {
-                url += `?status=${statusFilter}`;
+                params.append('status', statusFilter);
+            }
+            if (append && this.ordersCursor) {
+                params.append('cursor', this.ordersCursor);
+            }
+
+            let url = '/api/orders/admin/all/';
+            if (params.toString()) {
+                url += '?' + params.toString();
             }
 
             const response = await this.apiCall(url, 'GET');
             if (response.success) {
-                this.orders = response.orders;
+                this.orders = append ? this.orders.concat(response.orders) : response.orders;
+                this.ordersCursor = response.next_cursor;
+                if (!append) {
+                    this.ordersFilter = statusFilter;
+                    this.syncCursor = response.sync_cursor;
+                }
                 this.renderOrders();
             }
         } catch (error) {
@@ -192,6 +252,58 @@ class AdminDashboard {
         }
     }
 
+    async syncOrders() {
+        // One request at a time; callers arriving meanwhile share it
+        if (!this.syncing) {
+            this.syncing = this.fetchOrderChanges().finally(() => { this.syncing = null; });
+        }
+        return this.syncing;
+    }
+
+    async fetchOrderChanges() {
+        if (!this.syncCursor) {
+            return this.loadOrders(this.ordersFilter);
+        }
+
+        try {
+            const response = await this.apiCall(
+                `/api/orders/admin/changes/?since=${encodeURIComponent(this.syncCursor)}`, 'GET'
+            );
+            if (!response.success || response.resync) {
+                // Too far behind (or the cursor was refused): reload the board
+                return this.loadOrders(this.ordersFilter);
+            }
+
+            this.syncCursor = response.cursor;
+            if (response.orders.length) {
+                this.applyOrderChanges(response.orders);
+                this.renderOrders();
+            }
+        } catch (error) {
+            console.error('Error syncing orders:', error);
+        }
+    }
+
+    applyOrderChanges(changes) {
+        // Orders older than the last one shown belong to pages not loaded yet
+        const oldest = this.ordersCursor && this.orders.length
+            ? this.orders[this.orders.length - 1].created_at : null;
+        const byId = new Map(this.orders.map(order => [order.id, order]));
+
+        changes.forEach(order => {
+            if (this.ordersFilter && order.status !== this.ordersFilter) {
+                byId.delete(order.id);
+            } else if (byId.has(order.id) || !oldest || order.created_at >= oldest) {
+                byId.set(order.id, order);
+            }
+        });
+
+        // Newest first, as admin/all/ returns them
+        this.orders = [...byId.values()].sort((a, b) =>
+            a.created_at === b.created_at ? b.id.localeCompare(a.id) : b.created_at.localeCompare(a.created_at)
+        );
+    }
+
     renderOrders() {
         const container = document.getElementById('ordersContainer');
         if (!container) return;
@@ -201,6 +313,15 @@ class AdminDashboard {
             return;
         }
 
+        const next = BULK_NEXT_STATUS[this.ordersFilter];
+        const bulkHtml = next ? `
+            <div class="bulk-actions">
+                <button class="btn btn-success" onclick="adminDashboard.bulkUpdateStatus('${next.status}')">
+                    ${next.label}: all ${this.orders.length} shown
+                </button>
+            </div>
+        ` : '';
+
         const ordersHtml = this.orders.map(order => `
             <div class="order-card">
                 <div class="order-card-header">
@@ -230,15 +351,7 @@ class AdminDashboard {
                 </div>
 
                 <div class="order-items">
-                    <h4>Items Ordered:</h4>
-                    <div class="order-item-list">
-                        ${order.items.map(item => `
-                            <div class="order-item-row">
-                                <span>${item.name} x ${item.quantity}</span>
-                                <span>₹${(item.price * item.quantity).toFixed(2)}</span>
-                            </div>
-                        `).join('')}
-                    </div>
+                    <h4>Items Ordered: ${order.item_count}</h4>
                 </div>
 
                 <div class="order-total">
@@ -279,7 +392,11 @@ class AdminDashboard {
             </div>
         `).join('');
 
-        container.innerHTML = ordersHtml;
+        const loadMoreHtml = this.ordersCursor ? `
+            <button class="btn btn-primary" onclick="loadMoreOrders()">Load More</button>
+        ` : '';
+
+        container.innerHTML = bulkHtml + ordersHtml + loadMoreHtml;
     }
 
     async showOrderDetails(orderId) {
@@ -412,7 +529,7 @@ class AdminDashboard {
 
             if (response.success) {
                 this.showToast(`Order status updated to ${newStatus.replace('_', ' ')}`, 'success');
-                await this.loadOrders(); // Refresh orders list
+                await this.syncOrders(); // Pick up the change on the board
                 await this.loadDashboardStats(); // Refresh stats
             } else {
                 this.showToast(response.message || 'Failed to update order status', 'error');
@@ -423,18 +540,48 @@ class AdminDashboard {
         }
     }
 
+    async bulkUpdateStatus(newStatus) {
+        const updates = this.orders.map(order => ({ order_id: order.id, status: newStatus }));
+        try {
+            // The server takes at most 100 updates per request
+            let updated = 0;
+            const failed = [];
+            for (let start = 0; start < updates.length; start += 100) {
+                const response = await this.apiCall(
+                    '/api/orders/admin/bulk-update-status/', 'POST', { updates: updates.slice(start, start + 100) }
+                );
+                if (!response.success) {
+                    this.showToast(response.message || 'Failed to update orders', 'error');
+                    return;
+                }
+                updated += response.updated;
+                failed.push(...response.results.filter(item => !['updated', 'unchanged'].includes(item.result)));
+            }
+
+            this.showToast(`${updated} orders updated to ${newStatus.replace('_', ' ')}`, 'success');
+            if (failed.length) {
+                this.showToast(`${failed.length} orders could not be updated`, 'error');
+            }
+            await this.syncOrders();
+            await this.loadDashboardStats();
+        } catch (error) {
+            console.error('Error updating orders:', error);
+            this.showToast('Failed to update orders', 'error');
+        }
+    }
+
     async refreshDashboard() {
         await this.loadDashboardStats();
 
         // If orders section is active, refresh orders too
         const ordersSection = document.getElementById('orders');
         if (ordersSection?.classList.contains('active')) {
-            const statusFilter = document.getElementById('statusFilter')?.value || '';
-            await this.loadOrders(statusFilter);
+            await this.syncOrders();
         }
     }
 
     logout() {
+        this.orderStream?.close();
         localStorage.removeItem('authToken');
         window.location.href = '/';
     }
@@ -453,8 +600,23 @@ class AdminDashboard {
             options.body = JSON.stringify(data);
         }
 
+        // Revalidate what we already have; the server answers 304 if it is unchanged
+        const cached = method === 'GET' ? this.validators.get(url) : null;
+        if (cached) {
+            options.headers['If-None-Match'] = cached.etag;
+        }
+
         const response = await fetch(url, options);
-        return await response.json();
+        if (response.status === 304 && cached) {
+            return cached.body;
+        }
+
+        const body = await response.json();
+        const etag = response.headers.get('ETag');
+        if (method === 'GET' && response.ok && etag) {
+            this.validators.set(url, { etag, body });
+        }
+        return body;
     }
 
     showModal(modalId) {
@@ -499,6 +661,11 @@ function loadOrders() {
     adminDashboard.loadOrders(statusFilter);
 }
 
+function loadMoreOrders() {
+    const statusFilter = document.getElementById('statusFilter')?.value || '';
+    adminDashboard.loadOrders(statusFilter, true);
+}
+
 // Initialize admin dashboard
 document.addEventListener('DOMContentLoaded', () => {
     adminDashboard = new AdminDashboard();
@@ -8,6 +8,12 @@ class SrinuFoodsApp {
         this.menuItems = [];
         this.cart = [];
         this.isLoading = false;
+        this.suggestTimer = null;
+        this.myOrders = [];
+        this.myOrdersCursor = null;
+        this.orderStream = null;
+        this.cartPollTimer = null;
+        this.validators = new Map(); // url -> { etag, body } for conditional GETs
 
         this.init();
     }
@@ -19,12 +25,55 @@ class SrinuFoodsApp {
         await this.loadMenuItems();
         await this.updateCartDisplay();
 
-        // Auto-refresh cart every 30 seconds if user is logged in
+        // Live order updates; falls back to polling the cart every 30 seconds
         if (this.authToken) {
-            setInterval(() => this.loadCart(), 30000);
+            this.connectOrderStream();
         }
     }
 
+    connectOrderStream() {
+        this.closeOrderStream();
+        if (!window.EventSource) {
+            this.startCartPolling();
+            return;
+        }
+
+        this.orderStream = new EventSource(`/api/orders/stream/?token=${encodeURIComponent(this.authToken)}`);
+        this.orderStream.addEventListener('order_status_changed', (e) => {
+            const event = JSON.parse(e.data);
+            this.showToast(`Order #${event.order_number} is now ${event.status.replace('_', ' ')}`, 'success');
+            this.updateMyOrder(event.order_id, { status: event.status });
+        });
+        this.orderStream.addEventListener('order_eta_changed', (e) => {
+            const event = JSON.parse(e.data);
+            this.updateMyOrder(event.order_id, { estimated_delivery_time: event.estimated_delivery_time });
+        });
+        this.orderStream.addEventListener('order_created', () => this.loadCart());
+        this.orderStream.addEventListener('resync', () => this.loadCart());
+        this.orderStream.onopen = () => this.stopCartPolling();
+        // EventSource reconnects by itself; poll until it does
+        this.orderStream.onerror = () => this.startCartPolling();
+    }
+
+    closeOrderStream() {
+        if (this.orderStream) {
+            this.orderStream.close();
+            this.orderStream = null;
+        }
+        this.stopCartPolling();
+    }
+
+    startCartPolling() {
+        if (!this.cartPollTimer) {
+            this.cartPollTimer = setInterval(() => this.loadCart(), 30000);
+        }
+    }
+
+    stopCartPolling() {
+        clearInterval(this.cartPollTimer);
+        this.cartPollTimer = null;
+    }
+
     setupEventListeners() {
         // Navigation
         document.getElementById('loginBtn')?.addEventListener('click', () => this.showModal('loginModal'));
@@ -49,7 +98,8 @@ class SrinuFoodsApp {
         document.getElementById('orderForm')?.addEventListener('submit', (e) => this.handleOrder(e));
 
         // Search and filters
-        document.getElementById('searchInput')?.addEventListener('input', (e) => this.handleSearch(e.target.value));
+        document.getElementById('searchInput')?.addEventListener('input', (e) => this.handleSearchInput(e.target.value));
+        document.getElementById('searchInput')?.addEventListener('change', (e) => this.handleSearch(e.target.value));
         document.getElementById('categoryFilter')?.addEventListener('change', (e) => this.filterByCategory(e.target.value));
         document.getElementById('vegFilter')?.addEventListener('change', (e) => this.filterVeg(e.target.checked));
 
@@ -133,6 +183,7 @@ class SrinuFoodsApp {
                 this.updateAuthUI();
                 this.hideModal('loginModal');
                 this.showToast('Login successful!', 'success');
+                this.connectOrderStream();
 
                 // Load user cart
                 await this.loadCart();
@@ -188,6 +239,7 @@ class SrinuFoodsApp {
                 this.updateAuthUI();
                 this.hideModal('registerModal');
                 this.showToast('Registration successful! Welcome to Srinu Foods!', 'success');
+                this.connectOrderStream();
             } else {
                 this.showToast(this.formatErrors(response.errors) || 'Registration failed', 'error');
             }
@@ -200,9 +252,11 @@ class SrinuFoodsApp {
     }
 
     logout() {
+        this.closeOrderStream();
         this.authToken = null;
         this.currentUser = null;
         localStorage.removeItem('authToken');
+        this.validators.clear();
         this.cart = [];
         this.updateAuthUI();
         this.updateCartDisplay();
@@ -312,6 +366,38 @@ class SrinuFoodsApp {
     }
 
     // Filter Methods
+    handleSearchInput(query) {
+        // Keystrokes only fetch lightweight suggestions; the full list
+        // is loaded when the search is committed (Enter, blur or pick)
+        clearTimeout(this.suggestTimer);
+        if (!query.trim()) {
+            this.renderSuggestions([]);
+            this.handleSearch('');
+            return;
+        }
+        this.suggestTimer = setTimeout(() => this.loadSuggestions(query), 150);
+    }
+
+    async loadSuggestions(query) {
+        try {
+            const response = await this.apiCall(`/api/menu/suggest/?q=${encodeURIComponent(query)}`, 'GET');
+            if (response.success) {
+                this.renderSuggestions(response.items);
+            }
+        } catch (error) {
+            console.error('Error loading suggestions:', error);
+        }
+    }
+
+    renderSuggestions(items) {
+        const datalist = document.getElementById('searchSuggestions');
+        if (!datalist) return;
+
+        datalist.innerHTML = items.map(item =>
+            `<option value="${item.name}">₹${item.price}</option>`
+        ).join('');
+    }
+
     handleSearch(query) {
         this.loadMenuItems({ search: query });
     }
@@ -351,7 +437,7 @@ class SrinuFoodsApp {
 
             if (response.success) {
                 this.showToast('Item added to cart!', 'success');
-                await this.loadCart();
+                this.setCart(response.cart);
             } else {
                 this.showToast(response.message || 'Failed to add item to cart', 'error');
             }
@@ -367,14 +453,19 @@ class SrinuFoodsApp {
         try {
             const response = await this.apiCall('/api/menu/cart/', 'GET');
             if (response.success) {
-                this.cart = response.cart;
-                this.updateCartDisplay();
+                this.setCart(response.cart);
             }
         } catch (error) {
             console.error('Error loading cart:', error);
         }
     }
 
+    setCart(cart) {
+        // Cart mutations return the updated cart, so no extra GET is needed
+        this.cart = cart;
+        this.updateCartDisplay();
+    }
+
     updateCartDisplay() {
         const cartCount = document.getElementById('cartCount');
         if (cartCount) {
@@ -463,7 +554,7 @@ class SrinuFoodsApp {
             });
 
             if (response.success) {
-                await this.loadCart();
+                this.setCart(response.cart);
                 this.renderCart();
             }
         } catch (error) {
@@ -477,7 +568,7 @@ class SrinuFoodsApp {
 
             if (response.success) {
                 this.showToast('Item removed from cart', 'success');
-                await this.loadCart();
+                this.setCart(response.cart);
                 this.renderCart();
             }
         } catch (error) {
@@ -505,6 +596,9 @@ class SrinuFoodsApp {
             }
         }
 
+        // One key per checkout, so a retried submit cannot place the order twice
+        this.orderIdempotencyKey = randomUUID();
+
         this.renderOrderSummary();
         this.showModal('orderModal');
     }
@@ -555,7 +649,9 @@ class SrinuFoodsApp {
 
         try {
             this.showLoading();
-            const response = await this.apiCall('/api/orders/create/', 'POST', orderData);
+            const response = await this.apiCall('/api/orders/create/', 'POST', orderData, {
+                'Idempotency-Key': this.orderIdempotencyKey
+            });
 
             if (response.success) {
                 this.hideModal('orderModal');
@@ -589,7 +685,9 @@ class SrinuFoodsApp {
             const response = await this.apiCall('/api/orders/my-orders/', 'GET');
 
             if (response.success) {
-                this.renderMyOrders(response.orders);
+                this.myOrders = response.orders;
+                this.myOrdersCursor = response.next_cursor;
+                this.renderMyOrders(this.myOrders);
                 this.showModal('myOrdersModal');
             }
         } catch (error) {
@@ -600,6 +698,32 @@ class SrinuFoodsApp {
         }
     }
 
+    async loadMoreOrders() {
+        if (!this.myOrdersCursor) return;
+
+        try {
+            const cursor = encodeURIComponent(this.myOrdersCursor);
+            const response = await this.apiCall(`/api/orders/my-orders/?cursor=${cursor}`, 'GET');
+
+            if (response.success) {
+                this.myOrders = this.myOrders.concat(response.orders);
+                this.myOrdersCursor = response.next_cursor;
+                this.renderMyOrders(this.myOrders);
+            }
+        } catch (error) {
+            console.error('Error loading more orders:', error);
+            this.showToast('Failed to load orders', 'error');
+        }
+    }
+
+    updateMyOrder(orderId, changes) {
+        const order = this.myOrders?.find(order => order.id === orderId);
+        if (order) {
+            Object.assign(order, changes);
+            this.renderMyOrders(this.myOrders);
+        }
+    }
+
     renderMyOrders(orders) {
         const container = document.getElementById('ordersContent');
         if (!container) return;
@@ -622,13 +746,16 @@ class SrinuFoodsApp {
                     <div class="order-status status-${order.status}">${order.status.replace('_', ' ')}</div>
                 </div>
                 <div class="order-items">
-                    ${order.items.map(item => `
-                        <div class="order-item-row">
-                            <span>${item.name} x ${item.quantity}</span>
-                            <span>₹${(item.price * item.quantity).toFixed(2)}</span>
-                        </div>
-                    `).join('')}
+                    <div class="order-item-row">
+                        <span>${order.item_count} item${order.item_count === 1 ? '' : 's'}</span>
+                    </div>
                 </div>
+                ${!['delivered', 'cancelled'].includes(order.status) && order.estimated_delivery_time ? `
+                    <div class="order-eta">
+                        <i class="fas fa-clock"></i>
+                        Arriving by ${new Date(order.estimated_delivery_time).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}
+                    </div>
+                ` : ''}
                 <div class="order-total">
                     <span>Total: ₹${order.total_amount}</span>
                     <small>${new Date(order.created_at).toLocaleDateString()}</small>
@@ -636,15 +763,20 @@ class SrinuFoodsApp {
             </div>
         `).join('');
 
-        container.innerHTML = `<div class="orders-list">${ordersHtml}</div>`;
+        const loadMoreHtml = this.myOrdersCursor ? `
+            <button class="btn btn-primary btn-full" onclick="app.loadMoreOrders()">Load More</button>
+        ` : '';
+
+        container.innerHTML = `<div class="orders-list">${ordersHtml}</div>${loadMoreHtml}`;
     }
 
     // Utility Methods
-    async apiCall(url, method = 'GET', data = null) {
+    async apiCall(url, method = 'GET', data = null, headers = {}) {
         const options = {
             method,
             headers: {
                 'Content-Type': 'application/json',
+                ...headers
             }
         };
 
@@ -656,8 +788,23 @@ class SrinuFoodsApp {
             options.body = JSON.stringify(data);
         }
 
+        // Revalidate what we already have; the server answers 304 if it is unchanged
+        const cached = method === 'GET' ? this.validators.get(url) : null;
+        if (cached) {
+            options.headers['If-None-Match'] = cached.etag;
+        }
+
         const response = await fetch(url, options);
-        return await response.json();
+        if (response.status === 304 && cached) {
+            return cached.body;
+        }
+
+        const body = await response.json();
+        const etag = response.headers.get('ETag');
+        if (method === 'GET' && response.ok && etag) {
+            this.validators.set(url, { etag, body });
+        }
+        return body;
     }
 
     showModal(modalId) {
@@ -743,6 +890,18 @@ class SrinuFoodsApp {
 }
 
 // Global functions
+function randomUUID() {
+    // crypto.randomUUID exists only in secure contexts (HTTPS or localhost)
+    if (typeof crypto.randomUUID === 'function') {
+        return crypto.randomUUID();
+    }
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    bytes[6] = (bytes[6] & 0x0f) | 0x40; // version 4
+    bytes[8] = (bytes[8] & 0x3f) | 0x80; // RFC 4122 variant
+    const hex = Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
 function switchModal(from, to) {
     app.hideModal(from);
     app.showModal(to);